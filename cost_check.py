@@ -3,12 +3,15 @@ import os
 import re
 import subprocess
 import time
-from collections import defaultdict
+import weakref
+from collections import defaultdict, Counter, OrderedDict
 
 import numpy as np
 
 # TODO: !!Relative Path!!
 from data_structures import TestCase
+from data_structures.OutputPort import OutputPort
+from utility.util import pack_window_matrices, batch_single_period_occupation
 
 WCDTOOL_PATH = 'E:\\Thesis_WCDTool\\'
 WCDTOOL_TESTCASE_PATH = 'usecases\\generated\\'
@@ -17,8 +20,77 @@ DEBUG = True
 
 
 class CostChecker(object):
-    def __init__(self):
-        pass
+    def __init__(self, memory_limit=None):
+        """
+
+        Args:
+            memory_limit (int): Maximum memory in bytes used for calculating the occupation of one port. None for no
+            limit
+        """
+        self.memory_limit = memory_limit
+        self.statistics = Counter()  # Map(counter name, count), e.g. how often each occupation calculation was used
+
+        # Occupation percentages of already evaluated ports. Only ports whose windows changed since are recalculated
+        self._port_cache = weakref.WeakKeyDictionary()  # Map(OutputPort, (windows matrix, windows version, occupation))
+
+    def port_occupation(self, port: OutputPort):
+        '''
+
+        Args:
+            port (OutputPort): OutputPort object
+
+        Returns:
+            Occupation percentage of the port. Cached until the windows of the port change.
+        '''
+        occupation = self._get_cached(port)
+        if occupation is not None:
+            return occupation
+
+        occupation = port.get_occupation_percentage(self.memory_limit, self.statistics)
+        self._port_cache[port] = (port._M_Windows, port.windows_version, occupation)
+        return occupation
+
+    def port_occupations(self, s: TestCase):
+        '''
+        Recalculates all ports whose windows changed. Ports with a single period are calculated together in one
+        vectorized pass, all others one by one.
+
+        Args:
+            s (TestCase): TestCase object
+
+        Returns:
+            OrderedDict(port string, port occupation percentage) of all ports of all switches in testcase
+        '''
+        occupations = OrderedDict()
+        changed_ports = []  # List of (port string, port)
+
+        for switch in s.switches.values():
+            for port in switch.output_ports.values():
+                port_string = switch.uid + ',' + port.name
+                occupations[port_string] = self._get_cached(port)
+                if occupations[port_string] is None:
+                    changed_ports.append((port_string, port))
+
+        if len(changed_ports) > 0:
+            W, mask = pack_window_matrices([port._M_Windows for _, port in changed_ports])
+            batch_occupations, vectorized = batch_single_period_occupation(W, mask)
+
+            for i, (port_string, port) in enumerate(changed_ports):
+                if vectorized[i]:
+                    occupation = float(batch_occupations[i])
+                    self.statistics['occupation_vectorized'] += 1
+                    self._port_cache[port] = (port._M_Windows, port.windows_version, occupation)
+                    occupations[port_string] = occupation
+                else:
+                    occupations[port_string] = self.port_occupation(port)
+
+        return occupations
+
+    def _get_cached(self, port: OutputPort):
+        entry = self._port_cache.get(port)
+        if entry is not None and entry[0] is port._M_Windows and entry[1] == port.windows_version:
+            return entry[2]
+        return None
 
     def cost(self, s: TestCase):
         '''
@@ -29,13 +101,10 @@ class CostChecker(object):
         Returns:
             Sum of occupation percentages of all ports of all switches in testcase
         '''
-        switches = s.switches
-
         sum_of_occupation_percentages = 0
 
-        for switch in switches.values():
-            for port in switch.output_ports.values():
-                sum_of_occupation_percentages += port.get_occupation_percentage()
+        for occupation in self.port_occupations(s).values():
+            sum_of_occupation_percentages += occupation
 
         return sum_of_occupation_percentages
 
@@ -48,14 +117,7 @@ class CostChecker(object):
         Returns:
             Dict(port string, port occupation percentage)
         '''
-        switches = s.switches
-        port_costs = {}
-
-        for switch in switches.values():
-            for port in switch.output_ports.values():
-                port_costs[switch.uid+','+port.name] = port.get_occupation_percentage()
-
-        return port_costs
+        return dict(self.port_occupations(s))
 
 
 def debug_print(s, end='\n'):
@@ -1,3 +1,5 @@
+import copy
+
 from data_structures.OutputPort import OutputPort
 
 
@@ -34,6 +36,16 @@ class Switch(Node):
 
         self.output_ports = {}  # Map(port_uid, port)
 
+    def fork(self):
+        """
+
+        Returns:
+            Copy of this switch with forked output ports (see OutputPort.fork)
+        """
+        switch = copy.copy(self)
+        switch.output_ports = {uid: port.fork() for uid, port in self.output_ports.items()}
+        return switch
+
     def add_outputport_to(self, node_uid):
         """
         Adds an output port to a certain node to this switch
@@ -1,11 +1,18 @@
+import copy
 import math
 
 import numpy as np
 
-from utility.util import matrix_gcd, create_binary_matrix, vector_lcm
+from utility.util import matrix_gcd, create_binary_matrix, vector_lcm, interval_occupation, packed_occupation, \
+    occupation_memory_estimate, chunked_occupation, LRUCache
 
 DEBUG = False
 
+OCCUPATION_CACHE_SIZE = 4096
+
+# Occupation percentages of recently evaluated window matrices (of any port). Map(window matrix as bytes, occupation)
+occupation_cache = LRUCache(OCCUPATION_CACHE_SIZE)
+
 
 def debug_print(s, end='\n'):
     if DEBUG:
@@ -29,6 +36,7 @@ class OutputPort(object):
         self._upper_bound = 0
         self._lower_bound = 0
         self._free_period = -1
+        self.windows_version = 0  # Increased on every change of _M_Windows through the methods of this class
 
         # TODO: CP
         self._M_WindowsVar = np.empty(
@@ -54,6 +62,7 @@ class OutputPort(object):
             self.queues[stream_priority].add_stream(stream_uid, stream_length, stream_period)
             # Add Row in window matrix for this queue
             self._M_Windows = np.append(self._M_Windows, [[0, 0, 0]], axis=0)
+            self.windows_changed()
             # TODO: CP
             self._M_WindowsVar = np.append(self._M_WindowsVar, [[{}, {}, {}]], axis=0)
             return True
@@ -81,6 +90,7 @@ class OutputPort(object):
         matrix_index = self.get_sorted_queuenrs().index(priority)
         np.delete(self._M_Windows, (matrix_index), axis=0)
         self.queues.pop(priority)
+        self.windows_changed()
 
     def set_window(self, priority: int, offset: int, length: int, period: int):
         """
@@ -95,6 +105,7 @@ class OutputPort(object):
         """
         matrix_index = self.get_sorted_queuenrs().index(priority)
         self._M_Windows[matrix_index] = [offset, offset + length, period]
+        self.windows_changed()
 
 
     def get_window(self, priority: int):
@@ -124,6 +135,7 @@ class OutputPort(object):
         ])
 
         self._M_Windows = np.matmul(self._M_Windows, factor_matrix).astype(int)
+        self.windows_changed()
 
     def dq_reset(self):
         self._free_period = -1
@@ -140,11 +152,7 @@ class OutputPort(object):
             True, if period could still be modified
         '''
 
-        # Free Period not set yet?
-        if self._free_period is -1:
-            # free_period = period - length of all windows (=end time of last window if they are ordered)
-            self._free_period = self._M_Windows[0][2] - self._M_Windows[len(self.queues) - 1][1]
-            self._upper_bound = self._free_period
+        self.dq_init()
 
         if lower:
             self._upper_bound = self._free_period
@@ -162,12 +170,228 @@ class OutputPort(object):
         self.set_period_for_all(self._M_Windows[len(self.queues) - 1][1] + self._free_period)
         return True
 
+    def dq_init(self):
+        """
+        Sets the search interval of the free period to [0, current free period], if not set yet.
+        """
+        # Free Period not set yet?
+        if self._free_period == -1:
+            # free_period = period - length of all windows (=end time of last window if they are ordered)
+            self._free_period = self._M_Windows[0][2] - self._M_Windows[len(self.queues) - 1][1]
+            self._upper_bound = self._free_period
+
+    def dq_get_candidates(self, k: int):
+        """
+        Splits the search interval of the free period into k+1 parts (k-ary search).
+
+        Args:
+            k (int): Maximum number of candidates
+
+        Returns:
+            Increasing list of at most k free periods strictly inside the search interval. Empty if the search is done
+        """
+        self.dq_init()
+        candidates = set()
+        for j in range(1, k + 1):
+            candidate = self._lower_bound + (self._upper_bound - self._lower_bound) * j // (k + 1)
+            if self._lower_bound < candidate < self._upper_bound:
+                candidates.add(candidate)
+        return sorted(candidates)
+
+    def dq_set_free_period(self, free_period: int):
+        """
+
+        Args:
+            free_period (int): New free period. Period of all windows = end of last window + free period
+        """
+        self._free_period = free_period
+        self.set_period_for_all(self._M_Windows[len(self.queues) - 1][1] + free_period)
+
+    def dq_narrow(self, lower_bound: int, upper_bound: int):
+        """
+
+        Args:
+            lower_bound (int): New lower bound of the search interval of the free period
+            upper_bound (int): New upper bound of the search interval of the free period
+        """
+        self._lower_bound = lower_bound
+        self._upper_bound = upper_bound
+
     def set_period_for_all(self, value):
         period_array = np.full(self._M_Windows.shape[0], value)
         self._M_Windows[:, 2] = period_array
+        self.windows_changed()
+
+    def fork(self):
+        """
+
+        Returns:
+            Copy of this port with its own windows, window variables (CP) and search state, sharing the queues (only
+            changed while parsing)
+        """
+        port = copy.copy(self)
+        port._M_Windows = self._M_Windows.copy()
+        port._M_WindowsVar = self._M_WindowsVar.copy()
+        return port
+
+    def windows_changed(self):
+        """
+        Marks the windows of this port as modified, so cached values derived from them (e.g. the occupation
+        percentage in CostChecker) get recalculated. Has to be called after modifying _M_Windows in place.
+        """
+        self.windows_version += 1
+
+    def get_occupation_percentage(self, memory_limit=None, statistics=None):
+        """
+        Results are cached by window matrix in occupation_cache, so the same windows are only evaluated once.
+
+        Args:
+            memory_limit (int): Maximum memory in bytes for the calculation. None for no limit
+            statistics (Counter): If given, counts cache hits/misses and which calculation was used
+
+        Returns:
+            How much percent of hyperperiod of this port is occupied
+        """
+        key = self.get_windows_key()
+        occupation = occupation_cache.get(key)
+        if occupation is not None:
+            if statistics is not None:
+                statistics['occupation_cache_hits'] += 1
+            return occupation
+
+        method = self.get_occupation_method(memory_limit)
+        if method == 'single_period':
+            # All windows repeat with the same period and don't overlap -> they simply add up
+            occupation = self.get_occupation_percentage_single_period()
+        elif method == 'chunked':
+            occupation = self.get_occupation_percentage_chunked(memory_limit)
+        elif method == 'packed':
+            occupation = self.get_occupation_percentage_packed()
+        else:
+            occupation = self.get_occupation_percentage_interval()
+
+        occupation_cache.put(key, occupation)
+        if statistics is not None:
+            statistics['occupation_cache_misses'] += 1
+            statistics['occupation_' + method] += 1
+        return occupation
+
+    def get_windows_key(self):
+        """
+
+        Returns:
+            Hashable representation of the current window matrix, equal for ports with equal windows
+        """
+        M = np.ascontiguousarray(self._M_Windows, dtype=np.int64)
+        return M.shape[0], M.tobytes()
+
+    def get_occupation_method(self, memory_limit=None):
+        """
+        Windows with a single period are simply added up. Any other combination of periods uses packed bitmaps or the
+        union of window intervals, whichever needs less memory. If both would exceed memory_limit, the hyperperiod is
+        evaluated in chunks.
+
+        Args:
+            memory_limit (int): Maximum memory in bytes for the calculation. None for no limit
+
+        Returns:
+            Which calculation get_occupation_percentage uses for the current windows: 'single_period', 'packed',
+            'interval' or 'chunked'
+        """
+        if self.has_single_period_without_overlap():
+            return 'single_period'
+
+        l = self.get_hyperperiod()  # hyperperiod
+        if l == 0:
+            raise ValueError('Error. LCM equals zero. LCM {}'.format(l))
+        g = matrix_gcd(self._M_Windows)  # length in us of one bit
+
+        interval_bytes, packed_bytes = occupation_memory_estimate(self._M_Windows, g, l)
+        if memory_limit is not None and min(interval_bytes, packed_bytes) > memory_limit:
+            return 'chunked'
+        if packed_bytes < interval_bytes:
+            return 'packed'
+        return 'interval'
+
+    def has_single_period_without_overlap(self):
+        """
+
+        Returns:
+            True, if all windows share one (non-zero) period, lie within it and don't overlap each other
+        """
+        if self._M_Windows.shape[0] == 0:
+            return False
+
+        periods = self._M_Windows[:, 2]
+        period = periods[0]
+        if period <= 0 or np.any(periods != period):
+            return False
+
+        M_sorted = self._M_Windows[np.argsort(self._M_Windows[:, 0], kind='mergesort')]
+        starts = M_sorted[:, 0]
+        ends = M_sorted[:, 1]
+        if np.any(starts < 0) or np.any(ends < starts) or np.any(ends > period):
+            return False
+
+        return bool(np.all(starts[1:] >= ends[:-1]))
+
+    def get_occupation_percentage_single_period(self):
+        """
+        Closed form for ports where has_single_period_without_overlap() holds. O(queues).
+
+        Returns:
+            How much percent of hyperperiod of this port is occupied
+        """
+        period = self._M_Windows[0][2]
+        occupied_time = np.sum(self._M_Windows[:, 1] - self._M_Windows[:, 0])
+
+        return int(occupied_time) / int(period)
+
+    def get_occupation_percentage_chunked(self, memory_limit: int):
+        """
+        Walks through the hyperperiod in chunks of packed bitmaps, each needing at most memory_limit bytes.
+
+        Args:
+            memory_limit (int): Maximum memory in bytes for one chunk
+
+        Returns:
+            How much percent of hyperperiod of this port is occupied
+        """
+        g = matrix_gcd(self._M_Windows)  # length in us of one bit
+        l = self.get_hyperperiod()  # hyperperiod
+        occupied_time = chunked_occupation(self._M_Windows, g, l, memory_limit)
+
+        return occupied_time / l
+
+    def get_occupation_percentage_packed(self):
+        """
+        Runtime and memory scale with hyperperiod/gcd, but with one bit per time slot.
+
+        Returns:
+            How much percent of hyperperiod of this port is occupied
+        """
+        g = matrix_gcd(self._M_Windows)  # length in us of one bit
+        l = self.get_hyperperiod()  # hyperperiod
+        occupied_time = packed_occupation(self._M_Windows, g, l)
+
+        return occupied_time / l
+
+    def get_occupation_percentage_interval(self):
+        """
+        Runtime and memory scale with the number of window instances in the hyperperiod.
+
+        Returns:
+            How much percent of hyperperiod of this port is occupied
+        """
+        # Calculate exactly using the union of all window instances in the hyperperiod
+        l = self.get_hyperperiod()  # hyperperiod
+        occupied_time = interval_occupation(self._M_Windows, l)
+
+        return occupied_time / l
 
-    def get_occupation_percentage(self):
+    def get_occupation_percentage_binary(self):
         """
+        Reference implementation of get_occupation_percentage. Needs memory in the order of hyperperiod/gcd.
 
         Returns:
             How much percent of hyperperiod of this port is occupied
@@ -196,6 +420,7 @@ class OutputPort(object):
 
     def set_period_for_priority(self, value, priority):
         self.get_window(priority)[2] = value
+        self.windows_changed()
 
     # TODO: CP
 
@@ -1,3 +1,8 @@
+import copy
+
+import numpy as np
+
+
 class TestCase(object):
     """Represent a testcase and is used during optimization, where the windows in switches are manipulated"""
     def __init__(self, switches: dict, streams: dict, tc_name: str, nr_of_ES=0):
@@ -15,4 +20,61 @@ class TestCase(object):
 
         self.ESNr = nr_of_ES
         self.SWNr = len(switches)
-        self.StreamNr = len(streams)
\ No newline at end of file
+        self.StreamNr = len(streams)
+
+        # Index of the streams sent on each port, to find the streams affected by changing a port
+        self.port_streams = {}  # Map((node uid, next node uid), List of stream uids)
+        for stream in streams.values():
+            for i in range(len(stream.route) - 1):
+                self.port_streams.setdefault((stream.route[i].uid, stream.route[i + 1].uid), []).append(stream.uid)
+
+    def fork(self):
+        """
+        Fast replacement of copy.deepcopy for solutions during optimization: Streams, routes and nodes are never changed
+        after parsing and are shared with the fork. Only the switches (windows) are copied.
+
+        Returns:
+            Copy of this TestCase, whose windows can be changed independently
+        """
+        s = copy.copy(self)
+        s.switches = {uid: switch.fork() for uid, switch in self.switches.items()}
+        return s
+
+    def snapshot_windows(self):
+        """
+
+        Returns:
+            Windows of all ports as one int array, to be restored with restore_windows
+        """
+        matrices = [port._M_Windows for switch in self.switches.values() for port in switch.output_ports.values()]
+        if len(matrices) == 0:
+            return np.empty(shape=[0, 3], dtype=int)
+        return np.concatenate(matrices)
+
+    def restore_windows(self, snapshot: np.ndarray):
+        """
+        Sets the windows of all ports to the ones of a snapshot taken by snapshot_windows of this TestCase (or a fork
+        of it).
+
+        Args:
+            snapshot (np.ndarray): Snapshot of windows
+        """
+        i = 0
+        for switch in self.switches.values():
+            for port in switch.output_ports.values():
+                rows = port._M_Windows.shape[0]
+                port._M_Windows[:] = snapshot[i:i + rows]
+                port.windows_changed()
+                i += rows
+
+    def get_streams_on_port(self, node_uid: str, next_node_uid: str):
+        """
+
+        Args:
+            node_uid (str): Node with the output port
+            next_node_uid (str): Node the port sends to
+
+        Returns:
+            List of uids of streams sent on the port
+        """
+        return self.port_streams.get((node_uid, next_node_uid), [])
\ No newline at end of file
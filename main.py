@@ -1,10 +1,15 @@
 import getopt
 import os
 import sys
+import time
 
 from optimizers.cp_optimizer import CPOptimizer
 from optimizers.iterative_optimizer import IterativeOptimizer
-from utility import input_parser, config_parser
+from optimizers.checkpoint import get_checkpoint_path
+from utility import input_parser, config_parser, batch_runner, batch_state, results_store
+
+# Seconds a testcase process may overrun its time budget in -j mode, before it is killed
+JOB_TIMEOUT_MARGIN = 120
 
 def get_command_line_options(argv):
     '''
@@ -14,7 +19,9 @@ def get_command_line_options(argv):
     file_name = argv[0]
     options = {}
     description = '''{} <input> -c <location of config.ini> [-t <wcdanalysis_timeout>]
-    [-v] [-a] [-p] [-C <period/length/all/bahram>]'''.format(file_name)
+    [-v] [-a] [-p] [-C <period/length/all/bahram>] [--resume (skip completed testcases, continue checkpoints)]
+    [--time-budget <seconds per testcase>] [--batch-budget <seconds for all testcases>]
+    [-j <number of testcases optimized in parallel>]'''.format(file_name)
 
     # Initialize dict
     options['wcdanalysis_timeout'] = 20
@@ -22,6 +29,10 @@ def get_command_line_options(argv):
     options['aggregate'] = False
     options['cp'] = None
     options['pickle'] = False
+    options['resume'] = False
+    options['time_budget'] = None
+    options['batch_budget'] = None
+    options['jobs'] = 1
 
     # Check if input is specified.
     try:
@@ -33,7 +44,7 @@ def get_command_line_options(argv):
     # Define command line options
     args = argv[2:]
     try:
-        opts, _ = getopt.getopt(args, 'c:t:vapC:')
+        opts, _ = getopt.getopt(args, 'c:t:vapC:j:', ['resume', 'time-budget=', 'batch-budget='])
     except getopt.GetoptError:
         print(description)
         sys.exit(2)
@@ -52,19 +63,33 @@ def get_command_line_options(argv):
             options['pickle'] = True
         elif opt == '-C':
             options['cp'] = arg
+        elif opt == '-j':
+            options['jobs'] = int(arg)
+        elif opt == '--resume':
+            options['resume'] = True
+        elif opt == '--time-budget':
+            options['time_budget'] = float(arg)
+        elif opt == '--batch-budget':
+            options['batch_budget'] = float(arg)
     return options
 
-def main():
-    succesful_runs = 0
-
-    # Parse options
-    options = get_command_line_options(sys.argv)
+def run_testcase(test_case_path: str, wcdtool_path: str, wcdtool_testcase_subpath: str, options: dict,
+                 batch_deadline: float = None):
+    '''
+    Parse and optimize one testcase, returns if a solution was found
+    '''
+    if batch_deadline is not None and time.time() >= batch_deadline:
+        print('\nBatch time budget exhausted, skipping ' + test_case_path)
+        return False
 
-    # Parse Config
-    wcdtool_path, wcdtool_testcase_subpath = config_parser.parse_config(options['configpath'])
+    # Deadline of the optimizers, after which they write the best solution found so far
+    options['deadline'] = batch_deadline
+    if options['time_budget'] is not None:
+        options['deadline'] = min(time.time() + options['time_budget'], batch_deadline or float('inf'))
 
-    # Determine Testcases
-    test_case_paths = input_parser.find_testcase_filenames(options['inputpath'], recursive=True)
+    output_folder = get_output_folder(test_case_path)
+    tc_name = get_testcase_name(test_case_path)
+    fingerprint = batch_state.get_fingerprint(test_case_path, options)
 
     # Determine Optimizer
     if options['cp'] is not None:
@@ -72,17 +97,98 @@ def main():
     else:
         optimizer = IterativeOptimizer()
 
-    # for each testcase
-    for i, test_case_path in enumerate(test_case_paths):
-        # Read testcase
-        initial_testCase = input_parser.parse_testcase(test_case_path, wcdtool_path,
-                                                       wcdtool_testcase_subpath)
+    # Read testcase
+    initial_testCase = input_parser.parse_testcase(test_case_path, wcdtool_path,
+                                                   wcdtool_testcase_subpath)
+
+    # Optimize
+    successful = optimizer.run(initial_testCase, wcdtool_path, wcdtool_testcase_subpath, output_folder,
+                               options) is not None
+
+    # A checkpoint is left if the time budget was exhausted
+    if successful and not os.path.exists(get_checkpoint_path(output_folder, tc_name)):
+        batch_state.mark_completed(output_folder, tc_name, fingerprint)
+    return successful
+
+def run_testcase_job(test_case_path: str, wcdtool_path: str, wcdtool_testcase_subpath: str, options: dict,
+                     batch_deadline: float = None):
+    '''
+    run_testcase in its own process (-j mode)
+    '''
+    try:
+        return run_testcase(test_case_path, wcdtool_path, wcdtool_testcase_subpath, options, batch_deadline)
+    finally:
+        results_store.close_results_stores()
+
+def get_output_folder(test_case_path: str):
+    '''
+    Output folder of the testcase
+    '''
+    return os.path.dirname(test_case_path) + '/output/'
+
+def get_testcase_name(test_case_path: str):
+    '''
+    Name of the testcase, the file name without ending
+    '''
+    return os.path.splitext(os.path.basename(test_case_path))[0]
+
+def is_completed(test_case_path: str, options: dict):
+    '''
+    If the testcase was completed with the same input files and options before
+    '''
+    return batch_state.is_completed(get_output_folder(test_case_path), get_testcase_name(test_case_path),
+                                    batch_state.get_fingerprint(test_case_path, options))
+
+def main():
+    # Parse options
+    options = get_command_line_options(sys.argv)
 
-        # Optimize
-        if optimizer.run(initial_testCase, wcdtool_path, wcdtool_testcase_subpath, os.path.dirname(test_case_path)+'/output/',  options) is not None:
-            succesful_runs += 1
+    # Parse Config
+    wcdtool_path, wcdtool_testcase_subpath = config_parser.parse_config(options['configpath'])
+    options.update(config_parser.parse_options(options['configpath']))
+
+    # Determine Testcases
+    test_case_paths = input_parser.find_testcase_filenames(options['inputpath'], recursive=True)
+    scheduled_paths = test_case_paths
+    if options['resume']:
+        # Only schedule missing or failed testcases
+        scheduled_paths = [path for path in test_case_paths if not is_completed(path, options)]
+        print('Skipping {} completed testcases'.format(len(test_case_paths) - len(scheduled_paths)))
+    succesful_runs = len(test_case_paths) - len(scheduled_paths)
+
+    batch_deadline = None
+    if options['batch_budget'] is not None:
+        batch_deadline = time.time() + options['batch_budget']
+
+    if options['jobs'] > 1:
+        # Each testcase in its own process, with its own WCD staging folder and log file
+        jobs = []
+        for i, test_case_path in enumerate(scheduled_paths):
+            tc_name = get_testcase_name(test_case_path)
+            job_subpath = os.path.join(wcdtool_testcase_subpath, 'job_{}'.format(i))
+            jobs.append((tc_name, (test_case_path, wcdtool_path, job_subpath, options, batch_deadline),
+                         os.path.join(get_output_folder(test_case_path), tc_name + '.log')))
+
+        job_timeout = None
+        if options['time_budget'] is not None:
+            job_timeout = options['time_budget'] + JOB_TIMEOUT_MARGIN
+        statuses = batch_runner.run_jobs(run_testcase_job, jobs, options['jobs'], job_timeout)
+
+        succesful_runs += statuses.count(batch_runner.JOB_SUCCESSFUL)
+        print('\nFAILED RUNS: {} CRASHED RUNS: {} TIMED OUT RUNS: {}'.format(
+            statuses.count(batch_runner.JOB_FAILED), statuses.count(batch_runner.JOB_CRASHED),
+            statuses.count(batch_runner.JOB_TIMEOUT)))
+    else:
+        # for each testcase
+        try:
+            for i, test_case_path in enumerate(scheduled_paths):
+                if run_testcase(test_case_path, wcdtool_path, wcdtool_testcase_subpath, options, batch_deadline):
+                    succesful_runs += 1
+        finally:
+            results_store.close_results_stores()
 
     print('\nSUCCESFUL RUNS: {}/{}'.format(succesful_runs, len(test_case_paths)))
 
 
-main()
+if __name__ == '__main__':
+    main()
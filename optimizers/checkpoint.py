@@ -0,0 +1,99 @@
+import os
+import pickle
+
+import numpy as np
+
+from data_structures.TestCase import TestCase
+
+CHECKPOINT_VERSION = 1
+
+
+def get_checkpoint_path(output_folder: str, tc_name: str):
+    """
+
+    Args:
+        output_folder (str): Path to output folder
+        tc_name (str): Name of testcase
+
+    Returns:
+        Path of the checkpoint file of the testcase
+    """
+    return os.path.join(output_folder, 'checkpoints', tc_name + '.checkpoint')
+
+
+def get_search_state(s: TestCase):
+    """
+
+    Args:
+        s (TestCase): Solution
+
+    Returns:
+        Bisection state (_lower_bound, _upper_bound, _free_period) of all ports as int array, in the order of
+        TestCase.snapshot_windows
+    """
+    state = [[port._lower_bound, port._upper_bound, port._free_period]
+             for switch in s.switches.values() for port in switch.output_ports.values()]
+    return np.array(state, dtype=int).reshape(-1, 3)
+
+
+def restore_search_state(s: TestCase, state: np.ndarray):
+    """
+
+    Args:
+        s (TestCase): Solution
+        state (np.ndarray): Bisection state of all ports, as returned by get_search_state
+    """
+    i = 0
+    for switch in s.switches.values():
+        for port in switch.output_ports.values():
+            port._lower_bound, port._upper_bound, port._free_period = [int(x) for x in state[i]]
+            i += 1
+
+
+def save_checkpoint(path: str, state: dict):
+    """
+    Atomically replaces the checkpoint file, so an interrupted write never destroys the previous checkpoint.
+
+    Args:
+        path (str): Path of checkpoint file
+        state (dict): Everything needed to continue the optimization
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    state = dict(state, version=CHECKPOINT_VERSION)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str, s: TestCase):
+    """
+
+    Args:
+        path (str): Path of checkpoint file
+        s (TestCase): Solution to be continued
+
+    Returns:
+        State saved by save_checkpoint or None, if there is no checkpoint for this testcase
+    """
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+
+    if state.get('version') != CHECKPOINT_VERSION or state['testcase'] != s.name or \
+            state['windows'].shape != s.snapshot_windows().shape:
+        print('Checkpoint {} does not match testcase {}, starting over'.format(path, s.name))
+        return None
+    return state
+
+
+def remove_checkpoint(path: str):
+    """
+
+    Args:
+        path (str): Path of checkpoint file
+    """
+    if os.path.exists(path):
+        os.remove(path)
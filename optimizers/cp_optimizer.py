@@ -2,22 +2,20 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import copy
-import datetime
 import math
-import os
+import time
 
 from ortools.sat.python import cp_model
 
 from cost_check import CostChecker
 from optimizers import iterative_optimizer
 from optimizers.iterative_optimizer import create_initial_solution, IterativeOptimizer
-from solution_check import SolutionChecker
+from solution_check import SolutionChecker, create_solution_checker
 from data_structures.TestCase import TestCase
+from utility.output_serializer import OutputData
 
 
 # You need to subclass the cp_model.CpSolverSolutionCallback class.
-from utility.output_serializer import write_windows
 
 
 class CPSolverBahram(cp_model.CpSolverSolutionCallback):
@@ -32,6 +30,7 @@ class CPSolverBahram(cp_model.CpSolverSolutionCallback):
         self.solutionChecker = solution_checker
         self.costChecker = cost_checker
         self.best_objective_value = 100000000
+        self.best_solution = None
         self.last_cost = 100000000;
         self.model = model
         self.solver = solver
@@ -56,6 +55,7 @@ class CPSolverBahram(cp_model.CpSolverSolutionCallback):
             self.last_cost = cost
             if is_feasible and len(infinite_streams) == 0:
                 self.best_objective_value = cost
+                self.best_solution = solution.fork()
                 print('Solution is feasible %i' % self.__solution_count)
                 print('  objective value =' + str(cost))
                 for v in self.__variables:
@@ -89,7 +89,7 @@ class CPSolverPeriod(cp_model.CpSolverSolutionCallback):
         self.test_case = testcase
         self.solutionChecker = solution_checker
         self.costChecker = cost_checker
-        self.best_solution = copy.deepcopy(iterative_solution)
+        self.best_solution = iterative_solution.fork()
         self.lowest_cost = iterative_cost
         self.total_possibilities = total_possibilities
         self.model = model
@@ -113,7 +113,7 @@ class CPSolverPeriod(cp_model.CpSolverSolutionCallback):
             _, is_feasible, _, _, infinite_streams = self.solutionChecker.check_solution(solution)
             if is_feasible and len(infinite_streams) == 0:
                 self.lowest_cost = cost
-                self.best_solution = copy.deepcopy(solution)
+                self.best_solution = solution.fork()
                 print('New best solution with cost: ' + str(cost))
 
         self.__solution_count += 1
@@ -123,15 +123,60 @@ class CPSolverPeriod(cp_model.CpSolverSolutionCallback):
         return self.__solution_count
 
 
+def set_time_limit(solver: cp_model.CpSolver, deadline: float):
+    """
+    Stops the search at the deadline, keeping the best solution found so far
+
+    Args:
+        solver (cp_model.CpSolver): Solver
+        deadline (float): time.time() at which the search is stopped, no limit if None
+    """
+    if deadline is not None:
+        solver.parameters.max_time_in_seconds = max(deadline - time.time(), 0)
+
+
+def create_output_data(initial_solution: TestCase, final_solution: TestCase, cost_checker: CostChecker,
+                       solution_checker: SolutionChecker, runtime: float, budget_exhausted: bool):
+    """
+
+    Args:
+        initial_solution (TestCase): Solution the CP optimization started from (the iterative solution)
+        final_solution (TestCase): Best solution found by the CP optimization
+        cost_checker (CostChecker): CostChecker object
+        solution_checker (SolutionChecker): SolutionChecker object
+        runtime (float): Runtime of the CP optimization, in seconds
+        budget_exhausted (bool): If the CP optimization was stopped by the time budget
+
+    Returns:
+        OutputData of the CP optimization, for IterativeOptimizer.generate_output
+    """
+    _, _, initial_exceeding_percentages, initial_wcds, initial_infinite_streams = solution_checker.check_solution(
+        initial_solution)
+    _, _, exceeding_percentages, final_wcds, infinite_streams = solution_checker.check_solution(final_solution)
+
+    initial_ep_mean = 0
+    if len(initial_exceeding_percentages) > 0:
+        initial_ep_mean = sum(t[0] for t in initial_exceeding_percentages) / len(initial_exceeding_percentages)
+
+    performance_counters = dict(cost_checker.statistics)
+    performance_counters.update(solution_checker.get_statistics())
+    return OutputData(initial_solution, final_solution, initial_wcds, final_wcds, runtime,
+                      cost_checker.cost(initial_solution), cost_checker.cost(final_solution),
+                      cost_checker.port_costs(initial_solution), cost_checker.port_costs(final_solution), [],
+                      infinite_streams, exceeding_percentages,
+                      len(initial_exceeding_percentages) + len(initial_infinite_streams), 0, initial_ep_mean,
+                      performance_counters, budget_exhausted)
+
+
 def create_cp_model_bahram(testCase: TestCase, output_folder:str, cost_checker: CostChecker, solution_checker: SolutionChecker,
-                                   iterative_cost, iterative_solution):
+                                   iterative_cost, iterative_solution, deadline: float = None):
     """
 
     Args:
         testCase (TestCase): initial testcase (without windows)
 
     Returns:
-        Initial Solution as TestCase Object (with windows set)
+        Best feasible solution found as TestCase Object (with windows set), the iterative solution if none was found
     """
     model = cp_model.CpModel()
 
@@ -232,6 +277,7 @@ def create_cp_model_bahram(testCase: TestCase, output_folder:str, cost_checker:
     # model.Add(x != y)
 
     solver = cp_model.CpSolver()
+    set_time_limit(solver, deadline)
     # model.Maximize(sum)
     # Creates a solver and solves.
     # model.AddDecisionStrategy(periodvars, cp_model.CHOOSE_FIRST,cp_model.SELECT_MAX_VALUE )
@@ -246,34 +292,20 @@ def create_cp_model_bahram(testCase: TestCase, output_folder:str, cost_checker:
     #print('Best solution at cost: ' + str(solution_printer.lowest_cost))
     print('Best iterative solution at cost: ' + str(iterative_cost))
 
-    #subfolder = solution_printer.best_solution.name + '_' + datetime.datetime.now().strftime(
-    #    '%Y-%m-%d_%H-%M') + '_cp_bahram/'
-
-    # Create output_folder if it doesn't exist yet
-    #if not os.path.exists(output_folder):
-    #    os.makedirs(output_folder, exist_ok=True)
-
-    # Create subfolder if it doesn't exist yet
-    #if not os.path.exists(output_folder + subfolder):
-    #    os.makedirs(output_folder + subfolder, exist_ok=True)
-
-    #write_windows(output_folder + subfolder + "{}.txt".format('windows_final'),
-    #              solution_printer.best_solution.switches)
-
-    #print('Output Files written to: ' + output_folder + subfolder)
-
-    return None
+    if solution_printer.best_solution is None:
+        return iterative_solution.fork()
+    return solution_printer.best_solution
 
 
 def create_cp_model_variablePeriod(testCase: TestCase, output_folder:str, cost_checker: CostChecker, solution_checker: SolutionChecker,
-                                   iterative_cost, iterative_solution):
+                                   iterative_cost, iterative_solution, deadline: float = None):
     """
 
     Args:
         testCase (TestCase): initial testcase (without windows)
 
     Returns:
-        Solution as TestCase Object (with windows set)
+        Best feasible solution found as TestCase Object (with windows set), the iterative solution if none was found
     """
     cpvars_period = {}  # Map(port, (priority, p))
     cp_vars = []
@@ -300,6 +332,7 @@ def create_cp_model_variablePeriod(testCase: TestCase, output_folder:str, cost_c
     model.AddDecisionStrategy(cp_vars, cp_model.CHOOSE_FIRST, cp_model.SELECT_MIN_VALUE)
 
     solver = cp_model.CpSolver()
+    set_time_limit(solver, deadline)
     solution_printer = CPSolverPeriod(cpvars_period, testCase, cost_checker, solution_checker,
                                       model,
                                       solver, iterative_cost, iterative_solution, total_possibilities)
@@ -308,22 +341,6 @@ def create_cp_model_variablePeriod(testCase: TestCase, output_folder:str, cost_c
     print('Best solution at cost: ' + str(solution_printer.lowest_cost))
     print('Best iterative solution at cost: ' + str(iterative_cost))
 
-    subfolder = solution_printer.best_solution.name + '_' + datetime.datetime.now().strftime(
-        '%Y-%m-%d_%H-%M') + '_cp_period/'
-
-    # Create output_folder if it doesn't exist yet
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder, exist_ok=True)
-
-    # Create subfolder if it doesn't exist yet
-    if not os.path.exists(output_folder + subfolder):
-        os.makedirs(output_folder + subfolder, exist_ok=True)
-
-    write_windows(output_folder + subfolder + "{}.txt".format('windows_final'),
-                  solution_printer.best_solution.switches)
-
-    print('Output Files written to: ' + output_folder + subfolder)
-
     return  solution_printer.best_solution
 
 
@@ -345,27 +362,43 @@ class CPOptimizer(object):
         Returns:
             TestCase object for final solution or None, if no solution found
         """
-        cost_checker = CostChecker()
+        cost_checker = CostChecker(options['occupation_memory_limit'])
 
         iterative_optimizer = IterativeOptimizer()
         iterative_solution = iterative_optimizer.run(testcase, wcdtool_path, wcdtool_testcase_subpath, output_folder,
                                                      options)
+        if iterative_solution is None:
+            return None
         iterative_cost = cost_checker.cost(iterative_solution)
 
-        final_solution = None
-        if options['cp'] == 'period':
-            final_solution = create_cp_model_variablePeriod(testcase, output_folder, cost_checker,
-                                           SolutionChecker(wcdtool_path, wcdtool_testcase_subpath,
-                                                           options['wcdanalysis_timeout']),
-                                           iterative_cost, iterative_solution)
-        elif options['cp'] == 'length':
-            pass
-        elif options['cp'] == 'all':
-            pass
-        elif options['cp'] == 'bahram':
-            final_solution = create_cp_model_bahram(testcase, output_folder, cost_checker,
-                                                            SolutionChecker(wcdtool_path, wcdtool_testcase_subpath,
-                                                                            options['wcdanalysis_timeout']),
-                                                            iterative_cost, iterative_solution)
-
+        solution_checker = create_solution_checker(wcdtool_path, wcdtool_testcase_subpath, options)
+        t_start = time.perf_counter()
+        try:
+            final_solution = None
+            if options['deadline'] is not None and time.time() >= options['deadline']:
+                print('Time budget exhausted, skipping CP optimization')
+                final_solution = iterative_solution.fork()
+            elif options['cp'] == 'period':
+                final_solution = create_cp_model_variablePeriod(testcase, output_folder, cost_checker,
+                                                                solution_checker, iterative_cost, iterative_solution,
+                                                                options['deadline'])
+            elif options['cp'] == 'length':
+                pass
+            elif options['cp'] == 'all':
+                pass
+            elif options['cp'] == 'bahram':
+                final_solution = create_cp_model_bahram(testcase, output_folder, cost_checker, solution_checker,
+                                                        iterative_cost, iterative_solution, options['deadline'])
+            if final_solution is None:
+                return None
+
+            # Stopped by the time limit of the solver, the final solution is the best feasible one found so far
+            budget_exhausted = options['deadline'] is not None and time.time() >= options['deadline']
+            output_data = create_output_data(iterative_solution, final_solution, cost_checker, solution_checker,
+                                             time.perf_counter() - t_start, budget_exhausted)
+        finally:
+            solution_checker.close()
+
+        # Output Results, like a run finished within the time budget
+        iterative_optimizer.generate_output(output_data, output_folder, 'cp_' + options['cp'], options)
         return final_solution
@@ -1,4 +1,3 @@
-import copy
 import datetime
 import math
 import os
@@ -10,11 +9,17 @@ from graphviz import render
 from cost_check import CostChecker
 from data_structures import Stream
 from data_structures.TestCase import TestCase
+from optimizers.checkpoint import get_checkpoint_path, save_checkpoint, load_checkpoint, remove_checkpoint, \
+    get_search_state, restore_search_state
 from optimizers.initialSolution_generator import create_initial_solution
-from solution_check import SolutionChecker
-from utility.output_serializer import OutputData, write_windows, write_statistics, append_to_collections, \
+from optimizers.worklist import StreamWorklist
+from solution_check import SolutionChecker, create_solution_checker
+from utility.output_serializer import OutputData, write_windows, write_statistics, \
     render_bar_graph, render_network_topology, pickle_data, render_windows
+from utility.results_store import get_results_store
 from utility.window_visualizer import WindowVisualizer
+from wcd.backends import BACKEND_NETWORKCALCULUS
+from wcd.bounds import BoundsChecker, UNKNOWN, INFEASIBLE
 
 DEBUG = True
 
@@ -62,44 +67,222 @@ def reset_ports_bounds_on_stream_route(solution: TestCase, stream: Stream):
         i = i + 1
 
 
-def optimize_ports_for_stream(solution: TestCase, stream: Stream, solution_checker: SolutionChecker):
-    lower = True
-    reset_ports_bounds_on_stream_route(solution, stream)
+def optimize_ports_for_stream(solution: TestCase, stream: Stream, solution_checker: SolutionChecker,
+                              bounds_checker: BoundsChecker = None, deadline: float = None):
+    return optimize_ports_for_streams(solution, [stream], solution_checker, bounds_checker, deadline)
+
+
+def optimize_ports_for_streams(solution: TestCase, streams: list, solution_checker: SolutionChecker,
+                               bounds_checker: BoundsChecker = None, deadline: float = None):
+    """
+    Bisects the free periods of the ports on the routes of the streams in lockstep, so one WCD analysis advances the
+    search of all streams. The routes of the streams must not share ports (see group_port_disjoint_streams).
+
+    Args:
+        solution (TestCase): Solution
+        streams (list): List of Stream objects to be made feasible
+        solution_checker (SolutionChecker): SolutionChecker object
+        bounds_checker (BoundsChecker): Skips checks decided by bounds, if given
+        deadline (float): time.time() at which the search is stopped, no limit if None. The solution is then reset
+            to the last windows checked to be feasible for all the streams, or to its windows before the search
+
+    Returns:
+        Solution
+    """
+    start_windows = solution.snapshot_windows()
+    feasible_windows = None  # Last windows checked to be feasible for all active streams
+    lower = {}  # Map(stream uid, lower or upper half?)
+    for stream in streams:
+        lower[stream.uid] = True
+        reset_ports_bounds_on_stream_route(solution, stream)
+    active = list(streams)
+
+    while len(active) > 0:
+        if deadline is not None and time.time() >= deadline:
+            solution.restore_windows(feasible_windows if feasible_windows is not None else start_windows)
+            print('\n!!! Time budget exhausted while fixing ' + ', '.join(stream.uid for stream in active) + ' !!!')
+            break
 
-    while True:
         print('.', end='', flush=True)
-        # Iterate through ports on route (ES sliced out), decrease period
-        i = 1
-        end = True
-        for node in stream.route[1:-1]:
-            # Get switch object
-            assert (node.type == 'SW')
-            switch = solution.switches[node.uid]
+        end = {}  # Map(stream uid, search done?)
+        for stream in active:
+            # Iterate through ports on route (ES sliced out), decrease period
+            end[stream.uid] = True
+            for port in get_ports_on_stream_route(solution, stream):
+                if port.dq_modify_period(lower[stream.uid]):
+                    # If at least one port can still be modifed -> do not end
+                    end[stream.uid] = False
+
+        # Skip WCD analysis if bounds already decide for all streams
+        bounds = {stream.uid: UNKNOWN for stream in active}
+        if bounds_checker is not None:
+            for stream in active:
+                bounds[stream.uid] = bounds_checker.classify(solution, stream)
+            bounds_checker.statistics['wcd_checks_not_skipped' if UNKNOWN in bounds.values() else
+                                      'wcd_checks_skipped'] += 1
+
+        if UNKNOWN in bounds.values():
+            is_valid, _, exceeding_percentages, _, _ = solution_checker.check_solution(solution)
+            assert is_valid
+            exceeding_uids = set(t[1] for t in exceeding_percentages)
+
+        for stream in active:
+            if bounds[stream.uid] == UNKNOWN:
+                lower[stream.uid] = stream.uid in exceeding_uids
+            else:
+                lower[stream.uid] = bounds[stream.uid] == INFEASIBLE
+
+            if end[stream.uid] and lower[stream.uid]:
+                print('\n!!! Stream ' + stream.uid + ' cannot be made feasible !!!')
+
+        if not any(lower[stream.uid] for stream in active):
+            feasible_windows = solution.snapshot_windows()
+        active = [stream for stream in active if not end[stream.uid]]
 
-            # Determine Port
-            port_uid = stream.route[i + 1].uid
-            port = switch.output_ports[port_uid]
+    return solution
 
-            if port.dq_modify_period(lower):
-                # If at least one port can still be modifed -> do not end
-                end = False
 
-            i = i + 1
+def group_port_disjoint_streams(solution: TestCase, stream_uids: list):
+    """
+    Greedy coloring of the conflict graph of the streams, where streams conflict if their routes share a switch port.
 
-        is_valid, _, exceeding_percentages, _, _ = solution_checker.check_solution(solution)
-        assert is_valid
+    Args:
+        solution (TestCase): Solution
+        stream_uids (list): Uids of streams, in order of priority
 
-        lower = False
-        for tuple in exceeding_percentages:
-            if stream.uid == tuple[1]:
-                lower = True
+    Returns:
+        List of groups (lists of stream uids) without shared ports. Each stream joins the first group it does not
+        conflict with, so the first group contains the first stream
+    """
+    groups = []
+    group_ports = []
+    for uid in stream_uids:
+        stream = solution.streams[uid]
+        ports = set((stream.route[i].uid, stream.route[i + 1].uid) for i in range(1, len(stream.route) - 1))
+        for group, used_ports in zip(groups, group_ports):
+            if used_ports.isdisjoint(ports):
+                group.append(uid)
+                used_ports.update(ports)
+                break
+        else:
+            groups.append([uid])
+            group_ports.append(ports)
+    return groups
 
-        if end:
-            for tuple in exceeding_percentages:
-                if stream.uid == tuple[1]:
-                    print('\n!!! Stream ' + stream.uid + ' cannot be made feasible !!!')
+
+def get_ports_on_stream_route(solution: TestCase, stream: Stream):
+    """
+
+    Args:
+        solution (TestCase): Solution
+        stream (Stream): Stream object
+
+    Returns:
+        List of switch output ports along the route of the stream
+    """
+    ports = []
+    i = 1
+    for node in stream.route[1:-1]:
+        assert (node.type == 'SW')
+        ports.append(solution.switches[node.uid].output_ports[stream.route[i + 1].uid])
+        i = i + 1
+    return ports
+
+
+def optimize_ports_for_stream_kary(solution: TestCase, stream: Stream, solution_checker: SolutionChecker, arity: int,
+                                   bounds_checker: BoundsChecker = None, deadline: float = None):
+    """
+    Like optimize_ports_for_stream, but checks arity candidate free periods per round in parallel
+    (SolutionChecker.check_solutions), which shrinks the search interval of every port by a factor of arity+1.
+
+    Args:
+        solution (TestCase): Solution
+        stream (Stream): Stream to be made feasible
+        solution_checker (SolutionChecker): SolutionChecker object
+        arity (int): Number of candidates per round
+        bounds_checker (BoundsChecker): Skips checks of candidates decided by bounds, if given
+        deadline (float): time.time() at which the search is stopped, no limit if None. The solution is then reset
+            to the last candidate checked to be feasible, or to its windows before the search
+
+    Returns:
+        Solution with the largest free periods on the route of the stream found to be feasible
+    """
+    start_windows = solution.snapshot_windows()
+    reset_ports_bounds_on_stream_route(solution, stream)
+    ports = get_ports_on_stream_route(solution, stream)
+    verified = False  # If the lower bounds of all ports were checked to be feasible together
+
+    while True:
+        if deadline is not None and time.time() >= deadline:
+            print('\n!!! Time budget exhausted while fixing ' + stream.uid + ' !!!')
+            if not verified:
+                solution.restore_windows(start_windows)
+                return solution
             break
 
+        print('.', end='', flush=True)
+        port_candidates = [port.dq_get_candidates(arity) for port in ports]
+        n = max(len(candidates) for candidates in port_candidates)
+        if n == 0:
+            break
+
+        def free_period(i: int, j: int):
+            # Free period of port i in candidate j, 0 = lower bound, n+1 = upper bound. Non-decreasing in j
+            if len(port_candidates[i]) == 0 or j == 0:
+                return ports[i]._lower_bound
+            if j > len(port_candidates[i]):
+                return ports[i]._upper_bound
+            return port_candidates[i][j - 1]
+
+        # Candidates 1..n
+        candidates = []
+        for j in range(1, n + 1):
+            candidate = solution.fork()
+            for i, port in enumerate(get_ports_on_stream_route(candidate, stream)):
+                port.dq_set_free_period(free_period(i, j))
+            candidates.append(candidate)
+
+        # Exceeding candidates, decided by bounds or checked in parallel
+        exceeding = [None] * n
+        unknown = []
+        for j, candidate in enumerate(candidates):
+            bound = UNKNOWN
+            if bounds_checker is not None:
+                bound = bounds_checker.classify(candidate, stream)
+            if bound == UNKNOWN:
+                unknown.append(j)
+            else:
+                exceeding[j] = bound == INFEASIBLE
+        if bounds_checker is not None:
+            bounds_checker.statistics['wcd_checks_skipped'] += n - len(unknown)
+            bounds_checker.statistics['wcd_checks_not_skipped'] += len(unknown)
+
+        results = solution_checker.check_solutions([candidates[j] for j in unknown]) if len(unknown) > 0 else []
+        for j, (is_valid, _, exceeding_percentages, _, _) in zip(unknown, results):
+            # Invalid (e.g. timed out) candidates are treated as exceeding
+            exceeding[j] = not is_valid or any(stream.uid == t[1] for t in exceeding_percentages)
+
+        # First exceeding candidate. Exceeding is monotonic in the free periods
+        first = n + 1
+        for j in range(1, n + 1):
+            if exceeding[j - 1]:
+                first = j
+                break
+
+        for i, port in enumerate(ports):
+            port.dq_narrow(free_period(i, first - 1), free_period(i, first))
+        if first > 1:
+            verified = True
+
+    for port in ports:
+        port.dq_set_free_period(port._lower_bound)
+
+    if not verified:
+        _, _, exceeding_percentages, _, _ = solution_checker.check_solution(solution)
+        for t in exceeding_percentages:
+            if stream.uid == t[1]:
+                print('\n!!! Stream ' + stream.uid + ' cannot be made feasible !!!')
+
     return solution
 
 
@@ -124,8 +307,21 @@ def generate_iteration_data_tuple_and_output(exceeding_percentages, final_wcds,
     return (cost, sum_wcd, sum_ep, solved_stream_number)
 
 
+def get_violation(exceeding_percentages: list, infinite_streams: list):
+    """
+
+    Args:
+        exceeding_percentages (list): List of (exceeding percentage, stream uid)
+        infinite_streams (list): List of uids of streams with infinite WCD
+
+    Returns:
+        (number of infeasible streams, exceeding percentage sum), lower is better
+    """
+    return len(exceeding_percentages) + len(infinite_streams), sum(t[0] for t in exceeding_percentages)
+
+
 def divideconquer_optimization(solution: TestCase, options: dict, cost_checker: CostChecker,
-                               solution_checker: SolutionChecker):
+                               solution_checker: SolutionChecker, checkpoint_path: str = None, resume: bool = False):
     """
 
     Args:
@@ -133,91 +329,183 @@ def divideconquer_optimization(solution: TestCase, options: dict, cost_checker:
         options (dict): directory of options specified by user
         cost_checker (CostChecker): CostChecker object
         solution_checker (SolutionChecker): SolutionChecker object
+        checkpoint_path (str): File to save the progress to every options['checkpoint_interval'] seconds. No
+            checkpoints if None
+        resume (bool): Continue from the checkpoint file, if existant
+
+    Stops fixing streams once time.time() reaches options['deadline'] (no limit if None) and returns the best
+    solution found so far instead, i.e. the one with the fewest infeasible streams and the lowest exceeding percentage
+    sum.
 
     Returns:
         Final Solution as TestCase object or None, if solution not solvable
     """
-    initial_solution = copy.deepcopy(solution)
+    initial_solution = solution.fork()
+    bounds_checker = None
+    if options['wcd_bounds']:
+        # Upper bound is the same as the analysis of the networkcalculus backend
+        bounds_checker = BoundsChecker(use_upper_bound=options['wcd_backend'] != BACKEND_NETWORKCALCULUS)
     print(
         '\n#########################\nTest Case: {} | Divide & Conquer Optimization\n#########################\n'.format(
             solution.name))
 
     print('Amount of streams: ' + str(len(initial_solution.streams)))
-    t_start = time.clock()
-    is_valid, is_feasible, exceeding_percentages, initial_wcds, infinite_streams = solution_checker.check_solution(
-        solution)
-    if not is_valid:
-        print('\n----------------- Testcase invalid -----------------')
-        return None
-
-    if len(infinite_streams) > 0:
-        print('\n----------------- Unsolvable streams found -----------------')
-        for uid in infinite_streams:
-            print(uid + ' ', end='')
-        print('')
-
-    initial_cost = cost_checker.cost(solution)
-    initial_port_costs = cost_checker.port_costs(solution)
-    final_wcds = initial_wcds
-    iteration_data = []
-    initial_nr_of_stream_tobesolved = len(exceeding_percentages)
-    final_step_amount = 0
-    sum = 0
-    for tuple in exceeding_percentages:
-        sum = sum + tuple[0]
-    if len(exceeding_percentages) > 0:
-        initial_ep_mean = sum / len(exceeding_percentages)
+    t_start = time.perf_counter()
+
+    checkpoint = None
+    if resume and checkpoint_path is not None:
+        checkpoint = load_checkpoint(checkpoint_path, solution)
+
+    if checkpoint is not None:
+        print('Resuming from checkpoint ' + checkpoint_path)
+        initial_solution.restore_windows(checkpoint['initial_windows'])
+        solution.restore_windows(checkpoint['windows'])
+        restore_search_state(solution, checkpoint['search_state'])
+        t_start -= checkpoint['runtime']
+        is_feasible = checkpoint['is_feasible']
+        exceeding_percentages = checkpoint['exceeding_percentages']
+        infinite_streams = checkpoint['infinite_streams']
+        initial_wcds = checkpoint['initial_wcds']
+        final_wcds = checkpoint['final_wcds']
+        initial_cost = checkpoint['initial_cost']
+        initial_port_costs = checkpoint['initial_port_costs']
+        iteration_data = checkpoint['iteration_data']
+        initial_nr_of_stream_tobesolved = checkpoint['initial_nr_of_stream_tobesolved']
+        initial_ep_mean = checkpoint['initial_ep_mean']
+        worklist = checkpoint['worklist']
+        i = checkpoint['i']
     else:
-        initial_ep_mean = 0
+        is_valid, is_feasible, exceeding_percentages, initial_wcds, infinite_streams = solution_checker.check_solution(
+            solution)
+        if not is_valid:
+            print('\n----------------- Testcase invalid -----------------')
+            return None
+
+        if len(infinite_streams) > 0:
+            print('\n----------------- Unsolvable streams found -----------------')
+            for uid in infinite_streams:
+                print(uid + ' ', end='')
+            print('')
+
+        initial_cost = cost_checker.cost(solution)
+        initial_port_costs = cost_checker.port_costs(solution)
+        final_wcds = initial_wcds
+        iteration_data = []
+        initial_nr_of_stream_tobesolved = len(exceeding_percentages)
+        sum = 0
+        for tuple in exceeding_percentages:
+            sum = sum + tuple[0]
+        if len(exceeding_percentages) > 0:
+            initial_ep_mean = sum / len(exceeding_percentages)
+        else:
+            initial_ep_mean = 0
+
+        worklist = StreamWorklist(options['max_stream_fixes'])
+        worklist.update(exceeding_percentages)
+        i = 0
+
+        if not is_feasible:
+            # OUTPUT
+            iteration_data.append(
+                generate_iteration_data_tuple_and_output(exceeding_percentages, final_wcds, cost_checker, solution,
+                                                         infinite_streams))
+
+    def write_checkpoint():
+        save_checkpoint(checkpoint_path, {
+            'testcase': solution.name, 'initial_windows': initial_solution.snapshot_windows(),
+            'windows': solution.snapshot_windows(), 'search_state': get_search_state(solution),
+            'runtime': time.perf_counter() - t_start, 'is_feasible': is_feasible,
+            'exceeding_percentages': exceeding_percentages, 'infinite_streams': infinite_streams,
+            'initial_wcds': initial_wcds, 'final_wcds': final_wcds, 'initial_cost': initial_cost,
+            'initial_port_costs': initial_port_costs, 'iteration_data': iteration_data,
+            'initial_nr_of_stream_tobesolved': initial_nr_of_stream_tobesolved, 'initial_ep_mean': initial_ep_mean,
+            'worklist': worklist, 'i': i})
+
+    if checkpoint_path is not None and checkpoint is None:
+        write_checkpoint()
+    t_checkpoint = time.perf_counter()
+
+    # Best solution so far, returned if the time budget is exhausted
+    best_violation = get_violation(exceeding_percentages, infinite_streams)
+    best_windows = solution.snapshot_windows()
+    budget_exhausted = False
 
     ##### 1. Algorithm #####
-    if not is_feasible:
-        # OUTPUT
+    while len(worklist) > 0 and not is_feasible:
+        if options['deadline'] is not None and time.time() >= options['deadline']:
+            budget_exhausted = True
+            break
 
+        print('Checking tuple ' + str(i))
+        i = i + 1
+
+        # Currently worst exceeding stream
+        stream_uid = worklist.pop()
+        group = [stream_uid]
+        if options['lockstep'] and options['search_arity'] <= 1:
+            # Fix the following exceeding streams without shared ports together with this one
+            group = group_port_disjoint_streams(solution, [stream_uid] + worklist.get_ranking())[0]
+            worklist.remove(group[1:])
+        print('Fixing ' + ', '.join(group) + ': ', end='')
+
+        # Optimize Streams
+        if options['search_arity'] > 1:
+            solution = optimize_ports_for_stream_kary(solution, solution.streams[stream_uid], solution_checker,
+                                                      options['search_arity'], bounds_checker, options['deadline'])
+        else:
+            solution = optimize_ports_for_streams(solution, [solution.streams[uid] for uid in group],
+                                                  solution_checker, bounds_checker, options['deadline'])
+
+        # Check new solution, also if the fix was interrupted by the time budget
+        is_valid, is_feasible, exceeding_percentages, final_wcds, infinite_streams = solution_checker.check_solution(
+            solution)
+        if options['deadline'] is not None and time.time() >= options['deadline']:
+            # Fix may have been interrupted, it is repeated after --resume
+            worklist.requeue(group, exceeding_percentages)
+            budget_exhausted = True
+        else:
+            worklist.update(exceeding_percentages)
+        violation = get_violation(exceeding_percentages, infinite_streams)
+        if violation < best_violation:
+            best_violation = violation
+            best_windows = solution.snapshot_windows()
+
+        # OUTPUT
         iteration_data.append(
-            generate_iteration_data_tuple_and_output(exceeding_percentages, final_wcds, cost_checker, solution,
-                                                     infinite_streams))
-        i = 0
-        # ALGORITHM
-        for tuple in exceeding_percentages:
-            print('Checking tuple ' + str(i))
-            i = i + 1
-            # STATISTICS
-            # Check if stream still exceeding (Might have been fixed by fixing other stream)
-            for t in exceeding_percentages:
-                if t[1] == tuple[1]:
-                    stream_uid = tuple[1]
-                    print('Fixing ' + stream_uid + ': ', end='')
-
-                    # Optimize Stream
-                    stream = solution.streams[stream_uid]
-                    solution = optimize_ports_for_stream(solution, stream, solution_checker)
-
-                    # Check new solution
-                    is_valid, is_feasible, exceeding_percentages, final_wcds, infinite_streams = solution_checker.check_solution(
-                        solution)
-
-                    # OUTPUT
-                    iteration_data.append(
-                        generate_iteration_data_tuple_and_output(exceeding_percentages, final_wcds, cost_checker,
-                                                                 solution, infinite_streams))
-                    break
-
-            if is_feasible:
-                break
+            generate_iteration_data_tuple_and_output(exceeding_percentages, final_wcds, cost_checker,
+                                                     solution, infinite_streams))
+
+        if budget_exhausted:
+            break
+
+        if checkpoint_path is not None and time.perf_counter() - t_checkpoint >= options['checkpoint_interval']:
+            write_checkpoint()
+            t_checkpoint = time.perf_counter()
+
+    if budget_exhausted:
+        print('\n----------------- Time budget exhausted -----------------')
+        if checkpoint_path is not None:
+            # Continue with --resume
+            write_checkpoint()
+        solution.restore_windows(best_windows)
 
     cost = cost_checker.cost(solution)
     final_port_costs = cost_checker.port_costs(solution)
-    runtime = time.clock() - t_start
+    runtime = time.perf_counter() - t_start
     final_step_amount = len(iteration_data)
     is_valid, is_feasible, exceeding_percentages, final_wcds, infinite_streams = solution_checker.check_solution(
         solution)
     print('\n----------------- Solved with cost: {} Infeasible streams: {} -----------------'.format(cost, len(
         infinite_streams + exceeding_percentages)))
 
+    performance_counters = dict(cost_checker.statistics)
+    performance_counters.update(solution_checker.get_statistics())
+    if bounds_checker is not None:
+        performance_counters.update(bounds_checker.statistics)
     output_data = OutputData(initial_solution, solution, initial_wcds, final_wcds, runtime, initial_cost, cost,
                              initial_port_costs, final_port_costs, iteration_data, infinite_streams,
-                             exceeding_percentages, initial_nr_of_stream_tobesolved, final_step_amount, initial_ep_mean)
+                             exceeding_percentages, initial_nr_of_stream_tobesolved, final_step_amount, initial_ep_mean,
+                             performance_counters, budget_exhausted)
     return output_data
 
 
@@ -244,13 +532,21 @@ class IterativeOptimizer(object):
         initial_solution = create_initial_solution(testcase)
 
         # Optimization
-        output_data = divideconquer_optimization(initial_solution, options, CostChecker(),
-                                                 SolutionChecker(wcdtool_path, wcdtool_testcase_subpath, options['wcdanalysis_timeout']))
+        checkpoint_path = get_checkpoint_path(output_folder, testcase.name)
+        solution_checker = create_solution_checker(wcdtool_path, wcdtool_testcase_subpath, options)
+        try:
+            output_data = divideconquer_optimization(initial_solution, options,
+                                                     CostChecker(options['occupation_memory_limit']), solution_checker,
+                                                     checkpoint_path, options['resume'])
+        finally:
+            solution_checker.close()
 
         # Output Results
         if output_data != None:
             self.generate_output(output_data, output_folder, 'IterativeOptimization', options)
-            return copy.deepcopy(output_data.final_solution)
+            if not output_data.budget_exhausted:
+                remove_checkpoint(checkpoint_path)
+            return output_data.final_solution.fork()
         else:
             return None
 
@@ -285,7 +581,7 @@ class IterativeOptimizer(object):
                          output_data)
 
         if options['aggregate'] is True:
-            append_to_collections(output_folder, output_data)
+            get_results_store(output_folder).add(output_data, optimization_type_string)
 
         if options['visualize'] is True:
             render_bar_graph(output_folder + subfolder + "{}.png".format('INITIAL_deadline_and_wcd_graph'),
@@ -0,0 +1,78 @@
+import heapq
+
+
+class StreamWorklist(object):
+    """Exceeding streams ordered by exceeding percentage, worst first. Updated from every check of the solution, so
+    streams broken again by fixing other streams are fixed again, up to max_fixes times each"""
+
+    def __init__(self, max_fixes: int):
+        """
+
+        Args:
+            max_fixes (int): Maximum number of times a stream is popped
+        """
+        self.max_fixes = max_fixes
+        self.fixes = {}  # Map(stream uid, number of times popped)
+        self._heap = []  # Heap of (-exceeding percentage, stream uid)
+
+    def update(self, exceeding_percentages: list):
+        """
+        Replaces the worklist by the currently exceeding streams.
+
+        Args:
+            exceeding_percentages (list): List of tuples (exceeding percentage, stream uid), as returned by
+                SolutionChecker.check_solution
+        """
+        self._heap = [(-percentage, uid) for percentage, uid in exceeding_percentages
+                      if self.fixes.get(uid, 0) < self.max_fixes]
+        heapq.heapify(self._heap)
+
+    def pop(self):
+        """
+
+        Returns:
+            Uid of the currently worst exceeding stream. None if empty
+        """
+        if len(self._heap) == 0:
+            return None
+        _, uid = heapq.heappop(self._heap)
+        self.fixes[uid] = self.fixes.get(uid, 0) + 1
+        return uid
+
+    def remove(self, uids: list):
+        """
+        Removes streams, e.g. fixed together with a popped one. Counts as popped.
+
+        Args:
+            uids (list): Uids of streams
+        """
+        uids = set(uids)
+        for uid in uids:
+            self.fixes[uid] = self.fixes.get(uid, 0) + 1
+        self._heap = [entry for entry in self._heap if entry[1] not in uids]
+        heapq.heapify(self._heap)
+
+    def requeue(self, uids: list, exceeding_percentages: list):
+        """
+        Undoes counting popped streams as popped, e.g. if their fix was interrupted, and replaces the worklist by the
+        currently exceeding streams.
+
+        Args:
+            uids (list): Uids of popped streams
+            exceeding_percentages (list): List of tuples (exceeding percentage, stream uid), as returned by
+                SolutionChecker.check_solution
+        """
+        for uid in set(uids):
+            self.fixes[uid] -= 1
+        self.update(exceeding_percentages)
+
+    def get_ranking(self):
+        """
+
+        Returns:
+            Uids of all streams in the worklist, worst first
+        """
+        return [uid for _, uid in sorted(self._heap)]
+
+    def __len__(self):
+        return len(self._heap)
@@ -1,14 +1,23 @@
-import os
+import multiprocessing
 import re
-import subprocess
 import time
-from collections import defaultdict, OrderedDict
+from collections import defaultdict, OrderedDict, Counter
 from operator import itemgetter
 
 from data_structures import TestCase
+from wcd.backends import WCDBackend, TSNNetCalBackend, create_backend, serialize_gcl, add_hit_rate, BACKEND_TSNNETCAL
 
 DEBUG = False
 
+# Extra time a worker gets for a check on top of the WCD analysis timeout, in seconds
+CHECK_TIMEOUT_MARGIN = 5
+
+# Number of times a timed out check of check_solutions is repeated, before it is invalid
+CHECK_TIMEOUT_RETRIES = 1
+
+# SolutionChecker of a worker process of SolutionChecker.check_solutions
+_worker_checker = None
+
 
 def debug_print(s, end='\n'):
     if DEBUG:
@@ -28,124 +37,182 @@ def is_actually_infinity(stream_uid, streams, infinite_queues):
         i = i + 1
     return False
 
+def init_worker(checker):
+    global _worker_checker
+    _worker_checker = checker
+
+
+def check_in_worker(s: TestCase):
+    """
+
+    Args:
+        s (TestCase): Solution to be checked
+
+    Returns:
+        Result of SolutionChecker.check_solution, Counter of backend statistics gathered during the check
+    """
+    before = get_counts(_worker_checker.backend.get_statistics())
+    result = _worker_checker.check_solution(s)
+    after = get_counts(_worker_checker.backend.get_statistics())
+    return result, after - before
+
+
+def get_counts(statistics: dict):
+    """
+
+    Args:
+        statistics (dict): Dict(counter name, value)
+
+    Returns:
+        Counter of all integer counters in statistics (rates are left out, since they can't be summed up)
+    """
+    return Counter({k: v for k, v in statistics.items() if isinstance(v, int)})
+
+
+def invalid_result():
+    """
+
+    Returns:
+        Result of SolutionChecker.check_solution for a solution without valid WCD analysis
+    """
+    return False, False, [], OrderedDict(), []
+
+
+def create_solution_checker(wcdtool_path: str, wcdtool_testcase_subpath: str, options: dict):
+    """
+
+    Args:
+        wcdtool_path (str): Path to WCDTool executable
+        wcdtool_testcase_subpath (str): Relative path from WCDTool executable to testcase folder
+        options (dict): directory of options specified by user
+
+    Returns:
+        SolutionChecker configured by options
+    """
+    if options['wcd_backend'] == BACKEND_TSNNETCAL and options['wcd_sandboxes'] < options['wcd_workers']:
+        print('Warning: Only {} of {} workers can run TSNNetCal at the same time, increase [wcdtool] sandboxes'.format(
+            options['wcd_sandboxes'], options['wcd_workers']))
+    return SolutionChecker(wcdtool_path, wcdtool_testcase_subpath, options['wcdanalysis_timeout'],
+                           backend=create_backend(wcdtool_path, wcdtool_testcase_subpath, options),
+                           workers=options['wcd_workers'], job_timeout=options['wcd_job_timeout'])
+
+
 class SolutionChecker(object):
     """Checks solutions represented by TestCase objects and returns their feasibility and if infeasible the exceeding
     percentages of streams """
 
-    def __init__(self, wcdtool_path: str, wcdtool_testcase_subpath: str, wcdanalysis_timeout: int):
+    def __init__(self, wcdtool_path: str, wcdtool_testcase_subpath: str, wcdanalysis_timeout: int,
+                 backend: WCDBackend = None, workers: int = 1, job_timeout: float = None):
         """
 
         Args:
             wcdtool_path (str): Path to WCDTool executable
             wcdtool_testcase_subpath (str): Relative path from WCDTool executable to testcase folder
             wcdanalysis_timeout (int): Timeout in seconds
+            backend (WCDBackend): WCD analysis to use. TSNNetCal if None
+            workers (int): Number of worker processes of check_solutions
+            job_timeout (float): Timeout of a single check of check_solutions in seconds. wcdanalysis_timeout +
+                CHECK_TIMEOUT_MARGIN if None
         """
         self.wcdtool_testcase_subpath = wcdtool_testcase_subpath
         self.wcdtool_path = wcdtool_path
         self.timeout = wcdanalysis_timeout
 
-    def serialize_solution(self, s: TestCase):
+        if backend is None:
+            backend = TSNNetCalBackend(wcdtool_path, wcdtool_testcase_subpath)
+        self.backend = backend
+
+        self.workers = workers
+        if job_timeout is None:
+            job_timeout = wcdanalysis_timeout + CHECK_TIMEOUT_MARGIN
+        self.job_timeout = job_timeout
+        self.statistics = Counter()
+        self.worker_statistics = Counter()
+        self._pool = None
+
+    def __getstate__(self):
+        # Worker pools can't be pickled (e.g. for the workers themselves)
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+    def get_statistics(self):
         """
 
-        Args:
-            s (TestCase): Solution to be serialized
+        Returns:
+            Dict(counter name, value) of the WCD backend (including its workers), e.g. cache hits
+        """
+        statistics = dict(self.backend.get_statistics())
+        statistics.update(get_counts(statistics) + self.worker_statistics)
+        statistics.update(self.statistics)
+        return add_hit_rate(statistics)
+
+    def get_pool(self):
+        """
 
         Returns:
-            The lines written to historySCHED1 (GCL) file
+            Pool of worker processes, created if not existant
         """
-        switches = s.switches
-        tc_name = s.name
-
-        # Write rate.txt if not existant
-        if not os.path.exists(
-                "{}\\in\\{}".format(self.wcdtool_path + self.wcdtool_testcase_subpath + tc_name, 'rate.txt')):
-            rate = open("{}\\in\\{}".format(self.wcdtool_path + self.wcdtool_testcase_subpath + tc_name, 'rate.txt'),
-                        'w+')
-            rate.write('# link rate, integrationMode, bandwidthFractionA, bandwidthFractionB\n1000')
-            rate.close()
-
-        # Write historySCHED1.txt if available
-        historySCHED1 = open(
-            "{}\\in\\{}".format(self.wcdtool_path + self.wcdtool_testcase_subpath + tc_name, 'historySCHED1.txt'),
-            'w+')
-        lines = ['#open time, close time, period, priority\n']
-
-        for switch in switches.values():
-            for dest_name in switch.output_ports.keys():
-                port = switch.output_ports[dest_name]
-                lines.append('{},{}\n'.format(switch.uid, dest_name))
-
-                i = 0
-                for priority in port.get_sorted_queuenrs():
-                    row = port._M_Windows[i]
-                    offset = row[0]
-                    end = row[1]
-                    period = row[2]
-                    lines.append(
-                        '{}\t{}\t{}\t{}\n'.format(offset, end, period,
-                                                  priority))
-                    i += 1
-
-                lines.append('\n')
-
-        historySCHED1.write(''.join(lines))
-        historySCHED1.write('#')  # comment out last line, since no empty last line is allowed
-        historySCHED1.close()
-        return lines
-
-    def read_wcd_output(self, tc_name: str, timeout: int):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.workers, initializer=init_worker, initargs=(self,))
+        return self._pool
+
+    def close(self):
+        """
+        Terminates the worker processes of check_solutions.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def check_solutions(self, candidates: list):
         """
+        Checks several solutions in parallel by the worker processes. A check that does not finish within job_timeout
+        is repeated CHECK_TIMEOUT_RETRIES times on new workers, then it is invalid. Other checks are not interrupted.
 
         Args:
-            tc_name (str): Name of testcase
-            timeout (int): timeout for waiting for result of wcd-analysis, in seconds
+            candidates (list): List of TestCase objects (e.g. the same testcase with different windows)
 
         Returns:
-            List of worst-case E2E delay string, List of worst-case port delay strings
+            List of the results of check_solution in the order of candidates
         """
-        wce2edelay_list = []
-        wcportdelay_list = []
-
-        try:
-            proc = subprocess.run(
-                args=[self.wcdtool_path + 'TSNNetCal.exe', "{}".format(self.wcdtool_testcase_subpath + tc_name)],
-                stdout=subprocess.PIPE, timeout=timeout)
-            if str(proc.stdout).startswith('b\'OK') or str(proc.stdout).startswith('b\'Create object failed!'):
-                # SUCCESS
-                wcportdelay_file_path = "{}\\out\\{}".format(
-                    self.wcdtool_path + self.wcdtool_testcase_subpath + tc_name,
-                    'TmpWCPortDelay.txt')
-                wce2edelay_file_path = "{}\\out\\{}".format(self.wcdtool_path + self.wcdtool_testcase_subpath + tc_name,
-                                                            'WCEndtoEndDelay.txt')
-
-                # Read Port Delays
-                t = time.time()
-                while not os.path.exists(wcportdelay_file_path) or time.time() - t > 15:
-                    time.sleep(0.01)
-                wcportdelay_file = open(wcportdelay_file_path, 'r')
-
-                for line in wcportdelay_file:
-                    wcportdelay_list.append(line)
-
-                wcportdelay_file.close()
-
-                # Read E2E Delays
-                t = time.time()
-                while not os.path.exists(wce2edelay_file_path) or time.time() - t > 15:
-                    time.sleep(0.01)
-                wce2edelay_file = open(wce2edelay_file_path, 'r')
-
-                for line in wce2edelay_file:
-                    wce2edelay_list.append(line)
-
-                wce2edelay_file.close()
-            else:
-                print('TSNNetCal returned unexpected result')
-                # print(proc.stdout.decode("utf-8"))
-        except subprocess.TimeoutExpired:
-            print('TSNNetCal Timeout')
-
-        return wce2edelay_list, wcportdelay_list
+        if self.workers <= 1 or len(candidates) <= 1:
+            return [self.check_solution(s) for s in candidates]
+
+        results = [None] * len(candidates)
+        timeouts = Counter()  # Map(candidate index, number of timeouts)
+        pending = list(range(len(candidates)))
+        while len(pending) > 0:
+            pool = self.get_pool()
+            async_results = [(i, pool.apply_async(check_in_worker, (candidates[i],))) for i in pending]
+            self.statistics['wcd_parallel_checks'] += len(pending)
+            t_start = time.time()
+            pending = []
+            hanging_workers = 0
+
+            for k, (i, async_result) in enumerate(async_results):
+                # Worst case all checks before run on the workers that are not hanging
+                deadline = t_start + self.job_timeout * (k // max(self.workers - hanging_workers, 1) + 1)
+                try:
+                    results[i], statistics = async_result.get(max(0, deadline - time.time()))
+                    self.worker_statistics.update(statistics)
+                except multiprocessing.TimeoutError:
+                    print('Solution check timeout')
+                    self.statistics['wcd_job_timeouts'] += 1
+                    hanging_workers += 1
+                    timeouts[i] += 1
+                    if timeouts[i] <= CHECK_TIMEOUT_RETRIES:
+                        self.statistics['wcd_job_retries'] += 1
+                        pending.append(i)
+                    else:
+                        results[i] = invalid_result()
+
+            if hanging_workers > 0:
+                # All other checks are done. Hanging workers can't be stopped otherwise
+                self.close()
+
+        return results
 
     def check_solution(self, s: TestCase):
         """
@@ -158,18 +225,14 @@ class SolutionChecker(object):
         (Percentage(float), stream uid(str)), OrderedDict(stream uid, wcd (e2e) as string)
         """
         streams = s.streams
-        tc_name = s.name
 
         infeasible_streams_percentages = []
         wcd_dict = OrderedDict()
         infinite_streams = []
         infinite_queues = {} # Map(portstring, list of priorities)
 
-        # Serialize Solution & Run Tool
-        written_lines = self.serialize_solution(s)
-        # DEBUG
-        debug_print('Solution serialized')
-        wce2elist, wcportdelay_list = self.read_wcd_output(tc_name, self.timeout)
+        # Run WCD analysis
+        wce2elist, wcportdelay_list = self.backend.analyze(s, self.timeout)
 
         debug_print('Windows: ', end='')
         for sw in s.switches.values():
@@ -181,7 +244,7 @@ class SolutionChecker(object):
             match = re.search('(.*): (.*), priority (\d)', line)
             debug_print('{}; '.format(line[:-13]), end='')
             if match is not None:
-                if match.group(2) is "0":
+                if match.group(2) == "0":
                     if match.group(1) in infinite_queues.keys():
                         infinite_queues[match.group(1)].append(int(match.group(3)))
                     else:
@@ -222,7 +285,7 @@ class SolutionChecker(object):
         if not valid:
             # DEBUG
             debug_print('### Written Window File ###')
-            for l in written_lines:
+            for l in serialize_gcl(s):
                 debug_print(l, end='')
             debug_print(
                 '### E2E Delays ###\n{}\n### Port Delays ###\n{}'.format(''.join(wce2elist), ''.join(wcportdelay_list)))
@@ -4,14 +4,14 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 from optimizers.iterative_optimizer import OutputData
+from utility.results_store import ResultsStore, RESULTS_FILE_NAME
 
 
-def plot_costvswcd(filename, output_data):
+def plot_costvswcd(filename, iteration_data, final_port_costs):
     average_costs = []
     wcd_sum = []
     iterations = []
-    iteration_data = output_data[9]
-    nr_of_ports = len(output_data[8].keys())
+    nr_of_ports = len(final_port_costs.keys())
 
     i = 0
     for tuple in iteration_data:
@@ -39,8 +39,7 @@ def plot_costvswcd(filename, output_data):
     fig.savefig(filename)
     #plt.show()
 
-def plot_solved_streams(filename, output_data):
-    iteration_data = output_data[9]
+def plot_solved_streams(filename, iteration_data):
     solved_streams = []
     iterations = []
     i = 0
@@ -126,6 +125,23 @@ def render_bar_graph(filename: str, output_data, final: bool):
     fig.tight_layout()
     plt.savefig(filename)
 
+def plot_results_store(output_folder, optimizer='IterativeOptimization'):
+    """
+    Plots cost vs. wcd and solved streams of the latest run of every testcase in the results store (-a) of the
+    output folder
+
+    Args:
+        output_folder (str): Path to output folder
+        optimizer (str): Optimization type of the runs
+    """
+    rows = {}
+    for row in ResultsStore(output_folder + RESULTS_FILE_NAME).query(optimizer=optimizer):
+        rows[row['testcase']] = row  # Ordered by run, keeps latest
+
+    for name, row in rows.items():
+        plot_costvswcd('costvswcd_' + name, row['iteration_data'], row['final_port_costs'])
+        plot_solved_streams('solvedstreams_' + name, row['iteration_data'])
+
 def plot_boxplot(final_port_costs1, final_port_costs2, final_port_costs3):
 
     costs1 = []
@@ -185,10 +201,10 @@ render_bar_graph('bargraph_orion_final', output_data[1], True)
 
 
 for i in range(len(names)):
-    plot_costvswcd('costvswcd_' + names[i], output_data[i])
+    plot_costvswcd('costvswcd_' + names[i], output_data[i][9], output_data[i][8])
 
 for i in range(len(names)):
-    plot_solved_streams('solvedstreams_' + names[i], output_data[i])
+    plot_solved_streams('solvedstreams_' + names[i], output_data[i][9])
 
 
 
@@ -0,0 +1,169 @@
+import os
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from unittest import TestCase
+
+from solution_check import SolutionChecker
+from unit_tests.test_network_calculus import create_one_route_three_flows
+from wcd.backends import NetworkCalculusBackend, RecordBackend, ReplayBackend, RecordStore, create_backend, \
+    TSNNetCalBackend, CachedBackend, wait_for_files, get_analysis_key
+from wcd.cache import WCDResultCache
+
+
+class TestBackends(TestCase):
+    def test_record_replay(self):
+        store_dir = tempfile.TemporaryDirectory()
+        store = RecordStore(store_dir.name)
+
+        tc = create_one_route_three_flows(48)
+        recorded = RecordBackend(NetworkCalculusBackend(), store).analyze(tc, 20)
+
+        replay = ReplayBackend(store, NetworkCalculusBackend())
+        self.assertEqual(recorded, replay.analyze(tc, 20))
+        self.assertEqual(SolutionChecker('', '', 20, backend=NetworkCalculusBackend()).check_solution(tc),
+                         SolutionChecker('', '', 20, backend=replay).check_solution(tc))
+
+        # Recorded with other timeout or other streams -> not replayed
+        self.assertEqual(([], []), replay.analyze(tc, 30))
+        other_tc = create_one_route_three_flows(48, deadline1=600)
+        self.assertEqual(([], []), replay.analyze(other_tc, 20))
+
+        # Not recorded schedule -> invalid
+        tc.switches['SW1'].output_ports['SW2'].set_period_for_all(100)
+        is_valid, _, _, _, _ = SolutionChecker('', '', 20, backend=replay).check_solution(tc)
+        self.assertEqual(False, is_valid)
+
+        store_dir.cleanup()
+
+    def test_create_backend(self):
+        options = {'wcd_backend': 'tsnnetcal', 'wcd_record_store': '', 'wcd_cache': '', 'wcd_sandboxes': 2}
+        self.assertEqual(True, isinstance(create_backend('', '', options), TSNNetCalBackend))
+
+        options = {'wcd_backend': 'networkcalculus', 'wcd_record_store': 'records', 'wcd_cache': '',
+                   'wcd_incremental': False}
+        backend = create_backend('', '', options)
+        self.assertEqual(True, isinstance(backend, RecordBackend))
+        self.assertEqual(True, isinstance(backend.backend, NetworkCalculusBackend))
+
+        options = {'wcd_backend': 'networkcalculus', 'wcd_record_store': '', 'wcd_cache': 'cache.sqlite',
+                   'wcd_cache_max_size': 1024, 'wcd_incremental': True}
+        backend = create_backend('', '', options)
+        self.assertEqual(True, isinstance(backend, CachedBackend))
+        self.assertEqual(True, isinstance(backend.backend, NetworkCalculusBackend))
+
+        options = {'wcd_backend': 'replay', 'wcd_record_store': 'records', 'wcd_cache': '',
+                   'wcd_replay_backend': 'networkcalculus', 'wcd_incremental': True}
+        backend = create_backend('', '', options)
+        self.assertEqual(True, isinstance(backend, ReplayBackend))
+        self.assertEqual(True, isinstance(backend.backend, NetworkCalculusBackend))
+
+    def test_analysis_key(self):
+        wcdtool_dir = tempfile.TemporaryDirectory()
+        tc = create_one_route_three_flows(48)
+
+        # Stage testcase like input_parser.parse_testcase
+        in_folder = os.path.join(wcdtool_dir.name, 'usecases', tc.name, 'in')
+        os.makedirs(in_folder)
+        for file_name in ['msg.txt', 'vls.txt']:
+            with open(os.path.join(in_folder, file_name), 'w') as f:
+                f.write(file_name)
+
+        def get_key():
+            # New backend, since the inputs are staged once per backend
+            return get_analysis_key(TSNNetCalBackend(wcdtool_dir.name, 'usecases'), tc, 20)
+
+        key = get_key()
+        self.assertEqual(key, get_key())
+        self.assertEqual(key, CachedBackend(TSNNetCalBackend(wcdtool_dir.name, 'usecases'), None).get_key(tc, 20))
+        self.assertNotEqual(key, get_analysis_key(TSNNetCalBackend(wcdtool_dir.name, 'usecases'), tc, 30))
+        self.assertNotEqual(key, get_analysis_key(NetworkCalculusBackend(), tc, 20))
+
+        # Real input files, not the parsed testcase
+        with open(os.path.join(in_folder, 'msg.txt'), 'a') as f:
+            f.write('#')
+        self.assertNotEqual(key, get_key())
+        key = get_key()
+
+        # Link rate of the testcase instead of the default
+        with open(os.path.join(in_folder, 'rate.txt'), 'w') as f:
+            f.write('# link rate, integrationMode, bandwidthFractionA, bandwidthFractionB\n100')
+        self.assertNotEqual(key, get_key())
+
+        wcdtool_dir.cleanup()
+
+    def test_cache(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        cache = WCDResultCache(os.path.join(cache_dir.name, 'cache.sqlite'), 1024 * 1024)
+
+        tc = create_one_route_three_flows(48)
+        checker = SolutionChecker('', '', 20, backend=CachedBackend(NetworkCalculusBackend(), cache))
+        result = checker.check_solution(tc)
+        self.assertEqual(result, checker.check_solution(tc))
+        statistics = checker.get_statistics()
+        self.assertEqual((1, 1, 0.5), (statistics['wcd_cache_hits'], statistics['wcd_cache_misses'],
+                                       statistics['wcd_cache_hit_rate']))
+
+        # Other schedule -> miss
+        tc.switches['SW1'].output_ports['SW2'].set_period_for_all(100)
+        checker.check_solution(tc)
+        self.assertEqual(2, checker.get_statistics()['wcd_cache_misses'])
+
+        # Persisted for later runs
+        cache = WCDResultCache(os.path.join(cache_dir.name, 'cache.sqlite'), 1024 * 1024)
+        self.assertEqual(2, len(cache))
+        checker = SolutionChecker('', '', 20, backend=CachedBackend(NetworkCalculusBackend(), cache))
+        checker.check_solution(tc)
+        self.assertEqual(1, checker.get_statistics()['wcd_cache_hits'])
+
+        # Least recently used result is evicted if too large
+        cache.max_size = 1
+        cache.put('key', ['e2e'], ['port'])
+        self.assertEqual(0, len(cache))
+        cache.get_connection().close()
+
+        cache_dir.cleanup()
+
+    def test_wait_for_files(self):
+        folder = tempfile.TemporaryDirectory()
+        path = os.path.join(folder.name, 'WCEndtoEndDelay.txt')
+
+        t = time.time()
+        self.assertEqual(False, wait_for_files([path], 0.1))
+        self.assertLess(time.time() - t, 5)
+
+        threading.Timer(0.05, lambda: open(path, 'w').close()).start()
+        self.assertEqual(True, wait_for_files([path], 5))
+
+        folder.cleanup()
+
+    @unittest.skipUnless(os.name == 'posix', 'fake TSNNetCal is a shell script')
+    def test_tsnnetcal_backend(self):
+        wcdtool_dir = tempfile.TemporaryDirectory()
+        tc = create_one_route_three_flows(48)
+        wce2edelay_list, wcportdelay_list = NetworkCalculusBackend().analyze(tc, 20)
+
+        # Stage testcase like input_parser.parse_testcase
+        in_folder = os.path.join(wcdtool_dir.name, 'usecases', tc.name, 'in')
+        os.makedirs(in_folder)
+        for file_name in ['msg.txt', 'vls.txt']:
+            open(os.path.join(in_folder, file_name), 'w').close()
+
+        # Fake TSNNetCal writing the delays of the network calculus analysis
+        for file_name, lines in [('WCEndtoEndDelay.txt', wce2edelay_list), ('TmpWCPortDelay.txt', wcportdelay_list)]:
+            with open(os.path.join(wcdtool_dir.name, file_name), 'w') as f:
+                f.write(''.join(lines))
+        exe_path = os.path.join(wcdtool_dir.name, 'TSNNetCal.exe')
+        with open(exe_path, 'w') as f:
+            f.write('#!/bin/sh\ncd "$(dirname "$0")"\ncp WCEndtoEndDelay.txt TmpWCPortDelay.txt "$1/out/"\necho OK\n')
+        os.chmod(exe_path, os.stat(exe_path).st_mode | stat.S_IEXEC)
+
+        backend = TSNNetCalBackend(wcdtool_dir.name, 'usecases')
+        self.assertEqual((wce2edelay_list, wcportdelay_list), backend.analyze(tc, 20))
+        statistics = backend.get_statistics()
+        self.assertEqual(1, statistics['wcd_runs'])
+        self.assertEqual(True, all(k in statistics for k in ['wcd_run_ms', 'wcd_wait_ms', 'wcd_parse_ms']))
+
+        wcdtool_dir.cleanup()
@@ -0,0 +1,32 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from utility.batch_runner import run_jobs, JOB_SUCCESSFUL, JOB_FAILED, JOB_CRASHED, JOB_TIMEOUT
+
+
+def job(mode: str):
+    print('Running ' + mode)
+    if mode == 'crash':
+        raise RuntimeError('Crash')
+    if mode == 'abort':
+        os._exit(-1)
+    if mode == 'hang':
+        time.sleep(60)
+    return mode == 'success'
+
+
+class TestBatchRunner(TestCase):
+    def test_run_jobs(self):
+        modes = ['success', 'fail', 'crash', 'abort', 'hang', 'success']
+        with tempfile.TemporaryDirectory() as folder:
+            jobs = [(mode, (mode,), os.path.join(folder, 'logs', '{}_{}.log'.format(i, mode)))
+                    for i, mode in enumerate(modes)]
+            statuses = run_jobs(job, jobs, 3, timeout=2)
+
+            with open(os.path.join(folder, 'logs', '0_success.log')) as f:
+                self.assertEqual('Running success\n', f.read())
+
+        self.assertEqual([JOB_SUCCESSFUL, JOB_FAILED, JOB_CRASHED, JOB_CRASHED, JOB_TIMEOUT, JOB_SUCCESSFUL],
+                         statuses)
@@ -0,0 +1,65 @@
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+from unittest import TestCase, skipIf
+
+from unit_tests.test_results_store import create_output_data
+from utility.batch_state import get_fingerprint, is_completed, mark_completed
+from utility.results_store import ResultsStore, RESULTS_FILE_NAME, get_results_store
+
+
+class TestBatchState(TestCase):
+    def test_completed(self):
+        options = {'cp': None, 'search_arity': 1, 'jobs': 2, 'resume': True}
+        with tempfile.TemporaryDirectory() as folder:
+            for ending in ['streams', 'vls']:
+                shutil.copyfile(os.path.join('test_cases', 'test_batch_1', 'complex_test_1.' + ending),
+                                os.path.join(folder, 'complex_test_1.' + ending))
+            test_case_path = os.path.join(folder, 'complex_test_1.streams')
+            output_folder = os.path.join(folder, 'output')
+            fingerprint = get_fingerprint(test_case_path, options)
+
+            self.assertEqual(False, is_completed(output_folder, 'complex_test_1', fingerprint))
+            mark_completed(output_folder, 'complex_test_1', fingerprint)
+            self.assertEqual(True, is_completed(output_folder, 'complex_test_1', fingerprint))
+
+            # Options that don't change the results
+            self.assertEqual(fingerprint, get_fingerprint(test_case_path, dict(options, jobs=4, resume=False)))
+
+            # Changed options or inputs
+            self.assertEqual(False, is_completed(output_folder, 'complex_test_1',
+                                                 get_fingerprint(test_case_path, dict(options, search_arity=3))))
+            with open(os.path.join(folder, 'complex_test_1.vls'), 'a') as f:
+                f.write('\n')
+            self.assertEqual(False, is_completed(output_folder, 'complex_test_1',
+                                                 get_fingerprint(test_case_path, options)))
+
+
+def complete_testcases_and_die(output_folder: str):
+    # Like a sequential -a batch killed (e.g. out of memory) during its third testcase
+    for name in ['Testcase0', 'Testcase1']:
+        get_results_store(output_folder).add(create_output_data(name), 'IterativeOptimization')
+        mark_completed(output_folder, name, 'fingerprint')
+    get_results_store(output_folder).add(create_output_data('Testcase2'), 'IterativeOptimization')
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@skipIf(not hasattr(signal, 'SIGKILL'), 'SIGKILL not available')
+class TestBatchStateKilled(TestCase):
+    def test_killed_between_testcases(self):
+        with tempfile.TemporaryDirectory() as folder:
+            process = multiprocessing.Process(target=complete_testcases_and_die, args=(folder,))
+            process.start()
+            process.join()
+            self.assertEqual(-signal.SIGKILL, process.exitcode)
+
+            store = ResultsStore(os.path.join(folder, RESULTS_FILE_NAME))
+            completed = [name for name in ['Testcase0', 'Testcase1', 'Testcase2']
+                         if is_completed(folder, name, 'fingerprint')]
+            stored = [row['testcase'] for row in store.query()]
+            store.close()
+
+        self.assertEqual(['Testcase0', 'Testcase1'], completed)
+        self.assertEqual(['Testcase0', 'Testcase1'], stored)
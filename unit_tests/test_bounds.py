@@ -0,0 +1,101 @@
+from unittest import TestCase
+
+from optimizers.iterative_optimizer import optimize_ports_for_stream, optimize_ports_for_stream_kary
+from solution_check import SolutionChecker
+from unit_tests.test_network_calculus import create_one_route_three_flows
+from wcd.backends import NetworkCalculusBackend
+from wcd.bounds import BoundsChecker, get_lower_bound, FEASIBLE, INFEASIBLE, UNKNOWN
+
+
+class TestBounds(TestCase):
+    def test_lower_bound(self):
+        tc = create_one_route_three_flows(48)
+
+        # 3 hops of 12us, gates closed 104-48=56us on both switches
+        self.assertEqual(3 * 12 + 2 * 56, get_lower_bound(tc, tc.streams['tt1']))
+
+        tc = create_one_route_three_flows(11)
+        self.assertEqual(float('inf'), get_lower_bound(tc, tc.streams['tt1']))
+
+    def test_classify(self):
+        bounds_checker = BoundsChecker()
+
+        tc = create_one_route_three_flows(48, deadline1=100)
+        self.assertEqual(INFEASIBLE, bounds_checker.classify(tc, tc.streams['tt1']))
+
+        # Network calculus: 516.615us
+        tc = create_one_route_three_flows(48, deadline1=600)
+        self.assertEqual(FEASIBLE, bounds_checker.classify(tc, tc.streams['tt1']))
+        tc = create_one_route_three_flows(48, deadline1=500)
+        self.assertEqual(UNKNOWN, bounds_checker.classify(tc, tc.streams['tt1']))
+        self.assertEqual(UNKNOWN, BoundsChecker(use_upper_bound=False).classify(tc, tc.streams['tt1']))
+
+    def test_optimize_with_bounds(self):
+        # WCD analysis less pessimistic than network calculus, like TSNNetCal
+        tc = create_one_route_three_flows(48, deadline1=400)
+        solution_checker = SolutionChecker('', '', 20, backend=ScaledBackend(0.8))
+
+        expected = optimize_ports_for_stream(tc.fork(), tc.streams['tt1'], solution_checker)
+        bounds_checker = BoundsChecker()
+        solution = optimize_ports_for_stream(tc, tc.streams['tt1'], solution_checker, bounds_checker)
+
+        self.assertEqual(expected.snapshot_windows().tolist(), solution.snapshot_windows().tolist())
+        self.assertLess(0, bounds_checker.statistics['wcd_checks_skipped'])
+
+    def test_skipped_checks(self):
+        for arity in [1, 3]:
+            tc = create_one_route_three_flows(48, deadline1=400)
+            backend = ScaledBackend(0.8)
+            solution_checker = SolutionChecker('', '', 20, backend=backend)
+
+            def optimize(solution, bounds_checker=None):
+                if arity == 1:
+                    return optimize_ports_for_stream(solution, solution.streams['tt1'], solution_checker, bounds_checker)
+                return optimize_ports_for_stream_kary(solution, solution.streams['tt1'], solution_checker, arity,
+                                                      bounds_checker)
+
+            optimize(tc.fork())
+            checks = backend.analyses
+            backend.analyses = 0
+            bounds_checker = BoundsChecker()
+            optimize(tc, bounds_checker)
+
+            # Every analysis is either run or skipped, classifications of single streams are not counted
+            self.assertLess(0, bounds_checker.statistics['wcd_checks_skipped'])
+            self.assertEqual(backend.analyses, bounds_checker.statistics['wcd_checks_not_skipped'])
+            self.assertEqual(checks, backend.analyses + bounds_checker.statistics['wcd_checks_skipped'])
+
+    def test_optimize_with_violated_bounds(self):
+        # WCD analysis more pessimistic than network calculus: the upper bound accepts infeasible candidates
+        tc = create_one_route_three_flows(48, deadline1=400)
+        solution_checker = SolutionChecker('', '', 20, backend=ScaledBackend(1.2))
+
+        expected = optimize_ports_for_stream(tc.fork(), tc.streams['tt1'], solution_checker)
+        bounds_checker = BoundsChecker()
+        solution = optimize_ports_for_stream(tc, tc.streams['tt1'], solution_checker, bounds_checker)
+
+        self.assertNotEqual(expected.snapshot_windows().tolist(), solution.snapshot_windows().tolist())
+        _, _, exceeding_percentages, _, _ = solution_checker.check_solution(expected)
+        self.assertNotIn('tt1', [t[1] for t in exceeding_percentages])
+        _, _, exceeding_percentages, _, _ = solution_checker.check_solution(solution)
+        self.assertIn('tt1', [t[1] for t in exceeding_percentages])
+
+
+class ScaledBackend(NetworkCalculusBackend):
+    """Network calculus with E2E delays scaled by a factor, standing in for a different WCD analysis"""
+
+    def __init__(self, factor: float):
+        NetworkCalculusBackend.__init__(self)
+        self.factor = factor
+        self.analyses = 0
+
+    def analyze(self, s, timeout):
+        self.analyses += 1
+        wce2edelay_list, wcportdelay_list = NetworkCalculusBackend.analyze(self, s, timeout)
+        scaled = []
+        for line in wce2edelay_list:
+            stream, delay = line.strip().split(':')
+            if delay != 'INF':
+                delay = str(float(delay) * self.factor)
+            scaled.append('{}:{}\n'.format(stream, delay))
+        return scaled, wcportdelay_list
@@ -1,6 +1,7 @@
 from unittest import TestCase
 
 import data_structures.TestCase
+from data_structures import OutputPort as output_port
 from data_structures.Node import Switch
 from data_structures.OutputPort import OutputPort
 from data_structures.TestCase import TestCase as TC
@@ -101,3 +102,75 @@ class TestCost(TestCase):
         cc = cost_check.CostChecker()
         cp = cc.cost(tc)
         self.assertEqual(True, cp < tp)
+
+    def test_cost_recalculated_after_window_change(self):
+        p = OutputPort('ES2')
+        p.associate_stream_to_queue('tt1', 10, 100, 0)
+        p.associate_stream_to_queue('tt2', 10, 100, 1)
+        p.set_window(0, 0, 10, 100)
+        p.set_window(1, 10, 10, 100)
+
+        s1 = Switch('SW1')
+        s1.output_ports = {'ES2': p}
+
+        tc = TC({'SW1': s1}, {}, '')
+
+        cc = cost_check.CostChecker()
+        self.assertEqual(cc.cost(tc), 20 / 100)
+
+        p.set_period_for_all(50)
+        self.assertEqual(cc.cost(tc), 20 / 50)
+
+        p.set_window(1, 10, 30, 50)
+        self.assertEqual(cc.port_costs(tc)['SW1,ES2'], 40 / 50)
+
+        p._M_Windows = np.array([
+            [0, 10, 100],
+            [10, 20, 100]
+        ])
+        self.assertEqual(cc.cost(tc), 20 / 100)
+
+    def test_cost_chunked_statistics(self):
+        p = OutputPort('ES2')
+
+        M = np.array([
+            [0, 20, 80],
+            [20, 50, 90],
+            [50, 70, 100]
+        ])
+        p._M_Windows = M
+
+        s1 = Switch('SW1')
+        s1.output_ports = {'ES2': p}
+
+        tc = TC({'SW1': s1}, {}, '')
+
+        output_port.occupation_cache.clear()
+        cc = cost_check.CostChecker(memory_limit=64)
+        self.assertEqual(cc.cost(tc), p.get_occupation_percentage_binary())
+        self.assertEqual(1, cc.statistics['occupation_chunked'])
+
+    def test_port_costs_vectorized(self):
+        switches = {}
+        expected = {}
+        matrices = [
+            np.array([[0, 10, 100], [10, 20, 100]]),
+            np.array([[0, 20, 100], [10, 30, 100]]),
+            np.array([[0, 100, 100], [0, 100, 100]]),
+            np.array([[0, 10, 50], [0, 10, 65]]),
+            np.array([[0, 0, 100]]),
+        ]
+
+        for i, M in enumerate(matrices):
+            p = OutputPort('ES' + str(i))
+            p._M_Windows = M
+            s = Switch('SW' + str(i))
+            s.output_ports = {p.name: p}
+            switches[s.uid] = s
+            expected[s.uid + ',' + p.name] = p.get_occupation_percentage_binary()
+
+        tc = TC(switches, {}, '')
+
+        cc = cost_check.CostChecker()
+        self.assertEqual(cc.port_costs(tc), expected)
+        self.assertEqual(4, cc.statistics['occupation_vectorized'])
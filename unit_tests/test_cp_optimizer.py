@@ -0,0 +1,49 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from cost_check import CostChecker
+from optimizers.cp_optimizer import create_cp_model_bahram, create_output_data
+from optimizers.iterative_optimizer import IterativeOptimizer
+from solution_check import SolutionChecker
+from unit_tests.test_network_calculus import create_one_route_three_flows
+from wcd.backends import NetworkCalculusBackend
+
+
+class TestCPOptimizer(TestCase):
+    def test_bahram(self):
+        cost_checker = CostChecker(1024)
+        solution_checker = SolutionChecker('', '', 20, backend=NetworkCalculusBackend())
+        iterative_solution = create_one_route_three_flows(48)
+        iterative_cost = cost_checker.cost(iterative_solution)
+
+        solution = create_cp_model_bahram(create_one_route_three_flows(48), '', cost_checker, solution_checker,
+                                          iterative_cost, iterative_solution)
+        _, is_feasible, _, _, infinite_streams = solution_checker.check_solution(solution)
+        self.assertEqual((True, []), (is_feasible, infinite_streams))
+        self.assertNotEqual(iterative_solution.snapshot_windows().tolist(), solution.snapshot_windows().tolist())
+
+        # Stopped before the first solution -> iterative solution
+        solution = create_cp_model_bahram(create_one_route_three_flows(48), '', cost_checker, solution_checker,
+                                          iterative_cost, iterative_solution, time.time())
+        self.assertEqual(iterative_solution.snapshot_windows().tolist(), solution.snapshot_windows().tolist())
+
+    def test_output_budget_exhausted(self):
+        cost_checker = CostChecker(1024)
+        solution_checker = SolutionChecker('', '', 20, backend=NetworkCalculusBackend())
+        iterative_solution = create_one_route_three_flows(48)
+        solution = create_cp_model_bahram(create_one_route_three_flows(48), '', cost_checker, solution_checker,
+                                          cost_checker.cost(iterative_solution), iterative_solution, time.time())
+
+        output_data = create_output_data(iterative_solution, solution, cost_checker, solution_checker, 0.1, True)
+        self.assertEqual(True, output_data.budget_exhausted)
+
+        with tempfile.TemporaryDirectory() as folder:
+            options = {'aggregate': False, 'visualize': False, 'pickle': False}
+            IterativeOptimizer().generate_output(output_data, folder + '/', 'cp_bahram', options)
+            subfolder = os.path.join(folder, os.listdir(folder)[0])
+            self.assertEqual(['statistics.txt', 'windows_final.txt', 'windows_initial.txt'],
+                             sorted(os.listdir(subfolder)))
+            with open(os.path.join(subfolder, 'statistics.txt')) as f:
+                self.assertIn('Time budget exhausted', f.read())
@@ -0,0 +1,46 @@
+import copy
+import socket
+import threading
+from unittest import TestCase
+
+from solution_check import SolutionChecker
+from unit_tests.test_network_calculus import create_one_route_three_flows
+from wcd.backends import NetworkCalculusBackend, DaemonBackend
+from wcd.daemon import AnalysisServer
+
+
+class TestDaemon(TestCase):
+    def setUp(self):
+        self.server = AnalysisServer(('localhost', 0))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_daemon_backend(self):
+        tc = create_one_route_three_flows(48)
+        tc2 = copy.deepcopy(tc)
+        tc2.switches['SW1'].output_ports['SW2'].set_period_for_all(100)
+
+        backend = DaemonBackend('localhost', self.server.server_address[1])
+        for s in [tc, tc2, tc]:
+            self.assertEqual(NetworkCalculusBackend().analyze(s, 20), backend.analyze(s, 20))
+        self.assertEqual(SolutionChecker('', '', 20, backend=NetworkCalculusBackend()).check_solution(tc2),
+                         SolutionChecker('', '', 20, backend=backend).check_solution(tc2))
+
+        # Lost connection -> reconnect
+        backend._socket.shutdown(socket.SHUT_RDWR)
+        self.assertEqual(NetworkCalculusBackend().analyze(tc, 20), backend.analyze(tc, 20))
+        self.assertEqual(2, backend.get_statistics()['wcd_daemon_connects'])
+
+        backend.close()
+
+    def test_daemon_not_reachable(self):
+        # Port without server
+        free_socket = socket.socket()
+        free_socket.bind(('localhost', 0))
+        port = free_socket.getsockname()[1]
+        free_socket.close()
+
+        self.assertEqual(([], []), DaemonBackend('localhost', port).analyze(create_one_route_three_flows(48), 20))
@@ -1,12 +1,23 @@
+import copy
+import os
+import tempfile
+import time
 from unittest import TestCase
 
+from cost_check import CostChecker
+
 from data_structures.Node import Node, Switch
 from data_structures.Stream import Stream
 from data_structures.TestCase import TestCase as TC
 
-from optimizers.iterative_optimizer import IterativeOptimizer, optimize_ports_for_stream, create_initial_solution
+from optimizers.iterative_optimizer import IterativeOptimizer, optimize_ports_for_stream, create_initial_solution, \
+    optimize_ports_for_stream_kary, optimize_ports_for_streams, group_port_disjoint_streams, \
+    divideconquer_optimization
 from solution_check import SolutionChecker
+from unit_tests.test_network_calculus import create_one_route_three_flows
 from utility import config_parser
+from utility.input_parser import parse_testcase_lines
+from wcd.backends import NetworkCalculusBackend
 
 
 class TestIterativeOptimizer(TestCase):
@@ -153,6 +164,159 @@ class TestIterativeOptimizer(TestCase):
         self.assertEqual(True, stream2.uid in infinite_streams)
         self.assertEqual(True, stream1.uid not in infinite_streams and stream3.uid not in infinite_streams)
 
-
-
-
+    def test_dq_optimizer_kary(self):
+        tc = create_one_route_three_flows(48, deadline1=400)
+        solution_checker = SolutionChecker('', '', 20, backend=NetworkCalculusBackend())
+
+        expected = optimize_ports_for_stream(copy.deepcopy(tc), tc.streams['tt1'], solution_checker)
+        for arity in [1, 3, 7]:
+            solution = optimize_ports_for_stream_kary(copy.deepcopy(tc), tc.streams['tt1'], solution_checker, arity)
+            for sw in ['SW1', 'SW2']:
+                for port_uid in solution.switches[sw].output_ports.keys():
+                    self.assertEqual(expected.switches[sw].output_ports[port_uid]._M_Windows.tolist(),
+                                     solution.switches[sw].output_ports[port_uid]._M_Windows.tolist())
+
+        _, _, exceeding_percentages, _, _ = solution_checker.check_solution(solution)
+        self.assertEqual([], exceeding_percentages)
+
+    def test_group_port_disjoint_streams(self):
+        test_case_path = os.path.join('test_cases', 'test_batch_1', 'complex_test_1')
+        with open(test_case_path + '.streams') as stream_file, open(test_case_path + '.vls') as vls_file:
+            tc = parse_testcase_lines(stream_file, vls_file, 'complex_test_1')
+
+        uids = sorted(tc.streams.keys())
+        groups = group_port_disjoint_streams(tc, uids)
+
+        self.assertEqual(uids[0], groups[0][0])
+        self.assertEqual(sorted(uids), sorted(uid for group in groups for uid in group))
+        for group in groups:
+            used_ports = set()
+            for uid in group:
+                route = tc.streams[uid].route
+                ports = set((route[i].uid, route[i + 1].uid) for i in range(1, len(route) - 1))
+                self.assertEqual(True, used_ports.isdisjoint(ports))
+                used_ports.update(ports)
+
+    def test_dq_optimizer_lockstep(self):
+        def create_two_independent_routes():
+            streams = {}
+            switches = {}
+            for k in ['1', '2']:
+                stream = Stream('tt' + k, 1500, 100, 100, 0, [Node('ES' + k), Node('SW' + k), Node('ES' + k + '0')])
+                switch = Switch('SW' + k)
+                switch.associate_stream_to_queue(stream.uid, stream.sending_time, stream.period, stream.priority,
+                                                 'ES' + k + '0')
+                switch.output_ports['ES' + k + '0'].set_window(stream.priority, 0, 24, 100)
+                streams[stream.uid] = stream
+                switches[switch.uid] = switch
+            return TC(switches, streams, 'TwoIndependentRoutes')
+
+        backend = CountingBackend()
+        solution_checker = SolutionChecker('', '', 20, backend=backend)
+        expected = create_two_independent_routes()
+        for stream in expected.streams.values():
+            optimize_ports_for_stream(expected, stream, solution_checker)
+        sequential_checks = backend.checks
+
+        backend.checks = 0
+        solution = create_two_independent_routes()
+        optimize_ports_for_streams(solution, list(solution.streams.values()), solution_checker)
+
+        for k in ['1', '2']:
+            self.assertEqual(expected.switches['SW' + k].output_ports['ES' + k + '0']._M_Windows.tolist(),
+                             solution.switches['SW' + k].output_ports['ES' + k + '0']._M_Windows.tolist())
+        self.assertEqual(sequential_checks / 2, backend.checks)
+
+    def test_dq_optimizer_resume(self):
+        options = {'wcd_bounds': False, 'wcd_backend': 'networkcalculus', 'search_arity': 1, 'lockstep': False,
+                   'max_stream_fixes': 3, 'checkpoint_interval': 0, 'deadline': None}
+        solution_checker = SolutionChecker('', '', 20, backend=CountingBackend())
+        expected = divideconquer_optimization(create_one_route_three_flows(40, 100), options, CostChecker(1024),
+                                              solution_checker)
+        uninterrupted_checks = solution_checker.backend.checks
+
+        with tempfile.TemporaryDirectory() as folder:
+            checkpoint_path = os.path.join(folder, 'checkpoints', 'OneRouteThreeFlows.checkpoint')
+            solution_checker = SolutionChecker('', '', 20, backend=CountingBackend(crash_after=uninterrupted_checks // 2))
+            with self.assertRaises(RuntimeError):
+                divideconquer_optimization(create_one_route_three_flows(40, 100), options, CostChecker(1024),
+                                           solution_checker, checkpoint_path)
+            self.assertTrue(os.path.exists(checkpoint_path))
+
+            solution_checker = SolutionChecker('', '', 20, backend=CountingBackend())
+            output_data = divideconquer_optimization(create_one_route_three_flows(40, 100), options, CostChecker(1024),
+                                                     solution_checker, checkpoint_path, resume=True)
+
+        self.assertEqual(expected.final_solution.snapshot_windows().tolist(),
+                         output_data.final_solution.snapshot_windows().tolist())
+        self.assertEqual(expected.initial_solution.snapshot_windows().tolist(),
+                         output_data.initial_solution.snapshot_windows().tolist())
+        self.assertEqual(len(expected.iteration_data), len(output_data.iteration_data))
+        self.assertLess(solution_checker.backend.checks, uninterrupted_checks)
+
+    def test_dq_optimizer_time_budget(self):
+        options = {'wcd_bounds': False, 'wcd_backend': 'networkcalculus', 'search_arity': 1, 'lockstep': False,
+                   'max_stream_fixes': 3, 'checkpoint_interval': 0, 'deadline': time.time()}
+        solution_checker = SolutionChecker('', '', 20, backend=CountingBackend())
+        output_data = divideconquer_optimization(create_one_route_three_flows(40, 100), options, CostChecker(1024),
+                                                 solution_checker)
+
+        self.assertEqual(True, output_data.budget_exhausted)
+        self.assertEqual(1, len(output_data.iteration_data))
+        self.assertEqual(output_data.initial_solution.snapshot_windows().tolist(),
+                         output_data.final_solution.snapshot_windows().tolist())
+        self.assertEqual(2, solution_checker.backend.checks)
+
+    def test_dq_optimizer_time_budget_during_fix(self):
+        for arity in [1, 3]:
+            options = {'wcd_bounds': False, 'wcd_backend': 'networkcalculus', 'search_arity': arity,
+                       'lockstep': False, 'max_stream_fixes': 3, 'checkpoint_interval': 60, 'deadline': None}
+            expected = divideconquer_optimization(create_one_route_three_flows(40, 100), options, CostChecker(1024),
+                                                  SolutionChecker('', '', 20, backend=CountingBackend()))
+
+            with tempfile.TemporaryDirectory() as folder:
+                checkpoint_path = os.path.join(folder, 'checkpoints', 'OneRouteThreeFlows.checkpoint')
+
+                # Deadline passes during the second analysis of the first fix
+                options['deadline'] = time.time() + 1
+                backend = CountingBackend(stall_after=2, stall_until=options['deadline'])
+                output_data = divideconquer_optimization(create_one_route_three_flows(40, 100), options,
+                                                         CostChecker(1024), SolutionChecker('', '', 20, backend=backend),
+                                                         checkpoint_path)
+                self.assertEqual(True, output_data.budget_exhausted)
+                # The result of the interrupted fix is recorded
+                self.assertEqual(2, len(output_data.iteration_data))
+                self.assertEqual(output_data.initial_solution.snapshot_windows().tolist(),
+                                 output_data.final_solution.snapshot_windows().tolist())
+                # Initial, 2 rounds of bisection or 1 round of k-ary search, after the fix, final
+                self.assertEqual(3 + (2 if arity == 1 else arity), backend.checks)
+
+                # The interrupted fix is repeated
+                options['deadline'] = None
+                output_data = divideconquer_optimization(create_one_route_three_flows(40, 100), options,
+                                                         CostChecker(1024),
+                                                         SolutionChecker('', '', 20, backend=CountingBackend()),
+                                                         checkpoint_path, resume=True)
+
+            self.assertEqual(expected.final_solution.snapshot_windows().tolist(),
+                             output_data.final_solution.snapshot_windows().tolist())
+            # Plus the iteration of the interrupted fix
+            self.assertEqual(len(expected.iteration_data) + 1, len(output_data.iteration_data))
+
+
+class CountingBackend(NetworkCalculusBackend):
+    def __init__(self, crash_after=None, stall_after=None, stall_until=None):
+        NetworkCalculusBackend.__init__(self)
+        self.checks = 0
+        self.crash_after = crash_after
+        self.stall_after = stall_after
+        self.stall_until = stall_until
+
+    def analyze(self, s, timeout):
+        if self.checks == self.crash_after:
+            raise RuntimeError('Analysis crashed')
+        if self.checks == self.stall_after:
+            # Analysis running past the deadline
+            time.sleep(max(self.stall_until - time.time(), 0) + 0.01)
+        self.checks += 1
+        return NetworkCalculusBackend.analyze(self, s, timeout)
@@ -0,0 +1,109 @@
+import os
+import random
+from unittest import TestCase
+
+from data_structures.Node import Node, Switch
+from data_structures.Stream import Stream
+from data_structures.TestCase import TestCase as TC
+from solution_check import SolutionChecker
+from utility.input_parser import parse_testcase_lines
+from wcd.backends import NetworkCalculusBackend
+from wcd.network_calculus import NetworkCalculusAnalyzer
+
+
+def create_one_route_three_flows(window_length, deadline1=500):
+    n1 = Node('ES1')
+    n2 = Node('SW1')
+    n3 = Node('SW2')
+    n4 = Node('ES2')
+    stream1 = Stream('tt1', 1500, deadline1, 200, 1, [n1, n2, n3, n4])
+    stream2 = Stream('tt2', 1500, 700, 200, 1, [n1, n2, n3, n4])
+    stream3 = Stream('tt3', 1500, 9990, 200, 1, [n1, n2, n3, n4])
+    streams = {'tt1': stream1, 'tt2': stream2, 'tt3': stream3}
+
+    sw1 = Switch('SW1')
+    sw2 = Switch('SW2')
+    for stream in streams.values():
+        sw1.associate_stream_to_queue(stream.uid, stream.sending_time, stream.period, stream.priority, 'SW2')
+        sw2.associate_stream_to_queue(stream.uid, stream.sending_time, stream.period, stream.priority, 'ES2')
+    sw1.output_ports['SW2'].set_window(1, 0, window_length, 104)
+    sw2.output_ports['ES2'].set_window(1, 0, window_length, 104)
+
+    return TC({'SW1': sw1, 'SW2': sw2}, streams, 'OneRouteThreeFlows')
+
+
+class TestNetworkCalculus(TestCase):
+    def test_one_route_three_flows(self):
+        tc = create_one_route_three_flows(48)
+
+        e2e_delays, port_delays = NetworkCalculusAnalyzer().calculate_delays(tc)
+
+        # ES: 3 frames of 12us. SW: usable window 48-12=36 of 104, bursts grow by 12/200 * previous delays
+        self.assertAlmostEqual(36, port_delays[('ES1', 'SW1', 1)])
+        self.assertAlmostEqual(68 + 3 * (12 + 0.06 * 36) * 104 / 36, port_delays[('SW1', 'SW2', 1)])
+        self.assertAlmostEqual(sum(port_delays.values()), e2e_delays['tt1'])
+        self.assertEqual(e2e_delays['tt1'], e2e_delays['tt3'])
+
+    def test_output_format(self):
+        tc = create_one_route_three_flows(48)
+
+        wce2elist, wcportdelay_list = NetworkCalculusAnalyzer().analyze(tc)
+
+        self.assertEqual('ES1 -> SW1: 36.000, priority 1\n', wcportdelay_list[0])
+        self.assertEqual(True, wce2elist[0].startswith('tt1,ES2:'))
+        self.assertEqual(3, len(wce2elist))
+
+    def test_window_too_short(self):
+        # Usable window 12-12=0 -> no frame can be sent
+        tc = create_one_route_three_flows(12)
+
+        wce2elist, wcportdelay_list = NetworkCalculusAnalyzer().analyze(tc)
+
+        self.assertEqual('SW1 -> SW2: 0, priority 1\n', wcportdelay_list[1])
+        self.assertEqual('tt1,ES2:INF\n', wce2elist[0])
+
+    def test_check_solution(self):
+        tc = create_one_route_three_flows(48)
+        solution_checker = SolutionChecker('', '', 20, backend=NetworkCalculusBackend())
+
+        is_valid, is_feasible, exceeding_percentages, wcds, infinite_streams = solution_checker.check_solution(tc)
+        self.assertEqual(True, is_valid)
+        self.assertEqual(False, is_feasible)
+        self.assertEqual(['tt1'], [t[1] for t in exceeding_percentages])
+        self.assertEqual(3, len(wcds))
+        self.assertEqual([], infinite_streams)
+
+        tc = create_one_route_three_flows(12)
+        is_valid, is_feasible, exceeding_percentages, wcds, infinite_streams = solution_checker.check_solution(tc)
+        self.assertEqual(True, is_valid)
+        self.assertEqual(['tt1', 'tt2', 'tt3'], infinite_streams)
+
+    def test_incremental(self):
+        test_case_path = os.path.join('test_cases', 'test_batch_1', 'complex_test_1')
+        with open(test_case_path + '.streams') as stream_file, open(test_case_path + '.vls') as vls_file:
+            tc = parse_testcase_lines(stream_file, vls_file, 'complex_test_1')
+
+        # Non-overlapping windows of equal length per port
+        ports = []
+        for switch in tc.switches.values():
+            for port_uid, port in switch.output_ports.items():
+                priorities = port.get_sorted_queuenrs()
+                for i, priority in enumerate(priorities):
+                    port.set_window(priority, i * 400 // len(priorities), 400 // len(priorities), 400)
+                ports.append((switch.uid, port_uid))
+
+        analyzer = NetworkCalculusAnalyzer(incremental=True)
+        self.assertEqual(NetworkCalculusAnalyzer().analyze(tc), analyzer.analyze(tc))
+
+        random.seed(1)
+        for i in range(20):
+            switch_uid, port_uid = random.choice(ports)
+            tc.switches[switch_uid].output_ports[port_uid].set_period_for_all(random.randint(100, 500))
+            self.assertEqual(NetworkCalculusAnalyzer().analyze(tc), analyzer.analyze(tc))
+
+        self.assertLess(0, analyzer.statistics['wcd_queues_reused'])
+
+        # Unchanged windows -> everything reused
+        analyzed = analyzer.statistics['wcd_queues_analyzed']
+        analyzer.analyze(tc)
+        self.assertEqual(analyzed, analyzer.statistics['wcd_queues_analyzed'])
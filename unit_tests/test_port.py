@@ -1,6 +1,8 @@
+from collections import Counter
 from unittest import TestCase
 
 import data_structures
+from data_structures import OutputPort as output_port
 from data_structures.OutputPort import OutputPort
 
 import numpy as np
@@ -507,3 +509,122 @@ class TestPort(TestCase):
         p.set_period_for_priority(99, 2)
         self.assertEqual(99, p.get_window(2)[2])
 
+
+    def test_occupation_percentage_matches_binary(self):
+        p = OutputPort('SW1')
+
+        matrices = [
+            np.array([[0, 10, 50], [0, 10, 65]]),
+            np.array([[0, 10, 100], [10, 20, 200]]),
+            np.array([[0, 20, 80], [20, 50, 90], [50, 70, 100]]),
+            np.array([[0, 20, 100], [10, 20, 100]]),
+            np.array([[5, 30, 40], [30, 45, 60], [0, 0, 120]]),
+        ]
+
+        for M in matrices:
+            p._M_Windows = M
+            self.assertEqual(p.get_occupation_percentage(), p.get_occupation_percentage_binary())
+
+    def test_occupation_percentage_coprime_periods(self):
+        p = OutputPort('SW1')
+
+        M = np.array([
+            [0, 10, 62500],
+            [10, 20, 125001]
+        ])
+
+        p._M_Windows = M
+
+        occupation = p.get_occupation_percentage()
+        self.assertEqual(True, occupation <= 10 / 62500 + 10 / 125001)
+        self.assertEqual(True, occupation > 10 / 62500)
+
+    def test_occupation_percentage_single_period_dispatch(self):
+        p = OutputPort('SW1')
+
+        p._M_Windows = np.array([
+            [0, 10, 100],
+            [10, 60, 100],
+            [70, 90, 100]
+        ])
+        self.assertEqual(True, p.has_single_period_without_overlap())
+        self.assertEqual(p.get_occupation_percentage(), p.get_occupation_percentage_interval())
+        self.assertEqual(p.get_occupation_percentage(), 80 / 100)
+
+        p._M_Windows = np.array([
+            [0, 20, 100],
+            [10, 20, 100]
+        ])
+        self.assertEqual(False, p.has_single_period_without_overlap())
+
+        p._M_Windows = np.array([
+            [0, 10, 100],
+            [10, 20, 200]
+        ])
+        self.assertEqual(False, p.has_single_period_without_overlap())
+
+    def test_occupation_percentage_packed_matches_binary(self):
+        p = OutputPort('SW1')
+
+        matrices = [
+            np.array([[0, 10, 50], [0, 10, 65]]),
+            np.array([[0, 10, 100], [10, 20, 200]]),
+            np.array([[0, 20, 80], [20, 50, 90], [50, 70, 100]]),
+            np.array([[0, 20, 100], [10, 20, 100]]),
+            np.array([[5, 30, 40], [30, 45, 60], [0, 0, 120]]),
+        ]
+
+        for M in matrices:
+            p._M_Windows = M
+            self.assertEqual(p.get_occupation_percentage_packed(), p.get_occupation_percentage_binary())
+            self.assertEqual(p.get_occupation_percentage_packed(), p.get_occupation_percentage_interval())
+
+    def test_occupation_percentage_chunked(self):
+        p = OutputPort('SW1')
+
+        matrices = [
+            np.array([[0, 10, 50], [0, 10, 65]]),
+            np.array([[0, 20, 80], [20, 50, 90], [50, 70, 100]]),
+            np.array([[5, 30, 40], [30, 45, 60], [0, 0, 120]]),
+        ]
+
+        for M in matrices:
+            p._M_Windows = M
+            self.assertEqual('chunked', p.get_occupation_method(memory_limit=16))
+            self.assertEqual(p.get_occupation_percentage(memory_limit=16), p.get_occupation_percentage_binary())
+
+    def test_occupation_cache(self):
+        p1 = OutputPort('SW1')
+        p2 = OutputPort('SW2')
+
+        p1._M_Windows = np.array([[0, 10, 50], [0, 10, 65]])
+        p2._M_Windows = np.array([[0, 10, 50], [0, 10, 65]])
+
+        output_port.occupation_cache.clear()
+        statistics = Counter()
+        self.assertEqual(p1.get_occupation_percentage(statistics=statistics), 210/650)
+        self.assertEqual(p2.get_occupation_percentage(statistics=statistics), 210/650)
+        self.assertEqual(p1.get_windows_key(), p2.get_windows_key())
+        self.assertEqual(1, statistics['occupation_cache_misses'])
+        self.assertEqual(1, statistics['occupation_cache_hits'])
+        self.assertEqual(1, output_port.occupation_cache.hits)
+
+        p2._M_Windows = np.array([[0, 10, 50], [0, 20, 65]])
+        self.assertEqual(False, p1.get_windows_key() == p2.get_windows_key())
+        self.assertEqual(p2.get_occupation_percentage(), p2.get_occupation_percentage_binary())
+
+    def test_dq_candidates(self):
+        p = OutputPort('port1')
+        p.associate_stream_to_queue('tt1', 12, 200, 1)
+        p.set_window(1, 0, 20, 100)
+
+        # Free period 80, search interval [0, 80]
+        self.assertEqual([20, 40, 60], p.dq_get_candidates(3))
+
+        p.dq_set_free_period(40)
+        self.assertEqual([0, 20, 60], p._M_Windows[0].tolist())
+
+        p.dq_narrow(40, 42)
+        self.assertEqual([41], p.dq_get_candidates(3))
+        p.dq_narrow(40, 41)
+        self.assertEqual([], p.dq_get_candidates(3))
@@ -0,0 +1,57 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from unit_tests.test_network_calculus import create_one_route_three_flows
+from utility.output_serializer import OutputData
+from utility.results_store import ResultsStore
+
+
+def create_output_data(name: str):
+    s = create_one_route_three_flows(48)
+    s.name = name
+    wcds = {'tt1': '100.0', 'tt2': '300.0', 'tt3': 'INF'}
+    port_costs = {'SW1,SW2': 0.5, 'SW2,ES2': 0.25}
+    return OutputData(s, s, wcds, wcds, 1.5, 0.75, 0.75, port_costs, port_costs, [(0.75, 400.0, 0.2, 2)], ['tt3'],
+                      [], 1, 1, 0.2)
+
+
+class TestResultsStore(TestCase):
+    def test_batched_writes(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'results.sqlite')
+            store = ResultsStore(path, batch_size=2)
+            other_store = ResultsStore(path)
+
+            store.add(create_output_data('a'), 'IterativeOptimization')
+            self.assertEqual([], other_store.query())
+            store.add(create_output_data('b'), 'IterativeOptimization')
+            self.assertEqual(['a', 'b'], [row['testcase'] for row in other_store.query()])
+
+            store.add(create_output_data('a'), 'CP')
+            store.close()
+            rows = other_store.query(testcase='a')
+            other_store.close()
+
+        self.assertEqual(['CP', 'IterativeOptimization'], sorted(row['optimizer'] for row in rows))
+        self.assertEqual(200.0, rows[0]['mean_e2e_delay'])
+        self.assertEqual(0.375, rows[0]['mean_occupation'])
+        self.assertEqual(1, rows[0]['infeasible_streams'])
+        self.assertEqual([[0.75, 400.0, 0.2, 2]], rows[0]['iteration_data'])
+        self.assertEqual({'SW1,SW2': 0.5, 'SW2,ES2': 0.25}, rows[0]['final_port_costs'])
+
+    def test_export_collections(self):
+        with tempfile.TemporaryDirectory() as folder:
+            store = ResultsStore(os.path.join(folder, 'results.sqlite'))
+            store.add(create_output_data('a'), 'IterativeOptimization')
+            store.export_collections(folder)
+            store.close()
+
+            with open(os.path.join(folder, 'mean_e2e_delays.txt')) as f:
+                self.assertEqual('200\ta\n', f.read())
+            with open(os.path.join(folder, 'mean_occupation_percentage.txt')) as f:
+                self.assertEqual('37.5\ta\n', f.read())
+            with open(os.path.join(folder, 'calc_time.txt')) as f:
+                self.assertEqual('1.5\ta\n', f.read())
+            with open(os.path.join(folder, 'infeasible_streams.txt')) as f:
+                self.assertEqual('1/3\ta\n', f.read())
@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import signal
+import tempfile
+from unittest import TestCase
+
+from wcd.sandbox import SandboxPool, RATE_FILE_CONTENT
+
+
+def lease_and_die(wcdtool_path: str):
+    # Killed during an analysis
+    with SandboxPool(wcdtool_path, 'usecases', 1).lease('tc'):
+        os.kill(os.getpid(), signal.SIGKILL)
+
+
+class TestSandbox(TestCase):
+    def setUp(self):
+        self.wcdtool_dir = tempfile.TemporaryDirectory()
+        for tc_name in ['tc', 'tc2']:
+            in_folder = os.path.join(self.wcdtool_dir.name, 'usecases', tc_name, 'in')
+            os.makedirs(in_folder)
+            for file_name in ['msg.txt', 'vls.txt']:
+                with open(os.path.join(in_folder, file_name), 'w') as f:
+                    f.write(file_name)
+
+    def tearDown(self):
+        self.wcdtool_dir.cleanup()
+
+    def test_lease(self):
+        pool = SandboxPool(self.wcdtool_dir.name, 'usecases', 2)
+
+        with pool.lease('tc') as sandbox1:
+            with pool.lease('tc') as sandbox2:
+                self.assertEqual(['tc_0', 'tc_1'], sorted([sandbox1, sandbox2]))
+                for sandbox in [sandbox1, sandbox2]:
+                    in_folder = os.path.join(pool.get_folder(sandbox), 'in')
+                    self.assertEqual(['msg.txt', 'rate.txt', 'vls.txt'], sorted(os.listdir(in_folder)))
+
+                # All sandboxes leased
+                with self.assertRaises(TimeoutError):
+                    with pool.lease('tc', timeout=0.05):
+                        pass
+
+            # Other process
+            with SandboxPool(self.wcdtool_dir.name, 'usecases', 2).lease('tc') as sandbox3:
+                self.assertEqual(sandbox2, sandbox3)
+
+    def test_clean(self):
+        pool = SandboxPool(self.wcdtool_dir.name, 'usecases', 1)
+
+        with pool.lease('tc') as sandbox:
+            out_folder = os.path.join(pool.get_folder(sandbox), 'out')
+            open(os.path.join(out_folder, 'WCEndtoEndDelay.txt'), 'w').close()
+
+        with pool.lease('tc') as sandbox:
+            self.assertEqual([], os.listdir(os.path.join(pool.get_folder(sandbox), 'out')))
+        self.assertEqual(['tc', 'tc2', 'tc_0', 'tc_0.lock'],
+                         sorted(os.listdir(os.path.join(self.wcdtool_dir.name, 'usecases'))))
+
+    def test_lease_of_dead_process(self):
+        process = multiprocessing.Process(target=lease_and_die, args=(self.wcdtool_dir.name,))
+        process.start()
+        process.join()
+        self.assertEqual(-signal.SIGKILL, process.exitcode)
+        self.assertEqual(True, os.path.exists(os.path.join(self.wcdtool_dir.name, 'usecases', 'tc_0.lock')))
+
+        with SandboxPool(self.wcdtool_dir.name, 'usecases', 1).lease('tc', timeout=0.05) as sandbox:
+            self.assertEqual('tc_0', sandbox)
+
+    def test_rate(self):
+        pool = SandboxPool(self.wcdtool_dir.name, 'usecases', 1)
+        with pool.lease('tc') as sandbox:
+            with open(os.path.join(pool.get_folder(sandbox), 'in', 'rate.txt')) as f:
+                self.assertEqual(RATE_FILE_CONTENT, f.read())
+
+        # Testcase with its own link rate
+        with open(os.path.join(pool.get_folder('tc2'), 'in', 'rate.txt'), 'w') as f:
+            f.write('100')
+        with pool.lease('tc2') as sandbox:
+            with open(os.path.join(pool.get_folder(sandbox), 'in', 'rate.txt')) as f:
+                self.assertEqual('100', f.read())
@@ -0,0 +1,98 @@
+import contextlib
+import copy
+import io
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from solution_check import SolutionChecker, create_solution_checker
+from utility import config_parser
+from unit_tests.test_network_calculus import create_one_route_three_flows
+from wcd.backends import NetworkCalculusBackend, WCDBackend
+
+
+class SlowBackend(WCDBackend):
+    def __init__(self, hanging_window_length=None, delay=10):
+        self.hanging_window_length = hanging_window_length
+        self.delay = delay
+
+    def analyze(self, s, timeout):
+        window = s.switches['SW1'].output_ports['SW2'].get_window(1)
+        if self.hanging_window_length is None or window[1] - window[0] == self.hanging_window_length:
+            time.sleep(10)
+        else:
+            time.sleep(self.delay)
+        return NetworkCalculusBackend().analyze(s, timeout)
+
+
+class TestSolutionCheck(TestCase):
+    def test_check_solutions(self):
+        candidates = []
+        for window_length in [48, 60, 72, 84]:
+            candidates.append(create_one_route_three_flows(window_length))
+        candidates.append(copy.deepcopy(candidates[0]))
+        candidates[-1].switches['SW1'].output_ports['SW2'].set_period_for_all(100)
+
+        expected = [SolutionChecker('', '', 20, backend=NetworkCalculusBackend()).check_solution(s)
+                    for s in candidates]
+
+        checker = SolutionChecker('', '', 20, backend=NetworkCalculusBackend(), workers=2)
+        try:
+            self.assertEqual(expected, checker.check_solutions(candidates))
+            self.assertEqual(5, checker.get_statistics()['wcd_parallel_checks'])
+        finally:
+            checker.close()
+
+    def test_check_solutions_timeout(self):
+        candidates = [create_one_route_three_flows(48), create_one_route_three_flows(60)]
+
+        checker = SolutionChecker('', '', 20, backend=SlowBackend(), workers=2, job_timeout=0.5)
+        try:
+            results = checker.check_solutions(candidates)
+        finally:
+            checker.close()
+
+        self.assertEqual([False, False], [result[0] for result in results])
+        self.assertEqual(4, checker.get_statistics()['wcd_job_timeouts'])
+        self.assertEqual(2, checker.get_statistics()['wcd_job_retries'])
+
+    def test_check_solutions_timeout_others_continue(self):
+        candidates = [create_one_route_three_flows(48), create_one_route_three_flows(60),
+                      create_one_route_three_flows(72)]
+        expected = SolutionChecker('', '', 20, backend=NetworkCalculusBackend()).check_solutions(candidates[1:])
+
+        # Only the check of the first candidate hangs. The third check starts after the second one and is still
+        # running when the first one times out
+        checker = SolutionChecker('', '', 20, backend=SlowBackend(hanging_window_length=48, delay=1), workers=2,
+                                  job_timeout=1.5)
+        try:
+            results = checker.check_solutions(candidates)
+        finally:
+            checker.close()
+
+        self.assertEqual(False, results[0][0])
+        self.assertEqual(expected, results[1:])
+        # Only the hanging check is repeated
+        self.assertEqual(4, checker.get_statistics()['wcd_parallel_checks'])
+        self.assertEqual(2, checker.get_statistics()['wcd_job_timeouts'])
+
+    def test_sandboxes(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'config.ini')
+            with open(path, 'w') as f:
+                f.write('[wcdtool]\nworkers=4\n')
+            options = config_parser.parse_options(path)
+            self.assertEqual(4, options['wcd_sandboxes'])
+
+            with open(path, 'a') as f:
+                f.write('sandboxes=2\n')
+            options = config_parser.parse_options(path)
+            self.assertEqual(2, options['wcd_sandboxes'])
+
+            # Fewer sandboxes than workers serialize the analyses
+            options['wcdanalysis_timeout'] = 20
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                create_solution_checker(folder, 'usecases', options).close()
+            self.assertIn('Warning', output.getvalue())
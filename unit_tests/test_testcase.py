@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+from unit_tests.test_network_calculus import create_one_route_three_flows
+from wcd.network_calculus import NetworkCalculusAnalyzer
+
+
+class TestTestCase(TestCase):
+    def test_fork(self):
+        tc = create_one_route_three_flows(48)
+        fork = tc.fork()
+
+        self.assertIs(tc.streams, fork.streams)
+        self.assertEqual(NetworkCalculusAnalyzer().analyze(tc), NetworkCalculusAnalyzer().analyze(fork))
+
+        fork.switches['SW1'].output_ports['SW2'].set_period_for_all(100)
+        fork.switches['SW2'].output_ports['ES2'].dq_modify_period(True)
+        self.assertEqual([[0, 48, 104]], tc.switches['SW1'].output_ports['SW2']._M_Windows.tolist())
+        self.assertEqual([[0, 48, 100]], fork.switches['SW1'].output_ports['SW2']._M_Windows.tolist())
+        self.assertEqual(-1, tc.switches['SW2'].output_ports['ES2']._free_period)
+
+        # Window variables of the CP models are not shared either
+        fork.switches['SW1'].output_ports['SW2'].set_window_var(1, 'o', 'l', 'p')
+        self.assertEqual(['o', 'l', 'p'], fork.switches['SW1'].output_ports['SW2'].get_window_var(1).tolist())
+        self.assertNotEqual(['o', 'l', 'p'], tc.switches['SW1'].output_ports['SW2'].get_window_var(1).tolist())
+
+    def test_snapshot_windows(self):
+        tc = create_one_route_three_flows(48)
+        snapshot = tc.snapshot_windows()
+        self.assertEqual([[0, 48, 104], [0, 48, 104]], snapshot.tolist())
+
+        port = tc.switches['SW1'].output_ports['SW2']
+        version = port.windows_version
+        port.set_period_for_all(100)
+        self.assertEqual([[0, 48, 104], [0, 48, 104]], snapshot.tolist())
+
+        tc.restore_windows(snapshot)
+        self.assertEqual([[0, 48, 104]], port._M_Windows.tolist())
+        self.assertLess(version + 1, port.windows_version)
+
+        # Snapshots can be restored into forks
+        fork = tc.fork()
+        port.set_period_for_all(100)
+        fork.restore_windows(tc.snapshot_windows())
+        self.assertEqual([[0, 48, 100]], fork.switches['SW1'].output_ports['SW2']._M_Windows.tolist())
@@ -0,0 +1,45 @@
+from unittest import TestCase
+
+from optimizers.worklist import StreamWorklist
+
+
+class TestWorklist(TestCase):
+    def test_pop_worst(self):
+        worklist = StreamWorklist(3)
+        worklist.update([(0.5, 'tt2'), (0.2, 'tt3'), (0.7, 'tt1')])
+
+        self.assertEqual(['tt1', 'tt2', 'tt3'], worklist.get_ranking())
+        self.assertEqual('tt1', worklist.pop())
+
+        # Re-ranked by new check
+        worklist.update([(0.1, 'tt2'), (0.3, 'tt3')])
+        self.assertEqual('tt3', worklist.pop())
+        self.assertEqual('tt2', worklist.pop())
+        self.assertEqual(None, worklist.pop())
+        self.assertEqual(0, len(worklist))
+
+    def test_max_fixes(self):
+        worklist = StreamWorklist(2)
+        for i in range(2):
+            worklist.update([(0.5, 'tt1'), (0.2, 'tt2')])
+            self.assertEqual('tt1', worklist.pop())
+
+        # tt1 broken again, but fixed twice already
+        worklist.update([(0.5, 'tt1'), (0.2, 'tt2')])
+        self.assertEqual(['tt2'], worklist.get_ranking())
+
+        worklist.remove(['tt2'])
+        self.assertEqual(0, len(worklist))
+        self.assertEqual(1, worklist.fixes['tt2'])
+
+    def test_requeue(self):
+        worklist = StreamWorklist(1)
+        exceeding_percentages = [(0.5, 'tt1'), (0.2, 'tt2')]
+        worklist.update(exceeding_percentages)
+        self.assertEqual('tt1', worklist.pop())
+
+        # Fix of tt1 interrupted
+        worklist.requeue(['tt1'], exceeding_percentages)
+        self.assertEqual(['tt1', 'tt2'], worklist.get_ranking())
+        self.assertEqual(0, worklist.fixes['tt1'])
+        self.assertEqual('tt1', worklist.pop())
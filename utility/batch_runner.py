@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.connection import wait
+
+# Job status
+JOB_SUCCESSFUL = 'successful'
+JOB_FAILED = 'failed'  # Finished without solution
+JOB_CRASHED = 'crashed'
+JOB_TIMEOUT = 'timeout'
+
+# Exit code of a job process that finished without solution. Exceptions exit with 1
+EXITCODE_FAILED = 3
+
+
+def run_job(function, args: tuple, log_path: str = None):
+    """
+    Entry point of a job process
+
+    Args:
+        function: Job function, returns a falsy value if it failed
+        args (tuple): Arguments of function
+        log_path (str): File to redirect stdout and stderr to, if given
+    """
+    if log_path is not None:
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        sys.stdout = sys.stderr = open(log_path, 'w', buffering=1)
+    if not function(*args):
+        sys.exit(EXITCODE_FAILED)
+
+
+def get_job_status(exitcode: int):
+    """
+
+    Args:
+        exitcode (int): Exit code of job process
+
+    Returns:
+        Job status
+    """
+    if exitcode == 0:
+        return JOB_SUCCESSFUL
+    if exitcode == EXITCODE_FAILED:
+        return JOB_FAILED
+    return JOB_CRASHED
+
+
+def run_jobs(function, jobs: list, workers: int, timeout: float = None):
+    """
+    Runs every job in its own process, at most workers at a time. A crashing or hanging job only fails itself.
+
+    Args:
+        function: Job function, returns a falsy value if it failed. Must be picklable (module level)
+        jobs (list): List of (name, args, log path or None)
+        workers (int): Maximum number of concurrent job processes
+        timeout (float): Seconds after which a job process is killed, no limit if None
+
+    Returns:
+        List of job status, in order of jobs
+    """
+    statuses = [None] * len(jobs)
+    pending = list(range(len(jobs)))
+    running = {}  # Map(process, (job index, start time))
+
+    while len(pending) > 0 or len(running) > 0:
+        while len(pending) > 0 and len(running) < workers:
+            i = pending.pop(0)
+            name, args, log_path = jobs[i]
+            process = multiprocessing.Process(target=run_job, args=(function, args, log_path), name=name)
+            process.start()
+            running[process] = (i, time.time())
+
+        wait([process.sentinel for process in running], timeout=1)
+
+        for process, (i, t_start) in list(running.items()):
+            if process.exitcode is not None:
+                statuses[i] = get_job_status(process.exitcode)
+            elif timeout is not None and time.time() - t_start > timeout:
+                process.terminate()
+                statuses[i] = JOB_TIMEOUT
+            else:
+                continue
+            process.join()
+            del running[process]
+            print('[{}/{}] {}: {}'.format(len(jobs) - len(pending) - len(running), len(jobs), jobs[i][0],
+                                          statuses[i]))
+
+    return statuses
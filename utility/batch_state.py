@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+
+from utility import results_store
+
+# Options that don't change the results of a testcase
+FINGERPRINT_IGNORED_OPTIONS = ['inputpath', 'configpath', 'resume', 'deadline', 'jobs', 'time_budget', 'batch_budget',
+                               'visualize', 'pickle', 'aggregate', 'checkpoint_interval', 'wcd_record_store',
+                               'wcd_daemon_address', 'wcd_sandboxes', 'wcd_workers', 'wcd_cache',
+                               'wcd_cache_max_size']
+
+
+def get_fingerprint(test_case_path: str, options: dict):
+    """
+
+    Args:
+        test_case_path (str): Path to .streams file
+        options (dict): directory of options specified by user
+
+    Returns:
+        Hash of the .streams and .vls file contents and the options that change the results
+    """
+    h = hashlib.sha256()
+    for path in [test_case_path, test_case_path[:-7] + 'vls']:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+        h.update(b'\0')
+    relevant_options = {k: v for k, v in options.items() if k not in FINGERPRINT_IGNORED_OPTIONS}
+    h.update(json.dumps(relevant_options, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def get_completion_path(output_folder: str, tc_name: str):
+    """
+
+    Args:
+        output_folder (str): Path to output folder
+        tc_name (str): Name of testcase
+
+    Returns:
+        Path of the file marking the testcase as completed
+    """
+    return os.path.join(output_folder, 'completed', tc_name + '.json')
+
+
+def is_completed(output_folder: str, tc_name: str, fingerprint: str):
+    """
+
+    Args:
+        output_folder (str): Path to output folder
+        tc_name (str): Name of testcase
+        fingerprint (str): Fingerprint of the testcase run, see get_fingerprint
+
+    Returns:
+        If the testcase was completed with the same input files and options
+    """
+    path = get_completion_path(output_folder, tc_name)
+    if not os.path.exists(path):
+        return False
+    with open(path) as f:
+        return json.load(f)['fingerprint'] == fingerprint
+
+
+def mark_completed(output_folder: str, tc_name: str, fingerprint: str):
+    """
+    Writes the buffered results (-a) of this process first, so a completed testcase never loses its results if the
+    process is killed afterwards.
+
+    Args:
+        output_folder (str): Path to output folder
+        tc_name (str): Name of testcase
+        fingerprint (str): Fingerprint of the testcase run, see get_fingerprint
+    """
+    results_store.flush_results_stores()
+
+    path = get_completion_path(output_folder, tc_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'fingerprint': fingerprint}, f)
+    os.replace(tmp_path, path)
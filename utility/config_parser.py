@@ -23,3 +23,62 @@ def parse_config(path: str):
         pass
 
     return wcdtool_path, wcdtool_testcase_subpath
+
+
+def parse_options(path: str):
+    """
+
+    Args:
+        path (str): path to .ini file
+
+    Returns:
+        Dict(option name, value) of the optional settings. Settings missing in the file get their default value
+    """
+    config = ConfigParser()
+    config.read(path)
+
+    options = {}
+
+    # Maximum memory for calculating the occupation of one port, larger ports are evaluated in chunks
+    options['occupation_memory_limit'] = config.getint('cost', 'max_memory_mb', fallback=1024) * 1024 * 1024
+
+    # WCD analysis: "tsnnetcal" (external tool), "networkcalculus" (in-process), "daemon" (analysis server at
+    # daemon_address) or "replay" (from record_store)
+    options['wcd_backend'] = config.get('wcdtool', 'backend', fallback='tsnnetcal')
+    # Folder to record all analyses to (or to replay them from). Empty for no recording
+    options['wcd_record_store'] = config.get('wcdtool', 'record_store', fallback='')
+    # Backend whose analyses were recorded, when replaying. Records are only found for the same backend, inputs and
+    # timeout
+    options['wcd_replay_backend'] = config.get('wcdtool', 'replay_backend', fallback='tsnnetcal')
+    # Only analyze queues affected by changed windows again (networkcalculus backend)
+    options['wcd_incremental'] = config.getboolean('wcdtool', 'incremental', fallback=True)
+    # Skip WCD analyses during optimization whose outcome is decided by analytic bounds. Opt-in, the network calculus
+    # upper bound is only assumed to dominate TSNNetCal
+    options['wcd_bounds'] = config.getboolean('wcdtool', 'bounds', fallback=False)
+    # host:port of the analysis server used by the daemon backend
+    options['wcd_daemon_address'] = config.get('wcdtool', 'daemon_address', fallback='localhost:8765')
+    # Number of worker processes checking candidate solutions in parallel
+    options['wcd_workers'] = config.getint('wcdtool', 'workers', fallback=1)
+    # Number of analyses of the same testcase TSNNetCal can run at the same time. Number of workers if not set
+    sandboxes = config.getint('wcdtool', 'sandboxes', fallback=0)
+    options['wcd_sandboxes'] = sandboxes if sandboxes > 0 else options['wcd_workers']
+    # Timeout of a single parallel check in seconds. Analysis timeout plus a margin if not set
+    job_timeout = config.getfloat('wcdtool', 'job_timeout', fallback=0)
+    options['wcd_job_timeout'] = job_timeout if job_timeout > 0 else None
+    # SQLite file caching analysis results across runs. Empty for no cache
+    options['wcd_cache'] = config.get('wcdtool', 'cache', fallback='')
+    options['wcd_cache_max_size'] = config.getint('wcdtool', 'cache_max_mb', fallback=256) * 1024 * 1024
+
+    # Candidate free periods checked per round when fixing a stream (1 = bisection). Use with [wcdtool] workers
+    options['search_arity'] = config.getint('optimization', 'search_arity', fallback=1)
+
+    # Fix exceeding streams without shared ports together, one WCD analysis per bisection step for all of them
+    options['lockstep'] = config.getboolean('optimization', 'lockstep', fallback=False)
+
+    # Maximum number of times a stream is fixed, if fixing other streams makes it exceed its deadline again
+    options['max_stream_fixes'] = config.getint('optimization', 'max_stream_fixes', fallback=3)
+
+    # Minimum time in seconds between two checkpoints of the divide and conquer optimization, 0 checkpoints every fix
+    options['checkpoint_interval'] = config.getint('optimization', 'checkpoint_interval', fallback=60)
+
+    return options
@@ -60,14 +60,6 @@ def parse_testcase(test_case_path: str, wcdtool_path: str, wcdtool_testcase_path
         TestCase object
     """
 
-    ##### 1. Setup #####
-    # Data Structures
-    streams = {}  # Map: Stream Name -> Stream
-    switches = {}  # Map: Switch Name -> Switch
-
-    _nodes = {}  # Map: Node Name -> Node
-    _routes = {}  # Map: VLS Name -> Route (Ordered List of Nodes)
-
     # Files
     stream_file = open(test_case_path, 'r')
     vls_file = open(test_case_path[:-7] + 'vls', 'r') # remove ".streams" ending and add ".vls" instead
@@ -77,19 +69,42 @@ def parse_testcase(test_case_path: str, wcdtool_path: str, wcdtool_testcase_path
 
     ##### 2. Copying #####
     # Copy over stream and vls file for later use with wcd tool
-    if not os.path.exists("{}\\in\\".format(wcdtool_path + wcdtool_testcase_path + tc_name)):
-        os.makedirs("{}\\in\\".format(wcdtool_path + wcdtool_testcase_path + tc_name),
-                    exist_ok=True)
+    tc_folder = os.path.join(wcdtool_path, wcdtool_testcase_path, tc_name)
+    if not os.path.exists(os.path.join(tc_folder, 'in')):
+        os.makedirs(os.path.join(tc_folder, 'in'), exist_ok=True)
 
-    if not os.path.exists("{}\\out\\".format(wcdtool_path + wcdtool_testcase_path + tc_name)):
-        os.makedirs("{}\\out\\".format(wcdtool_path + wcdtool_testcase_path + tc_name),
-                    exist_ok=True)
-    copyfile(stream_file.name, "{}\\in\\{}".format(wcdtool_path + wcdtool_testcase_path + tc_name, 'msg.txt'))
-    copyfile(vls_file.name, "{}\\in\\{}".format(wcdtool_path + wcdtool_testcase_path + tc_name, 'vls.txt'))
+    if not os.path.exists(os.path.join(tc_folder, 'out')):
+        os.makedirs(os.path.join(tc_folder, 'out'), exist_ok=True)
+    copyfile(stream_file.name, os.path.join(tc_folder, 'in', 'msg.txt'))
+    copyfile(vls_file.name, os.path.join(tc_folder, 'in', 'vls.txt'))
 
     ##### 3. Parsing #####
+    s = parse_testcase_lines(stream_file, vls_file, tc_name)
+    stream_file.close()
+    vls_file.close()
+    return s
+
+
+def parse_testcase_lines(stream_lines, vls_lines, tc_name: str):
+    """
+
+    Args:
+        stream_lines: Iterable of lines in .streams (msg.txt) format
+        vls_lines: Iterable of lines in .vls (vls.txt) format
+        tc_name (str): Name of testcase
+
+    Returns:
+        TestCase object
+    """
+    # Data Structures
+    streams = {}  # Map: Stream Name -> Stream
+    switches = {}  # Map: Switch Name -> Switch
+
+    _nodes = {}  # Map: Node Name -> Node
+    _routes = {}  # Map: VLS Name -> Route (Ordered List of Nodes)
+
     # Parsing .vls file
-    for line in vls_file:
+    for line in vls_lines:
         if not line.startswith('#'):
             # TODO: allow more chars
             m = re.findall(r'([a-zA-Z0-9_]+)\s?,\s?([a-zA-Z0-9_]+)', line)
@@ -128,7 +143,7 @@ def parse_testcase(test_case_path: str, wcdtool_path: str, wcdtool_testcase_path
                         switches[n1_name].add_outputport_to(n2_name)
 
     # Parsing .streams file
-    for line in stream_file:
+    for line in stream_lines:
         if not line.startswith('#'):
             m = re.search(r'([^\s,]+),\s?(\d+),\s?(\d+),\s?([^\s,]+),\s?([^\s,]+),\s?(\d+),\s?(\d+)', line)
             if m is not None:
@@ -144,5 +159,4 @@ def parse_testcase(test_case_path: str, wcdtool_path: str, wcdtool_testcase_path
                     switches[node.uid].associate_stream_to_queue(s.uid, s.sending_time, s.period, s.priority, s.route[i + 1].uid)
                     i += 1
 
-    ##### 4. Return TestCase #####
     return TestCase(switches, streams, tc_name, len(_nodes)-len(switches))
@@ -1,5 +1,4 @@
 import math
-import os
 import pickle
 import matplotlib.pyplot as plt
 import numpy as np
@@ -27,6 +26,8 @@ class OutputData(NamedTuple):
     initial_nr_of_stream_tobesolved: int
     final_step_amount: int
     initial_ep_mean: float
+    performance_counters: dict = None  # Dict(counter name, count), e.g. {'occupation_chunked': 2}
+    budget_exhausted: bool = False  # Optimization stopped by time budget, final solution is the best so far
 
 def render_windows(file: str, testCase: TestCase):
     w2 = WindowVisualizer(testCase)
@@ -266,6 +267,8 @@ def write_statistics(filename: str, output_data: OutputData):
             i = i + 1
     lines.append('Mean E2E-Delay: ' + str(sum / i))
     lines.append('Optimization Runtime (s): ' + str(output_data.runtime))
+    if output_data.budget_exhausted:
+        lines.append('Time budget exhausted, final solution is the best found so far')
 
     lines.append('')
     lines.append('Initial Port Costs (Port Occupation Percentages): ')
@@ -277,6 +280,12 @@ def write_statistics(filename: str, output_data: OutputData):
     for k, v in output_data.final_port_costs.items():
         lines.append('{}: {}%'.format(k, str(round(v * 100, 2))))
 
+    if output_data.performance_counters:
+        lines.append('')
+        lines.append('Performance Counters: ')
+        for k, v in sorted(output_data.performance_counters.items()):
+            lines.append('{}: {}'.format(k, v))
+
     lines.append('')
     lines.append('For parsing: ')
     lines.append(str(output_data.initial_solution.ESNr))
@@ -299,41 +308,3 @@ def pickle_data(filename: str, output_data: OutputData):
     pickle_out = open(filename, "wb")
     pickle.dump(output_data, pickle_out)
     pickle_out.close()
-
-
-def append_to_collections(output_folder, output_data):
-    # Create collections if not existant
-    if not os.path.exists(output_folder + "mean_e2e_delays.txt"):
-        f = open(output_folder + "mean_e2e_delays.txt", 'w+')
-        f.close()
-        f = open(output_folder + "mean_occupation_percentage.txt", 'w+')
-        f.close()
-        f = open(output_folder + "calc_time.txt", 'w+')
-        f.close()
-        f = open(output_folder + "infeasible_streams.txt", 'w+')
-        f.close()
-
-    # Append data
-    f = open(output_folder + "mean_e2e_delays.txt", 'a')
-    i = 0
-    sum = 0
-    for wcd in output_data.final_wcds.values():
-        if not wcd.endswith('INF'):
-            sum = sum + float(wcd)
-            i = i + 1
-    f.write(str(round(sum / i)) + "\t" + output_data.initial_solution.name + '\n')
-    f.close()
-
-    f = open(output_folder + "mean_occupation_percentage.txt", 'a')
-    f.write(str(round(output_data.final_cost / len(output_data.final_port_costs) * 100,
-                      2)) + "\t" + output_data.initial_solution.name + '\n')
-    f.close()
-
-    f = open(output_folder + "calc_time.txt", 'a')
-    f.write(str(round(output_data.runtime, 2)) + "\t" + output_data.initial_solution.name + '\n')
-    f.close()
-
-    f = open(output_folder + "infeasible_streams.txt", 'a')
-    f.write(str(len(output_data.infinite_streams) + len(output_data.final_exceeding_percentages)) + "/" + str(
-        output_data.initial_solution.StreamNr) + "\t" + output_data.initial_solution.name + '\n')
-    f.close()
@@ -0,0 +1,187 @@
+import datetime
+import json
+import os
+import sqlite3
+import sys
+
+# Rows buffered before they are written in one transaction
+RESULTS_BATCH_SIZE = 32
+
+RESULTS_FILE_NAME = 'results.sqlite'
+
+COLUMNS = ['testcase', 'optimizer', 'run', 'mean_e2e_delay', 'mean_occupation', 'runtime', 'infeasible_streams',
+           'streams', 'initial_cost', 'final_cost', 'steps', 'budget_exhausted', 'iteration_data',
+           'initial_port_costs', 'final_port_costs', 'final_wcds']
+JSON_COLUMNS = ['iteration_data', 'initial_port_costs', 'final_port_costs', 'final_wcds']
+
+_stores = {}  # Map(path, ResultsStore) of this process
+
+
+class ResultsStore(object):
+    """SQLite file with one row of aggregated results per (testcase, optimizer, run). Rows are buffered and written in
+    batches. Several processes may write to the same file."""
+
+    def __init__(self, path: str, batch_size: int = RESULTS_BATCH_SIZE):
+        """
+
+        Args:
+            path (str): Path to SQLite file. Created if not existant
+            batch_size (int): Number of rows buffered before they are written
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self._rows = []
+        self._connection = None
+
+    def __getstate__(self):
+        # Connections can't be pickled (e.g. for worker processes), they are reopened when needed
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        return state
+
+    def get_connection(self):
+        """
+
+        Returns:
+            Open sqlite3 connection, table created if not existant
+        """
+        if self._connection is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS results (testcase TEXT, optimizer TEXT, run TEXT, mean_e2e_delay REAL, '
+                'mean_occupation REAL, runtime REAL, infeasible_streams INTEGER, streams INTEGER, initial_cost REAL, '
+                'final_cost REAL, steps INTEGER, budget_exhausted INTEGER, iteration_data TEXT, '
+                'initial_port_costs TEXT, final_port_costs TEXT, final_wcds TEXT, '
+                'PRIMARY KEY (testcase, optimizer, run))')
+            self._connection.commit()
+        return self._connection
+
+    def add(self, output_data, optimizer: str):
+        """
+
+        Args:
+            output_data (OutputData): All the output data of one run
+            optimizer (str): A string representing the optimization type
+        """
+        wcds = [float(wcd) for wcd in output_data.final_wcds.values() if not wcd.endswith('INF')]
+        mean_e2e_delay = sum(wcds) / len(wcds) if len(wcds) > 0 else None
+
+        self._rows.append((
+            output_data.initial_solution.name, optimizer, datetime.datetime.now().isoformat(), mean_e2e_delay,
+            output_data.final_cost / len(output_data.final_port_costs), output_data.runtime,
+            len(output_data.infinite_streams) + len(output_data.final_exceeding_percentages),
+            output_data.initial_solution.StreamNr, output_data.initial_cost, output_data.final_cost,
+            output_data.final_step_amount, int(output_data.budget_exhausted), json.dumps(output_data.iteration_data),
+            json.dumps(output_data.initial_port_costs), json.dumps(output_data.final_port_costs),
+            json.dumps(output_data.final_wcds)))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes all buffered rows in one transaction
+        """
+        if len(self._rows) == 0:
+            return
+        connection = self.get_connection()
+        with connection:
+            connection.executemany('INSERT OR REPLACE INTO results VALUES ({})'.format(', '.join('?' * len(COLUMNS))),
+                                   self._rows)
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def query(self, testcase: str = None, optimizer: str = None):
+        """
+
+        Args:
+            testcase (str): Only rows of this testcase, if given
+            optimizer (str): Only rows of this optimization type, if given
+
+        Returns:
+            List of dicts(column, value), ordered by testcase and run. JSON columns are decoded
+        """
+        self.flush()
+        conditions = []
+        parameters = []
+        if testcase is not None:
+            conditions.append('testcase = ?')
+            parameters.append(testcase)
+        if optimizer is not None:
+            conditions.append('optimizer = ?')
+            parameters.append(optimizer)
+        where = ' WHERE ' + ' AND '.join(conditions) if len(conditions) > 0 else ''
+
+        rows = []
+        for values in self.get_connection().execute(
+                'SELECT * FROM results' + where + ' ORDER BY testcase, run', parameters):
+            row = dict(zip(COLUMNS, values))
+            for column in JSON_COLUMNS:
+                row[column] = json.loads(row[column])
+            rows.append(row)
+        return rows
+
+    def export_collections(self, output_folder: str):
+        """
+        Writes the results as the tab separated collection files (mean_e2e_delays.txt, mean_occupation_percentage.txt,
+        calc_time.txt, infeasible_streams.txt), one line per row.
+
+        Args:
+            output_folder (str): Path to output folder
+        """
+        rows = self.query()
+        collections = {
+            'mean_e2e_delays.txt': lambda row: str(round(row['mean_e2e_delay'] or 0)),
+            'mean_occupation_percentage.txt': lambda row: str(round(row['mean_occupation'] * 100, 2)),
+            'calc_time.txt': lambda row: str(round(row['runtime'], 2)),
+            'infeasible_streams.txt': lambda row: '{}/{}'.format(row['infeasible_streams'], row['streams'])}
+        for file_name, value in collections.items():
+            with open(os.path.join(output_folder, file_name), 'w') as f:
+                for row in rows:
+                    f.write(value(row) + '\t' + row['testcase'] + '\n')
+
+
+def get_results_store(output_folder: str):
+    """
+
+    Args:
+        output_folder (str): Path to output folder
+
+    Returns:
+        ResultsStore of the output folder, shared within this process
+    """
+    path = os.path.join(output_folder, RESULTS_FILE_NAME)
+    if path not in _stores:
+        _stores[path] = ResultsStore(path)
+    return _stores[path]
+
+
+def flush_results_stores():
+    """
+    Writes the buffered rows of all results stores of this process
+    """
+    for store in _stores.values():
+        store.flush()
+
+
+def close_results_stores():
+    """
+    Writes the buffered rows of all results stores of this process and closes them
+    """
+    for store in _stores.values():
+        store.close()
+    _stores.clear()
+
+
+if __name__ == '__main__':
+    # python -m utility.results_store <output folder>: Export the results as collection files
+    store = ResultsStore(os.path.join(sys.argv[1], RESULTS_FILE_NAME))
+    store.export_collections(sys.argv[1])
+    store.close()
@@ -1,4 +1,5 @@
 import math
+from collections import OrderedDict
 
 import matplotlib.pyplot as plt
 import time
@@ -6,6 +7,12 @@ import numpy as np
 
 DEBUG = False
 
+# Number of bits set in every possible byte
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+# Approximate bytes needed per window instance by interval_occupation (start, end, sort order, sweep arrays)
+INTERVAL_BYTES_PER_INSTANCE = 48
+
 
 def debug_print(s, end='\n'):
     if DEBUG:
@@ -33,6 +40,58 @@ class Plotter(object):
             plt.draw()
             plt.pause(0.02)
 
+class LRUCache(object):
+    """Dict with bounded size, which drops the least recently used entry when full. Counts hits and misses."""
+
+    def __init__(self, maxsize: int):
+        """
+
+        Args:
+            maxsize (int): Maximum number of entries
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """
+
+        Args:
+            key: Hashable key
+
+        Returns:
+            Cached value or None, if not cached
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """
+
+        Args:
+            key: Hashable key
+            value: Value to be cached
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
 def create_binary_matrix(M_port: np.ndarray, gcd: int, lcm: int):
     '''
 
@@ -80,6 +139,249 @@ def create_binary_matrix(M_port: np.ndarray, gcd: int, lcm: int):
         raise ValueError('Error. GCD or LCM equals zero. GCD: {} LCM {}'.format(gcd, lcm))
 
 
+def interval_occupation(M_port: np.ndarray, lcm: int):
+    '''
+
+    Args:
+        M_port (numpy.ndarray): Windows matrix (of a port) (start, end, period)
+        lcm (int): hyperperiod of the ports periods
+
+    Returns:
+        Occupied time in us within one hyperperiod, i.e. the length of the union of all window instances.
+        ((0,5,10),(5,7,10)) with lcm 10 -> 7
+    '''
+    if int(lcm) == 0:
+        raise ValueError('Error. LCM equals zero. LCM {}'.format(lcm))
+    lcm = int(lcm)
+
+    starts = []
+    ends = []
+    for row in M_port:
+        offset = int(row[0])
+        end = int(row[1])
+        period = int(row[2])
+
+        if period != 0 and end > offset:
+            instance_offsets = np.arange(0, lcm, period, dtype=np.int64)
+            starts.append(instance_offsets + offset)
+            ends.append(instance_offsets + end)
+
+    if len(starts) == 0:
+        return 0
+
+    starts = np.concatenate(starts)
+    ends = np.concatenate(ends)
+
+    # Instances reaching over the end of the hyperperiod wrap around to its beginning
+    overflow = ends > lcm
+    if np.any(overflow):
+        starts = np.concatenate((starts, np.zeros(np.count_nonzero(overflow), dtype=np.int64)))
+        ends = np.concatenate((np.minimum(ends, lcm), np.minimum(ends[overflow] - lcm, lcm)))
+
+    # Sweep over instances sorted by start. Every instance only adds the part reaching past all previous ones
+    order = np.argsort(starts, kind='mergesort')
+    starts = starts[order]
+    ends = ends[order]
+    reach = np.concatenate(([starts[0]], np.maximum.accumulate(ends)[:-1]))
+    occupied = np.clip(ends - np.maximum(starts, reach), 0, None)
+
+    # DEBUG
+    debug_print('Window instances: {}; Occupied time: {}'.format(len(starts), int(occupied.sum())))
+    return int(occupied.sum())
+
+
+def create_packed_bitmap(M_port: np.ndarray, gcd: int, lcm: int):
+    '''
+
+    Args:
+        M_port (numpy.ndarray): Windows matrix (of a port) (start, end, period)
+        gcd (int): Greates common divisor of all matrix element. Length in us of one bit
+        lcm (int): hyperperiod of the ports periods
+
+    Returns:
+        Same as create_binary_matrix, but 64 columns are packed into one uint64 (most significant bit of the first byte
+        first). Unused bits at the end of a row are 0.
+    '''
+    if int(gcd) == 0 or int(lcm) == 0:
+        raise ValueError('Error. GCD or LCM equals zero. GCD: {} LCM {}'.format(gcd, lcm))
+    gcd = int(gcd)
+    lcm = int(lcm)
+
+    columns = lcm // gcd
+    words = -(-columns // 64)
+    M_packed = np.zeros([M_port.shape[0], words], dtype=np.uint64)
+
+    for i, row in enumerate(M_port):
+        offset = int(row[0])
+        end = int(row[1])
+        period = int(row[2])
+
+        if period != 0:
+            # Binary pattern of one period, windows longer than the period wrap around
+            pattern = np.zeros(period // gcd, dtype=bool)
+            pattern[np.arange(offset // gcd, end // gcd) % len(pattern)] = True
+
+            bits = np.packbits(np.tile(pattern, lcm // period))
+            M_packed[i].view(np.uint8)[:len(bits)] = bits
+
+    return M_packed
+
+
+def popcount(A: np.ndarray):
+    '''
+
+    Args:
+        A (numpy.ndarray): Array of unsigned integers
+
+    Returns:
+        Number of bits set in the whole array
+    '''
+    return int(_POPCOUNT_TABLE[np.ascontiguousarray(A).view(np.uint8)].sum())
+
+
+def packed_occupation(M_port: np.ndarray, gcd: int, lcm: int):
+    '''
+
+    Args:
+        M_port (numpy.ndarray): Windows matrix (of a port) (start, end, period)
+        gcd (int): Greates common divisor of all matrix element
+        lcm (int): hyperperiod of the ports periods
+
+    Returns:
+        Occupied time in us within one hyperperiod, calculated using packed bitmaps
+    '''
+    M_packed = create_packed_bitmap(M_port, gcd, lcm)
+    if M_packed.shape[0] == 0:
+        return 0
+
+    return popcount(np.bitwise_or.reduce(M_packed, 0)) * int(gcd)
+
+
+def chunked_occupation(M_port: np.ndarray, gcd: int, lcm: int, memory_limit: int):
+    '''
+    Walks through the hyperperiod in chunks, so that the memory needed stays below memory_limit (apart from the
+    binary pattern of one period of each window)
+
+    Args:
+        M_port (numpy.ndarray): Windows matrix (of a port) (start, end, period)
+        gcd (int): Greates common divisor of all matrix element. Length in us of one bit
+        lcm (int): hyperperiod of the ports periods
+        memory_limit (int): Maximum memory in bytes to be used for one chunk
+
+    Returns:
+        Occupied time in us within one hyperperiod
+    '''
+    if int(gcd) == 0 or int(lcm) == 0:
+        raise ValueError('Error. GCD or LCM equals zero. GCD: {} LCM {}'.format(gcd, lcm))
+    gcd = int(gcd)
+    lcm = int(lcm)
+    columns = lcm // gcd
+
+    # Binary pattern of one period for each window, windows longer than the period wrap around
+    patterns = []
+    for row in M_port:
+        offset = int(row[0])
+        end = int(row[1])
+        period = int(row[2])
+
+        if period != 0:
+            pattern = np.zeros(period // gcd, dtype=bool)
+            pattern[np.arange(offset // gcd, end // gcd) % len(pattern)] = True
+            patterns.append(pattern)
+
+    # Per chunk: unpacked bits of one row (1 byte per column), packed row and accumulator (1 bit per column each)
+    chunk_columns = max(64, int(memory_limit * 4 / 5) // 64 * 64)
+    debug_print('Chunked occupation: {} columns in chunks of {}'.format(columns, chunk_columns))
+
+    occupied_columns = 0
+    for chunk_start in range(0, columns, chunk_columns):
+        n = min(chunk_columns, columns - chunk_start)
+        result_packed = np.zeros(-(-n // 8), dtype=np.uint8)
+        for pattern in patterns:
+            rotated = np.roll(pattern, -(chunk_start % len(pattern)))
+            result_packed |= np.packbits(np.resize(rotated, n))
+        occupied_columns += popcount(result_packed)
+
+    return occupied_columns * gcd
+
+
+def occupation_memory_estimate(M_port: np.ndarray, gcd: int, lcm: int):
+    '''
+
+    Args:
+        M_port (numpy.ndarray): Windows matrix (of a port) (start, end, period)
+        gcd (int): Greates common divisor of all matrix element
+        lcm (int): hyperperiod of the ports periods
+
+    Returns:
+        Approximate peak memory in bytes of interval_occupation, Approximate peak memory in bytes of packed_occupation
+    '''
+    columns = int(lcm) // int(gcd)
+    instances = sum(int(lcm) // int(period) for period in M_port[:, 2] if period != 0)
+
+    interval_bytes = instances * INTERVAL_BYTES_PER_INSTANCE
+    packed_bytes = M_port.shape[0] * columns // 8 + columns  # packed rows + unpacked pattern of one row
+    return interval_bytes, packed_bytes
+
+
+def pack_window_matrices(matrices: list):
+    '''
+
+    Args:
+        matrices (list): Windows matrices of several ports, each (start, end, period) with up to 8 rows
+
+    Returns:
+        Tensor of all windows (ports x 8 x 3), Mask (ports x 8) with True for rows belonging to a queue
+    '''
+    rows = max([8] + [M.shape[0] for M in matrices])
+    W = np.zeros([len(matrices), rows, 3], dtype=np.int64)
+    mask = np.zeros([len(matrices), rows], dtype=bool)
+
+    for i, M in enumerate(matrices):
+        W[i, :M.shape[0]] = M
+        mask[i, :M.shape[0]] = True
+
+    return W, mask
+
+
+def batch_single_period_occupation(W: np.ndarray, mask: np.ndarray):
+    '''
+    Calculates the occupation of many ports at once. Only ports whose windows share one period and lie within it can be
+    calculated this way (overlapping windows are fine).
+
+    Args:
+        W (numpy.ndarray): Tensor of windows (ports x rows x 3), see pack_window_matrices
+        mask (numpy.ndarray): Mask (ports x rows), True for rows belonging to a queue
+
+    Returns:
+        Vector of occupation percentages, Vector with True for ports that could be calculated (others are 0)
+    '''
+    starts = W[:, :, 0]
+    ends = W[:, :, 1]
+    periods = W[:, :, 2]
+
+    # Period of the first queue of each port, all other queues must have the same
+    period = periods[:, 0]
+    same_period = np.all((periods == period[:, None]) | ~mask, axis=1)
+    within_period = np.all(((starts >= 0) & (ends >= starts) & (ends <= period[:, None])) | ~mask, axis=1)
+    vectorized = np.any(mask, axis=1) & (period > 0) & same_period & within_period
+
+    # Rows without queue become empty windows at 0, which don't contribute to the sweep
+    starts = np.where(mask, starts, 0)
+    ends = np.where(mask, ends, 0)
+
+    # Sweep over windows sorted by start. Every window only adds the part reaching past all previous ones
+    order = np.argsort(starts, axis=1, kind='mergesort')
+    starts = np.take_along_axis(starts, order, axis=1)
+    ends = np.take_along_axis(ends, order, axis=1)
+    reach = np.concatenate((starts[:, :1], np.maximum.accumulate(ends, axis=1)[:, :-1]), axis=1)
+    occupied = np.clip(ends - np.maximum(starts, reach), 0, None).sum(axis=1)
+
+    occupation = np.zeros(W.shape[0])
+    occupation[vectorized] = occupied[vectorized] / period[vectorized]
+    return occupation, vectorized
+
+
 def vector_lcm(V: np.ndarray):
     '''
 
@@ -0,0 +1,691 @@
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+from collections import Counter
+
+from data_structures.TestCase import TestCase
+from wcd.cache import WCDResultCache
+from wcd.network_calculus import NetworkCalculusAnalyzer
+from wcd.sandbox import SandboxPool
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+DEBUG = False
+
+# Names of the backends, as used in config.ini
+BACKEND_TSNNETCAL = 'tsnnetcal'  # External TSNNetCal.exe
+BACKEND_NETWORKCALCULUS = 'networkcalculus'  # In-process NetworkCalculusAnalyzer
+BACKEND_REPLAY = 'replay'  # Answers from a RecordStore
+BACKEND_DAEMON = 'daemon'  # Resident analysis server, see wcd.daemon
+
+# Maximum time to wait for the output files after TSNNetCal exited, in seconds
+OUTPUT_FILE_TIMEOUT = 15
+
+# Number of times DaemonBackend reconnects before an analysis fails
+DAEMON_RECONNECT_ATTEMPTS = 3
+# Extra time the daemon gets for an analysis on top of the timeout, in seconds
+DAEMON_TIMEOUT_MARGIN = 5
+
+
+def debug_print(s, end='\n'):
+    if DEBUG:
+        print(s, end=end)
+
+
+def serialize_gcl(s: TestCase):
+    """
+
+    Args:
+        s (TestCase): Solution to be serialized
+
+    Returns:
+        The lines of the historySCHED1 (GCL) file for the windows of the solution
+    """
+    lines = ['#open time, close time, period, priority\n']
+
+    for switch in s.switches.values():
+        for dest_name in switch.output_ports.keys():
+            port = switch.output_ports[dest_name]
+            lines.append('{},{}\n'.format(switch.uid, dest_name))
+
+            i = 0
+            for priority in port.get_sorted_queuenrs():
+                row = port._M_Windows[i]
+                offset = row[0]
+                end = row[1]
+                period = row[2]
+                lines.append(
+                    '{}\t{}\t{}\t{}\n'.format(offset, end, period,
+                                              priority))
+                i += 1
+
+            lines.append('\n')
+
+    return lines
+
+
+def wait_for_files(paths: list, timeout: float):
+    """
+    Waits until all files exist. Watches their folders for changes if watchdog is installed, polls with increasing
+    intervals otherwise.
+
+    Args:
+        paths (list): Paths of files
+        timeout (float): Maximum time to wait, in seconds
+
+    Returns:
+        True, if all files exist
+    """
+    def all_exist():
+        return all(os.path.exists(path) for path in paths)
+
+    if all_exist():
+        return True
+
+    if Observer is not None:
+        created = threading.Event()
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if all_exist():
+                    created.set()
+
+        observer = Observer()
+        for folder in set(os.path.dirname(path) for path in paths):
+            observer.schedule(Handler(), folder)
+        observer.start()
+        try:
+            # Files may have been created before watching started
+            return all_exist() or created.wait(timeout)
+        finally:
+            observer.stop()
+            observer.join()
+
+    deadline = time.time() + timeout
+    interval = 0.001
+    while not all_exist():
+        if time.time() > deadline:
+            return False
+        time.sleep(interval)
+        interval = min(interval * 2, 0.1)
+    return True
+
+
+def serialize_msg(s: TestCase):
+    """
+
+    Args:
+        s (TestCase): TestCase object
+
+    Returns:
+        The lines of msg.txt describing the streams of the testcase (one virtual link per stream)
+    """
+    lines = ['#id, size(byte), deadline(us), route(virtual link id), TT,  priority(0-7, 0 highest), period(us)\n']
+    for stream in s.streams.values():
+        lines.append('{}, {}, {}, {}, TT, {}, {}\n'.format(stream.uid, stream.size, stream.deadline, stream.uid,
+                                                            stream.priority, stream.period))
+    return lines
+
+
+def serialize_vls(s: TestCase):
+    """
+
+    Args:
+        s (TestCase): TestCase object
+
+    Returns:
+        The lines of vls.txt describing the routes of the testcase (one virtual link per stream)
+    """
+    lines = []
+    for stream in s.streams.values():
+        links = ['{},{}'.format(stream.route[i].uid, stream.route[i + 1].uid) for i in range(len(stream.route) - 1)]
+        lines.append('{} : {} ;\n'.format(stream.uid, ' ; '.join(links)))
+    return lines
+
+
+def serialize_testcase_inputs(s: TestCase):
+    """
+
+    Args:
+        s (TestCase): TestCase object
+
+    Returns:
+        The lines of msg.txt and vls.txt describing the streams and routes of the testcase
+    """
+    return serialize_msg(s) + serialize_vls(s)
+
+
+def add_hit_rate(statistics: dict):
+    """
+    Adds the cache hit rate to statistics containing cache hits and misses.
+
+    Args:
+        statistics (dict): Dict(counter name, value)
+
+    Returns:
+        statistics
+    """
+    lookups = statistics.get('wcd_cache_hits', 0) + statistics.get('wcd_cache_misses', 0)
+    if lookups > 0:
+        statistics['wcd_cache_hit_rate'] = round(statistics.get('wcd_cache_hits', 0) / lookups, 4)
+    return statistics
+
+
+class WCDBackend(object):
+    """Interface of all worst-case delay analyses used by SolutionChecker"""
+
+    def analyze(self, s: TestCase, timeout: int):
+        """
+
+        Args:
+            s (TestCase): Solution to be analyzed
+            timeout (int): timeout for the analysis, in seconds
+
+        Returns:
+            List of worst-case E2E delay strings, List of worst-case port delay strings, in the format of TSNNetCal's
+            output files (WCEndtoEndDelay.txt, TmpWCPortDelay.txt). Both empty if the analysis failed
+        """
+        raise NotImplementedError
+
+    def get_inputs(self, s: TestCase):
+        """
+
+        Args:
+            s (TestCase): Solution to be analyzed
+
+        Returns:
+            Contents of the inputs the analysis reads besides the GCL, as bytes
+        """
+        return ''.join(serialize_testcase_inputs(s)).encode('utf-8')
+
+    def get_analyzing_backend(self):
+        """
+
+        Returns:
+            The backend running the analysis, if this backend wraps another one (e.g. for caching). Itself otherwise
+        """
+        return self
+
+    def get_statistics(self):
+        """
+
+        Returns:
+            Dict(counter name, value) of this backend and the backends it wraps
+        """
+        return {}
+
+
+def get_analysis_key(backend: WCDBackend, s: TestCase, timeout: int):
+    """
+
+    Args:
+        backend (WCDBackend): Backend doing the analysis or wrapping it
+        s (TestCase): Solution to be analyzed
+        timeout (int): timeout for the analysis, in seconds
+
+    Returns:
+        Hash of the analyzing backend, its inputs (e.g. msg.txt, vls.txt, rate.txt), the GCL and the timeout
+    """
+    backend = backend.get_analyzing_backend()
+    key = hashlib.sha256()
+    for part in [type(backend).__name__.encode('utf-8'), backend.get_inputs(s),
+                 ''.join(serialize_gcl(s)).encode('utf-8'), 'timeout: {}'.format(timeout).encode('utf-8')]:
+        key.update(hashlib.sha256(part).digest())
+    return key.hexdigest()
+
+
+class TSNNetCalBackend(WCDBackend):
+    """Runs the external TSNNetCal.exe on a sandbox copy of the testcase folder staged by input_parser.parse_testcase"""
+
+    def __init__(self, wcdtool_path: str, wcdtool_testcase_subpath: str, sandboxes: int = 1):
+        """
+
+        Args:
+            wcdtool_path (str): Path to WCDTool executable
+            wcdtool_testcase_subpath (str): Relative path from WCDTool executable to testcase folder
+            sandboxes (int): Number of analyses of the same testcase that can run at the same time
+        """
+        self.wcdtool_path = wcdtool_path
+        self.wcdtool_testcase_subpath = wcdtool_testcase_subpath
+        self.sandbox_pool = SandboxPool(wcdtool_path, wcdtool_testcase_subpath, sandboxes)
+        self.statistics = Counter()
+
+    def analyze(self, s: TestCase, timeout: int):
+        with self.sandbox_pool.lease(s.name) as sandbox:
+            self.write_gcl(s, sandbox)
+            debug_print('Solution serialized')
+            return self.read_wcd_output(sandbox, timeout)
+
+    def get_inputs(self, s: TestCase):
+        # The files TSNNetCal reads, as staged to the sandboxes
+        self.sandbox_pool.stage(s.name)
+        in_folder = os.path.join(self.get_testcase_folder('{}_0'.format(s.name)), 'in')
+        inputs = b''
+        for file_name in ['msg.txt', 'vls.txt', 'rate.txt']:
+            with open(os.path.join(in_folder, file_name), 'rb') as f:
+                inputs += f.read() + b'\0'
+        return inputs
+
+    def get_testcase_folder(self, name: str):
+        """
+
+        Args:
+            name (str): Name of testcase or sandbox
+
+        Returns:
+            Folder of the testcase in the WCDTool folder, containing "in" and "out"
+        """
+        return self.sandbox_pool.get_folder(name)
+
+    def write_gcl(self, s: TestCase, sandbox: str):
+        """
+        Writes historySCHED1.txt to the input folder of the sandbox.
+
+        Args:
+            s (TestCase): Solution to be serialized
+            sandbox (str): Name of leased sandbox
+
+        Returns:
+            The lines written to historySCHED1 (GCL) file
+        """
+        in_folder = os.path.join(self.get_testcase_folder(sandbox), 'in')
+
+        # Write historySCHED1.txt
+        lines = serialize_gcl(s)
+        historySCHED1 = open(os.path.join(in_folder, 'historySCHED1.txt'), 'w+')
+        historySCHED1.write(''.join(lines))
+        historySCHED1.write('#')  # comment out last line, since no empty last line is allowed
+        historySCHED1.close()
+        return lines
+
+    def read_wcd_output(self, sandbox: str, timeout: int):
+        """
+
+        Args:
+            sandbox (str): Name of leased sandbox
+            timeout (int): timeout for waiting for result of wcd-analysis, in seconds
+
+        Returns:
+            List of worst-case E2E delay string, List of worst-case port delay strings
+        """
+        wce2edelay_list = []
+        wcportdelay_list = []
+
+        try:
+            # Returns, when TSNNetCal exited
+            t = time.time()
+            proc = subprocess.run(
+                args=[os.path.join(self.wcdtool_path, 'TSNNetCal.exe'),
+                      os.path.join(self.wcdtool_testcase_subpath, sandbox)],
+                stdout=subprocess.PIPE, timeout=timeout)
+            self.add_time('wcd_run_ms', t)
+            self.statistics['wcd_runs'] += 1
+
+            if str(proc.stdout).startswith('b\'OK') or str(proc.stdout).startswith('b\'Create object failed!'):
+                # SUCCESS
+                out_folder = os.path.join(self.get_testcase_folder(sandbox), 'out')
+                wcportdelay_file_path = os.path.join(out_folder, 'TmpWCPortDelay.txt')
+                wce2edelay_file_path = os.path.join(out_folder, 'WCEndtoEndDelay.txt')
+
+                # Output files are usually complete at exit, but may appear late on network drives
+                t = time.time()
+                found = wait_for_files([wcportdelay_file_path, wce2edelay_file_path], OUTPUT_FILE_TIMEOUT)
+                self.add_time('wcd_wait_ms', t)
+                if not found:
+                    print('TSNNetCal output files missing')
+                    return wce2edelay_list, wcportdelay_list
+
+                t = time.time()
+                with open(wcportdelay_file_path, 'r') as wcportdelay_file:
+                    wcportdelay_list = wcportdelay_file.readlines()
+                with open(wce2edelay_file_path, 'r') as wce2edelay_file:
+                    wce2edelay_list = wce2edelay_file.readlines()
+                self.add_time('wcd_parse_ms', t)
+            else:
+                print('TSNNetCal returned unexpected result')
+                # print(proc.stdout.decode("utf-8"))
+        except subprocess.TimeoutExpired:
+            print('TSNNetCal Timeout')
+
+        return wce2edelay_list, wcportdelay_list
+
+    def add_time(self, counter: str, t_start: float):
+        """
+
+        Args:
+            counter (str): Name of statistics counter
+            t_start (float): Start time in seconds
+        """
+        self.statistics[counter] += int(round((time.time() - t_start) * 1000))
+
+    def get_statistics(self):
+        return dict(self.statistics)
+
+
+class NetworkCalculusBackend(WCDBackend):
+    """Analyzes in-process with NetworkCalculusAnalyzer"""
+
+    def __init__(self, incremental: bool = False):
+        """
+
+        Args:
+            incremental (bool): If only queues affected by changed windows should be analyzed again
+        """
+        self.analyzer = NetworkCalculusAnalyzer(incremental)
+
+    def analyze(self, s: TestCase, timeout: int):
+        return self.analyzer.analyze(s)
+
+    def get_statistics(self):
+        return dict(self.analyzer.statistics)
+
+
+class DaemonBackend(WCDBackend):
+    """Client of a resident analysis server (see wcd.daemon), which keeps the streams and routes of a testcase loaded
+    and only receives the GCL for each analysis. Saves the startup of an analysis process per call. Requests and
+    responses are JSON objects, one per line"""
+
+    def __init__(self, host: str, port: int):
+        """
+
+        Args:
+            host (str): Host of the server
+            port (int): Port of the server
+        """
+        self.host = host
+        self.port = port
+        self.statistics = Counter()
+        self._socket = None
+        self._file = None
+        self._loaded = set()  # Names of testcases loaded on the server over the current connection
+
+    def __getstate__(self):
+        # Sockets can't be pickled (e.g. for worker processes), they are reopened when needed
+        state = self.__dict__.copy()
+        state['_socket'] = None
+        state['_file'] = None
+        state['_loaded'] = set()
+        return state
+
+    def connect(self):
+        self._socket = socket.create_connection((self.host, self.port))
+        self._file = self._socket.makefile('rw', encoding='utf-8', newline='\n')
+        self._loaded = set()
+        self.statistics['wcd_daemon_connects'] += 1
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._file.close()
+                self._socket.close()
+            except OSError:
+                pass
+        self._socket = None
+        self._file = None
+
+    def request(self, request: dict, timeout: float):
+        """
+
+        Args:
+            request (dict): Request sent to the server
+            timeout (float): Maximum time to wait for the response, in seconds
+
+        Returns:
+            Response of the server as dict
+        """
+        if self._socket is None:
+            self.connect()
+        self._socket.settimeout(timeout)
+        self._file.write(json.dumps(request) + '\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError('Connection closed by analysis server')
+        return json.loads(line)
+
+    def analyze(self, s: TestCase, timeout: int):
+        for attempt in range(DAEMON_RECONNECT_ATTEMPTS):
+            try:
+                if s.name not in self._loaded:
+                    self.request({'op': 'load', 'testcase': s.name, 'msg': serialize_msg(s), 'vls': serialize_vls(s)},
+                                 timeout + DAEMON_TIMEOUT_MARGIN)
+                    self._loaded.add(s.name)
+
+                response = self.request({'op': 'analyze', 'testcase': s.name, 'gcl': serialize_gcl(s),
+                                         'timeout': timeout}, timeout + DAEMON_TIMEOUT_MARGIN)
+                if response['ok']:
+                    self.statistics['wcd_daemon_analyses'] += 1
+                    return response['wce2edelays'], response['wcportdelays']
+
+                print('Analysis server failed: {}'.format(response['error']))
+                return [], []
+            except (OSError, ValueError) as e:
+                # Includes timeouts and lost connections. Server may have been restarted -> reconnect
+                debug_print('Connection to analysis server lost ({})'.format(e))
+                self.close()
+                time.sleep(0.1 * 2 ** attempt)
+
+        print('Analysis server not reachable at {}:{}'.format(self.host, self.port))
+        return [], []
+
+    def get_statistics(self):
+        return dict(self.statistics)
+
+
+class RecordStore(object):
+    """Folder of recorded analyses. One JSON file per testcase and analysis: <path>/<testcase>/<key>.json, with the key
+    of get_analysis_key"""
+
+    def __init__(self, path: str):
+        """
+
+        Args:
+            path (str): Folder of the store. Created if not existant
+        """
+        self.path = path
+
+    def get_record_path(self, tc_name: str, key: str):
+        """
+
+        Args:
+            tc_name (str): Name of testcase
+            key (str): Key of the analysis, see get_analysis_key
+
+        Returns:
+            Path of the record file
+        """
+        return os.path.join(self.path, tc_name, key + '.json')
+
+    def save(self, tc_name: str, key: str, gcl_lines: list, wce2edelay_list: list, wcportdelay_list: list):
+        """
+
+        Args:
+            tc_name (str): Name of testcase
+            key (str): Key of the analysis, see get_analysis_key
+            gcl_lines (list): Lines of the GCL file, see serialize_gcl
+            wce2edelay_list (list): List of worst-case E2E delay strings
+            wcportdelay_list (list): List of worst-case port delay strings
+        """
+        record_path = self.get_record_path(tc_name, key)
+        os.makedirs(os.path.dirname(record_path), exist_ok=True)
+
+        # Write to temporary file first, so readers never see half written records
+        tmp_path = '{}.{}.tmp'.format(record_path, os.getpid())
+        record_file = open(tmp_path, 'w')
+        json.dump({'gcl': gcl_lines, 'wce2edelays': wce2edelay_list, 'wcportdelays': wcportdelay_list}, record_file)
+        record_file.close()
+        os.replace(tmp_path, record_path)
+
+    def load(self, tc_name: str, key: str):
+        """
+
+        Args:
+            tc_name (str): Name of testcase
+            key (str): Key of the analysis, see get_analysis_key
+
+        Returns:
+            List of worst-case E2E delay strings, List of worst-case port delay strings or None, if not recorded
+        """
+        record_path = self.get_record_path(tc_name, key)
+        if not os.path.exists(record_path):
+            return None
+
+        record_file = open(record_path, 'r')
+        record = json.load(record_file)
+        record_file.close()
+        return record['wce2edelays'], record['wcportdelays']
+
+
+class CachedBackend(WCDBackend):
+    """Answers from a WCDResultCache if the same schedule of the same testcase was analyzed before (also in previous
+    runs). Analyzes with another backend otherwise and caches the result"""
+
+    def __init__(self, backend: WCDBackend, cache: WCDResultCache):
+        """
+
+        Args:
+            backend (WCDBackend): Backend doing the analysis on cache misses
+            cache (WCDResultCache): Where to store the results
+        """
+        self.backend = backend
+        self.cache = cache
+        self.statistics = Counter()
+
+    def get_key(self, s: TestCase, timeout: int):
+        """
+
+        Args:
+            s (TestCase): Solution to be analyzed
+            timeout (int): timeout for the analysis, in seconds
+
+        Returns:
+            Key of the analysis, see get_analysis_key
+        """
+        return get_analysis_key(self, s, timeout)
+
+    def analyze(self, s: TestCase, timeout: int):
+        key = self.get_key(s, timeout)
+        result = self.cache.get(key)
+        if result is not None:
+            self.statistics['wcd_cache_hits'] += 1
+            return result
+
+        self.statistics['wcd_cache_misses'] += 1
+        wce2edelay_list, wcportdelay_list = self.backend.analyze(s, timeout)
+        if len(wce2edelay_list) > 0 and len(wcportdelay_list) > 0:
+            self.cache.put(key, wce2edelay_list, wcportdelay_list)
+        return wce2edelay_list, wcportdelay_list
+
+    def get_analyzing_backend(self):
+        return self.backend.get_analyzing_backend()
+
+    def get_statistics(self):
+        statistics = dict(self.backend.get_statistics())
+        statistics.update(self.statistics)
+        return add_hit_rate(statistics)
+
+
+class RecordBackend(WCDBackend):
+    """Analyzes with another backend and records the GCL and resulting delays of every successful analysis"""
+
+    def __init__(self, backend: WCDBackend, store: RecordStore):
+        """
+
+        Args:
+            backend (WCDBackend): Backend doing the analysis
+            store (RecordStore): Where to record the analyses
+        """
+        self.backend = backend
+        self.store = store
+
+    def analyze(self, s: TestCase, timeout: int):
+        wce2edelay_list, wcportdelay_list = self.backend.analyze(s, timeout)
+        if len(wce2edelay_list) > 0 and len(wcportdelay_list) > 0:
+            self.store.save(s.name, get_analysis_key(self, s, timeout), serialize_gcl(s), wce2edelay_list,
+                            wcportdelay_list)
+        return wce2edelay_list, wcportdelay_list
+
+    def get_analyzing_backend(self):
+        return self.backend.get_analyzing_backend()
+
+    def get_statistics(self):
+        return self.backend.get_statistics()
+
+
+class ReplayBackend(WCDBackend):
+    """Answers from a RecordStore without running any analysis. Schedules that were not recorded fail"""
+
+    def __init__(self, store: RecordStore, backend: WCDBackend):
+        """
+
+        Args:
+            store (RecordStore): Recorded analyses
+            backend (WCDBackend): Backend whose analyses were recorded. Only used for the keys of the records, it never
+                analyzes
+        """
+        self.store = store
+        self.backend = backend
+
+    def analyze(self, s: TestCase, timeout: int):
+        record = self.store.load(s.name, get_analysis_key(self.backend, s, timeout))
+        if record is None:
+            print('No recorded WCD analysis for this schedule of {}'.format(s.name))
+            return [], []
+        return record
+
+
+def create_backend(wcdtool_path: str, wcdtool_testcase_subpath: str, options: dict):
+    """
+
+    Args:
+        wcdtool_path (str): Path to WCDTool executable
+        wcdtool_testcase_subpath (str): Relative path from WCDTool executable to testcase folder
+        options (dict): directory of options specified by user
+
+    Returns:
+        WCDBackend selected by options['wcd_backend'], cached in options['wcd_cache'] and recording to
+        options['wcd_record_store'] if set
+    """
+    if options['wcd_backend'] == BACKEND_REPLAY:
+        recorded_backend = create_analysis_backend(options['wcd_replay_backend'], wcdtool_path,
+                                                   wcdtool_testcase_subpath, options)
+        return ReplayBackend(RecordStore(options['wcd_record_store']), recorded_backend)
+
+    backend = create_analysis_backend(options['wcd_backend'], wcdtool_path, wcdtool_testcase_subpath, options)
+    if options['wcd_cache']:
+        backend = CachedBackend(backend, WCDResultCache(options['wcd_cache'], options['wcd_cache_max_size']))
+    if options['wcd_record_store']:
+        backend = RecordBackend(backend, RecordStore(options['wcd_record_store']))
+    return backend
+
+
+def create_analysis_backend(name: str, wcdtool_path: str, wcdtool_testcase_subpath: str, options: dict):
+    """
+
+    Args:
+        name (str): Name of the backend, see BACKEND_*
+        wcdtool_path (str): Path to WCDTool executable
+        wcdtool_testcase_subpath (str): Relative path from WCDTool executable to testcase folder
+        options (dict): directory of options specified by user
+
+    Returns:
+        WCDBackend running the analysis, without caching or recording
+    """
+    if name == BACKEND_TSNNETCAL:
+        backend = TSNNetCalBackend(wcdtool_path, wcdtool_testcase_subpath, options['wcd_sandboxes'])
+    elif name == BACKEND_NETWORKCALCULUS:
+        backend = NetworkCalculusBackend(options['wcd_incremental'])
+    elif name == BACKEND_DAEMON:
+        host, port = options['wcd_daemon_address'].rsplit(':', 1)
+        backend = DaemonBackend(host, int(port))
+    else:
+        raise ValueError('Unknown WCD backend {}'.format(name))
+    return backend
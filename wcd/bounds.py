@@ -0,0 +1,87 @@
+import math
+from collections import Counter
+
+from data_structures.Stream import Stream
+from data_structures.TestCase import TestCase
+from wcd.network_calculus import NetworkCalculusAnalyzer
+
+DEBUG = False
+
+FEASIBLE = 'feasible'  # Worst-case delay surely below deadline
+INFEASIBLE = 'infeasible'  # Worst-case delay surely above deadline
+UNKNOWN = 'unknown'  # Only a WCD analysis can tell
+
+
+def debug_print(s, end='\n'):
+    if DEBUG:
+        print(s, end=end)
+
+
+def get_lower_bound(s: TestCase, stream: Stream):
+    """
+    Lower bound of the worst-case delay of a stream: every hop takes at least its sending time. On switches, a frame
+    arriving when the window of its queue closes additionally waits until the window opens again.
+
+    Args:
+        s (TestCase): Solution
+        stream (Stream): Stream object
+
+    Returns:
+        Lower bound of the worst-case e2e delay in us. math.inf if a window is too short for the frames of the stream
+    """
+    delay = 0
+    for i in range(len(stream.route) - 1):
+        node_uid = stream.route[i].uid
+        delay += stream.sending_time
+
+        if node_uid in s.switches:
+            window = s.switches[node_uid].output_ports[stream.route[i + 1].uid].get_window(stream.priority)
+            length = int(window[1]) - int(window[0])
+            if length < stream.sending_time:
+                return math.inf
+            delay += int(window[2]) - length
+
+    return delay
+
+
+class BoundsChecker(object):
+    """Decides if a stream meets its deadline with analytic bounds, so a WCD analysis is only needed if the bounds are not
+    tight enough. The upper bound is the in-process NetworkCalculusAnalyzer, which is conservative compared to
+    TSNNetCal. Call sites count the WCD analyses skipped (wcd_checks_skipped) and run despite the bounds
+    (wcd_checks_not_skipped) in statistics"""
+
+    def __init__(self, use_upper_bound: bool = True):
+        """
+
+        Args:
+            use_upper_bound (bool): If the upper bound should be calculated. Pointless if the WCD analysis is the
+                NetworkCalculusAnalyzer itself
+        """
+        self.use_upper_bound = use_upper_bound
+        self.analyzer = NetworkCalculusAnalyzer(incremental=True)
+        self.statistics = Counter()
+
+    def classify(self, s: TestCase, stream: Stream):
+        """
+
+        Args:
+            s (TestCase): Solution
+            stream (Stream): Stream object
+
+        Returns:
+            FEASIBLE, INFEASIBLE or UNKNOWN. Streams with unbounded delay are UNKNOWN, since they are reported separately
+            by the WCD analysis
+        """
+        lower = get_lower_bound(s, stream)
+        if not math.isinf(lower) and lower > stream.deadline:
+            debug_print('{}: lower bound {} > deadline {}'.format(stream.uid, lower, stream.deadline))
+            return INFEASIBLE
+
+        if self.use_upper_bound and not math.isinf(lower):
+            e2e_delays, _ = self.analyzer.calculate_delays(s)
+            if e2e_delays[stream.uid] <= stream.deadline:
+                debug_print('{}: upper bound {} <= deadline {}'.format(stream.uid, e2e_delays[stream.uid],
+                                                                      stream.deadline))
+                return FEASIBLE
+
+        return UNKNOWN
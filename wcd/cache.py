@@ -0,0 +1,111 @@
+import json
+import os
+import sqlite3
+import time
+
+DEBUG = False
+
+
+def debug_print(s, end='\n'):
+    if DEBUG:
+        print(s, end=end)
+
+
+class WCDResultCache(object):
+    """SQLite file with the results of WCD analyses, keyed by a hash of everything the analysis depends on. When the
+    file grows larger than max_size, the least recently used results are deleted."""
+
+    def __init__(self, path: str, max_size: int):
+        """
+
+        Args:
+            path (str): Path to SQLite file. Created if not existant
+            max_size (int): Maximum size of all stored results in bytes
+        """
+        self.path = path
+        self.max_size = max_size
+        self._connection = None
+
+    def __getstate__(self):
+        # Connections can't be pickled (e.g. for worker processes), they are reopened when needed
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        return state
+
+    def get_connection(self):
+        """
+
+        Returns:
+            Open sqlite3 connection, table created if not existant
+        """
+        if self._connection is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, wce2edelays TEXT, '
+                                     'wcportdelays TEXT, size INTEGER, last_used REAL)')
+            self._connection.commit()
+        return self._connection
+
+    def get(self, key: str):
+        """
+
+        Args:
+            key (str): Hash of the analysis inputs
+
+        Returns:
+            List of worst-case E2E delay strings, List of worst-case port delay strings or None, if not cached
+        """
+        connection = self.get_connection()
+        row = connection.execute('SELECT wce2edelays, wcportdelays FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+
+        connection.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key))
+        connection.commit()
+        return json.loads(row[0]), json.loads(row[1])
+
+    def put(self, key: str, wce2edelay_list: list, wcportdelay_list: list):
+        """
+
+        Args:
+            key (str): Hash of the analysis inputs
+            wce2edelay_list (list): List of worst-case E2E delay strings
+            wcportdelay_list (list): List of worst-case port delay strings
+        """
+        wce2edelays = json.dumps(wce2edelay_list)
+        wcportdelays = json.dumps(wcportdelay_list)
+
+        connection = self.get_connection()
+        connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                           (key, wce2edelays, wcportdelays, len(key) + len(wce2edelays) + len(wcportdelays),
+                            time.time()))
+        self.evict(connection)
+        connection.commit()
+
+    def evict(self, connection):
+        """
+        Deletes least recently used results until all results fit into max_size.
+
+        Args:
+            connection: sqlite3 connection
+        """
+        total_size = connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total_size <= self.max_size:
+            return
+
+        removed_size = 0
+        removed_keys = []
+        for key, size in connection.execute('SELECT key, size FROM results ORDER BY last_used'):
+            if total_size - removed_size <= self.max_size:
+                break
+            removed_keys.append((key,))
+            removed_size += size
+
+        connection.executemany('DELETE FROM results WHERE key = ?', removed_keys)
+        debug_print('Evicted {} cached WCD results'.format(len(removed_keys)))
+
+    def __len__(self):
+        return self.get_connection().execute('SELECT COUNT(*) FROM results').fetchone()[0]
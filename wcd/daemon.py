@@ -0,0 +1,110 @@
+"""
+Resident analysis server for DaemonBackend. Keeps the streams and routes of each testcase loaded and analyzes the GCLs it
+receives, so no analysis process has to be started per check. Stands in for a resident TSNNetCal with the in-process
+NetworkCalculusAnalyzer.
+
+Run with: python -m wcd.daemon [port]
+"""
+import json
+import re
+import socketserver
+import sys
+import threading
+
+from utility.input_parser import parse_testcase_lines
+from wcd.network_calculus import NetworkCalculusAnalyzer
+
+DEBUG = False
+DEFAULT_PORT = 8765
+
+
+def debug_print(s, end='\n'):
+    if DEBUG:
+        print(s, end=end)
+
+
+def apply_gcl(s, gcl_lines: list):
+    """
+    Sets the windows of the testcase to the ones of a GCL.
+
+    Args:
+        s (TestCase): TestCase object
+        gcl_lines (list): Lines of a historySCHED1 (GCL) file, as written by wcd.backends.serialize_gcl
+    """
+    port = None
+    for line in gcl_lines:
+        if line.startswith('#') or not line.strip():
+            continue
+
+        m = re.match(r'(\d+)\s+(\d+)\s+(\d+)\s+(\d+)', line)
+        if m is not None:
+            offset, end, period, priority = [int(x) for x in m.groups()]
+            port.set_window(priority, offset, end - offset, period)
+        else:
+            switch_uid, dest_uid = line.strip().split(',')
+            port = s.switches[switch_uid].output_ports[dest_uid]
+
+
+class AnalysisRequestHandler(socketserver.StreamRequestHandler):
+    """Handles the requests of one DaemonBackend connection"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.handle_request_dict(json.loads(line.decode('utf-8')))
+            except Exception as e:
+                response = {'ok': False, 'error': repr(e)}
+            self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+
+class AnalysisServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Server answering "load" requests (streams and routes of a testcase in msg.txt and vls.txt format) and "analyze"
+    requests (GCL of a loaded testcase) with the same lines TSNNetCal writes to its output files"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple):
+        """
+
+        Args:
+            address (tuple): (host, port) to listen on. Port 0 for any free port
+        """
+        socketserver.TCPServer.__init__(self, address, AnalysisRequestHandler)
+        self.testcases = {}  # Map(testcase name, TestCase)
+        self.analyzer = NetworkCalculusAnalyzer(incremental=True)
+        self.lock = threading.Lock()
+
+    def handle_request_dict(self, request: dict):
+        """
+
+        Args:
+            request (dict): Request of a client
+
+        Returns:
+            Response as dict
+        """
+        with self.lock:
+            if request['op'] == 'load':
+                self.testcases[request['testcase']] = parse_testcase_lines(request['msg'], request['vls'],
+                                                                           request['testcase'])
+                debug_print('Loaded {}'.format(request['testcase']))
+                return {'ok': True}
+            elif request['op'] == 'analyze':
+                if request['testcase'] not in self.testcases:
+                    return {'ok': False, 'error': 'Testcase {} not loaded'.format(request['testcase'])}
+
+                s = self.testcases[request['testcase']]
+                apply_gcl(s, request['gcl'])
+                wce2edelay_list, wcportdelay_list = self.analyzer.analyze(s)
+                return {'ok': True, 'wce2edelays': wce2edelay_list, 'wcportdelays': wcportdelay_list}
+            else:
+                return {'ok': False, 'error': 'Unknown operation {}'.format(request['op'])}
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    server = AnalysisServer(('localhost', port))
+    print('Analysis server listening on port {}'.format(port))
+    server.serve_forever()
@@ -0,0 +1,331 @@
+import math
+from collections import OrderedDict, Counter, namedtuple
+
+from data_structures.TestCase import TestCase
+
+DEBUG = False
+
+# Fixed point iteration of the per-hop delays stops after this many rounds or if no delay changes more than EPSILON
+MAX_ITERATIONS = 1000
+EPSILON = 1e-9
+
+
+def debug_print(s, end='\n'):
+    if DEBUG:
+        print(s, end=end)
+
+
+# Result of the last analysis of a testcase, reused by incremental analyses
+AnalysisState = namedtuple('AnalysisState', ['signature', 'windows', 'e2e_delays', 'port_delays'])
+
+
+class NetworkCalculusAnalyzer(object):
+    """Worst-case delay analysis of TT streams with network calculus (total flow analysis), done in-process as a
+    replacement for TSNNetCal.
+
+    Every queue is modeled as a FIFO server. End-system ports have no windows and serve their queues with strict
+    priority at link rate. A switch queue is served only during its window (start, end, period). A frame is only
+    started if it fits into the rest of the window, which leaves end - start - (largest frame of the queue) of usable
+    window per period. This gives the rate-latency service curve
+    rate = usable / period, latency = period - usable.
+    Bursts of streams grow along their route by rate * (sum of delays of the previous hops). The per-hop delays are
+    iterated until they don't change anymore, so routes may form cycles.
+    Windows of different queues on a port are assumed not to overlap, as created by create_initial_solution.
+
+    In incremental mode, the result of the last analysis of each testcase is kept. Only the queues depending on ports
+    whose windows changed since then are analyzed again, the delays of all other queues and streams are reused.
+    """
+
+    def __init__(self, incremental: bool = False):
+        """
+
+        Args:
+            incremental (bool): If delays of queues not affected by changed windows should be reused
+        """
+        self.incremental = incremental
+        self.statistics = Counter()
+        self._states = {}  # Dict(testcase name, AnalysisState)
+
+    def analyze(self, s: TestCase):
+        """
+
+        Args:
+            s (TestCase): Solution to be analyzed
+
+        Returns:
+            List of worst-case E2E delay strings, List of worst-case port delay strings. Both in the format of the
+            output files of TSNNetCal (WCEndtoEndDelay.txt, TmpWCPortDelay.txt)
+        """
+        e2e_delays, port_delays = self.calculate_delays(s)
+
+        wcportdelay_list = []
+        for (from_uid, to_uid, priority), delay in port_delays.items():
+            # TSNNetCal reports queues without bounded delay with delay 0
+            wcportdelay_list.append('{} -> {}: {}, priority {}\n'.format(from_uid, to_uid, format_delay(delay, '0'),
+                                                                         priority))
+
+        wce2edelay_list = []
+        for stream_uid, delay in e2e_delays.items():
+            wce2edelay_list.append('{},{}:{}\n'.format(stream_uid, s.streams[stream_uid].route[-1].uid,
+                                                        format_delay(delay, 'INF')))
+
+        return wce2edelay_list, wcportdelay_list
+
+    def calculate_delays(self, s: TestCase):
+        """
+
+        Args:
+            s (TestCase): Solution to be analyzed
+
+        Returns:
+            OrderedDict(stream uid, worst-case e2e delay in us), OrderedDict((from uid, to uid, priority), worst-case
+            delay of queue in us). Unbounded delays are math.inf
+        """
+        network = AnalysisNetwork(s)
+        windows = get_windows_snapshot(s)
+
+        state = self._states.get(s.name) if self.incremental else None
+        if state is not None and state.signature == network.signature:
+            changed_ports = [port for port, key in windows.items() if state.windows.get(port) != key]
+            dirty = self.get_dirty_queues(network, changed_ports)
+            port_delays = OrderedDict(state.port_delays)
+            for queue in dirty:
+                port_delays[queue] = 0.0
+            queues = [queue for queue in network.queue_streams.keys() if queue in dirty]
+        else:
+            dirty = None
+            port_delays = OrderedDict((queue, 0.0) for queue in network.queue_streams.keys())
+            queues = list(network.queue_streams.keys())
+        self.statistics['wcd_queues_analyzed'] += len(queues)
+        self.statistics['wcd_queues_reused'] += len(port_delays) - len(queues)
+
+        if not self.iterate_delays(network, port_delays, queues):
+            # Delays still grow, e.g. on unstable cycles -> no bound for these queues
+            debug_print('Delays did not converge')
+            for queue in queues:
+                if self.queue_delay(network, queue, port_delays) > port_delays[queue] + EPSILON:
+                    port_delays[queue] = math.inf
+            self.iterate_delays(network, port_delays, queues)
+
+        e2e_delays = OrderedDict()
+        for stream in s.streams.values():
+            if dirty is None or any(queue in dirty for queue in network.stream_queues[stream.uid]):
+                e2e_delays[stream.uid] = sum(port_delays[queue] for queue in network.stream_queues[stream.uid])
+            else:
+                e2e_delays[stream.uid] = state.e2e_delays[stream.uid]
+
+        if self.incremental:
+            self._states[s.name] = AnalysisState(network.signature, windows, OrderedDict(e2e_delays),
+                                                 OrderedDict(port_delays))
+
+        return e2e_delays, port_delays
+
+    def get_dirty_queues(self, network, changed_ports: list):
+        """
+
+        Args:
+            network (AnalysisNetwork): Network to be analyzed
+            changed_ports (list): List of (switch uid, to uid) whose windows changed
+
+        Returns:
+            Set of queues whose delay may depend on the windows of the changed ports: the queues on the ports, all
+            queues after them on the routes of their streams and, on end systems, lower priority queues on the same
+            port as any of these
+        """
+        s = network.testcase
+        worklist = []
+        for from_uid, to_uid in changed_ports:
+            for uid in s.get_streams_on_port(from_uid, to_uid):
+                worklist.append((from_uid, to_uid, s.streams[uid].priority))
+
+        dirty = set()
+        while len(worklist) > 0:
+            queue = worklist.pop()
+            if queue in dirty:
+                continue
+            dirty.add(queue)
+
+            # Jitter of streams grows with delay of queue
+            for uid in network.queue_streams[queue]:
+                stream_queues = network.stream_queues[uid]
+                worklist.extend(stream_queues[stream_queues.index(queue) + 1:])
+
+            # Strict priority on end systems
+            if queue[0] not in s.switches:
+                worklist.extend(other for other in network.port_queues[queue[:2]] if other[2] > queue[2])
+
+        return dirty
+
+    def iterate_delays(self, network, port_delays: dict, queues: list = None):
+        """
+        Updates port_delays until they don't change anymore.
+
+        Args:
+            network (AnalysisNetwork): Network to be analyzed
+            port_delays (dict): Dict((from uid, to uid, priority), delay). Starting values, updated in place
+            queues (list): Queues to update, all if None. The delays of all other queues must not depend on them
+
+        Returns:
+            True, if the delays converged within MAX_ITERATIONS
+        """
+        if queues is None:
+            queues = list(network.queue_streams.keys())
+
+        for iteration in range(MAX_ITERATIONS):
+            changed = False
+            for queue in queues:
+                delay = self.queue_delay(network, queue, port_delays)
+                if math.isinf(delay) != math.isinf(port_delays[queue]) or abs(delay - port_delays[queue]) > EPSILON:
+                    port_delays[queue] = delay
+                    changed = True
+            if not changed:
+                debug_print('Delays converged after {} iterations'.format(iteration + 1))
+                return True
+        return False
+
+    def queue_delay(self, network, queue: tuple, port_delays: dict):
+        """
+
+        Args:
+            network (AnalysisNetwork): Network to be analyzed
+            queue (tuple): (from uid, to uid, priority)
+            port_delays (dict): current delays of all queues
+
+        Returns:
+            Worst-case delay of queue in us given the current delays of all queues. math.inf if unbounded
+        """
+        s = network.testcase
+        from_uid, to_uid, priority = queue
+        burst, rate = self.arrival_curve(network, queue, port_delays)
+
+        if from_uid in s.switches:
+            # Gated switch queue
+            window = s.switches[from_uid].output_ports[to_uid].get_window(priority)
+            length = int(window[1]) - int(window[0])
+            period = int(window[2])
+            usable = length - network.largest_frame[queue]
+
+            if period <= 0 or usable <= 0 or rate * period > usable:
+                return math.inf
+
+            return (period - usable) + burst * period / usable
+        else:
+            # End system port, strict priority without windows
+            higher_burst = 0
+            higher_rate = 0
+            lower_frame = 0
+            for other in network.port_queues[(from_uid, to_uid)]:
+                if other[2] < priority:
+                    b, r = self.arrival_curve(network, other, port_delays)
+                    higher_burst += b
+                    higher_rate += r
+                elif other[2] > priority:
+                    lower_frame = max(lower_frame, network.largest_frame[other])
+
+            if higher_rate + rate > 1:
+                return math.inf
+
+            return (higher_burst + burst + lower_frame) / (1 - higher_rate)
+
+    def arrival_curve(self, network, queue: tuple, port_delays: dict):
+        """
+
+        Args:
+            network (AnalysisNetwork): Network to be analyzed
+            queue (tuple): (from uid, to uid, priority)
+            port_delays (dict): current delays of all queues
+
+        Returns:
+            Burst in us of sending time, rate (sending time per us) of the aggregated streams entering the queue
+        """
+        burst = 0
+        rate = 0
+        for uid in network.queue_streams[queue]:
+            stream = network.testcase.streams[uid]
+            stream_rate = stream.sending_time / stream.period
+
+            # Jitter = sum of delays of the previous hops
+            jitter = 0
+            for previous in network.stream_queues[uid]:
+                if previous == queue:
+                    break
+                jitter += port_delays[previous]
+
+            burst += stream.sending_time
+            if stream_rate > 0:
+                burst += stream_rate * jitter
+            rate += stream_rate
+        return burst, rate
+
+
+class AnalysisNetwork(object):
+    """Queues of a TestCase and the streams using them, prepared for the analysis"""
+
+    def __init__(self, s: TestCase):
+        """
+
+        Args:
+            s (TestCase): TestCase object
+        """
+        self.testcase = s
+        self.queue_streams = OrderedDict()  # OrderedDict((from uid, to uid, priority), List of stream uids)
+        self.stream_queues = {}  # Dict(stream uid, List of queues along route)
+        self.port_queues = {}  # Dict((from uid, to uid), List of queues)
+        self.largest_frame = {}  # Dict(queue, highest sending time of all streams in queue)
+
+        # Everything the network depends on besides the windows, to decide if results can be reused
+        self.signature = tuple((stream.uid, stream.sending_time, stream.period, stream.priority,
+                                tuple(node.uid for node in stream.route)) for stream in s.streams.values())
+
+        for stream in s.streams.values():
+            self.stream_queues[stream.uid] = get_stream_queues(stream)
+            for queue in self.stream_queues[stream.uid]:
+                if queue not in self.queue_streams:
+                    self.queue_streams[queue] = []
+                    self.port_queues.setdefault(queue[:2], []).append(queue)
+                    self.largest_frame[queue] = 0
+                self.queue_streams[queue].append(stream.uid)
+                self.largest_frame[queue] = max(self.largest_frame[queue], stream.sending_time)
+
+
+def get_windows_snapshot(s: TestCase):
+    """
+
+    Args:
+        s (TestCase): TestCase object
+
+    Returns:
+        Dict((switch uid, to uid), hashable key of the windows of the port)
+    """
+    snapshot = {}
+    for switch in s.switches.values():
+        for port_uid, port in switch.output_ports.items():
+            snapshot[(switch.uid, port_uid)] = port.get_windows_key()
+    return snapshot
+
+
+def get_stream_queues(stream):
+    """
+
+    Args:
+        stream (Stream): Stream object
+
+    Returns:
+        List of queues (from uid, to uid, priority) along the route of the stream
+    """
+    return [(stream.route[i].uid, stream.route[i + 1].uid, stream.priority) for i in range(len(stream.route) - 1)]
+
+
+def format_delay(delay: float, infinity: str):
+    """
+
+    Args:
+        delay (float): Delay in us
+        infinity (str): String used for math.inf
+
+    Returns:
+        Delay as string, rounded up to 3 decimals
+    """
+    if math.isinf(delay):
+        return infinity
+    return '{:.3f}'.format(math.ceil(delay * 1000) / 1000)
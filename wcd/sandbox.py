@@ -0,0 +1,186 @@
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+DEBUG = False
+
+# rate.txt of testcases without their own
+RATE_FILE_CONTENT = '# link rate, integrationMode, bandwidthFractionA, bandwidthFractionB\n1000'
+
+
+def debug_print(s, end='\n'):
+    if DEBUG:
+        print(s, end=end)
+
+
+class SandboxPool(object):
+    """Pool of testcase folders "<tc_name>_<k>" next to the folder staged by input_parser.parse_testcase. Each sandbox
+    holds its own copy of the immutable inputs (msg.txt, vls.txt, rate.txt), so several analyses of the same testcase
+    can run at the same time, also from different processes. Sandboxes are leased through OS locks on lock files, which
+    are released when the process holding them dies."""
+
+    def __init__(self, wcdtool_path: str, wcdtool_testcase_subpath: str, size: int):
+        """
+
+        Args:
+            wcdtool_path (str): Path to WCDTool executable
+            wcdtool_testcase_subpath (str): Relative path from WCDTool executable to testcase folder
+            size (int): Number of sandboxes per testcase
+        """
+        self.wcdtool_path = wcdtool_path
+        self.wcdtool_testcase_subpath = wcdtool_testcase_subpath
+        self.size = size
+        self._staged = set()
+        self._locks = {}  # Map(sandbox name, file descriptor of locked lock file)
+
+    def __getstate__(self):
+        # Locks belong to the process holding them
+        state = self.__dict__.copy()
+        state['_locks'] = {}
+        return state
+
+    def get_folder(self, name: str):
+        """
+
+        Args:
+            name (str): Name of testcase or sandbox
+
+        Returns:
+            Folder of the testcase or sandbox in the WCDTool folder, containing "in" and "out"
+        """
+        return os.path.join(self.wcdtool_path, self.wcdtool_testcase_subpath, name)
+
+    def stage(self, tc_name: str):
+        """
+        Copies the inputs of the testcase to all its sandboxes. Only done once per pool, since the inputs never change
+        during optimization.
+
+        Args:
+            tc_name (str): Name of testcase
+        """
+        if tc_name in self._staged:
+            return
+
+        tc_in_folder = os.path.join(self.get_folder(tc_name), 'in')
+        for k in range(self.size):
+            in_folder = os.path.join(self.get_folder('{}_{}'.format(tc_name, k)), 'in')
+            os.makedirs(in_folder, exist_ok=True)
+            os.makedirs(os.path.join(self.get_folder('{}_{}'.format(tc_name, k)), 'out'), exist_ok=True)
+
+            for file_name in ['msg.txt', 'vls.txt']:
+                replace_file(os.path.join(in_folder, file_name), source=os.path.join(tc_in_folder, file_name))
+            if os.path.exists(os.path.join(tc_in_folder, 'rate.txt')):
+                replace_file(os.path.join(in_folder, 'rate.txt'), source=os.path.join(tc_in_folder, 'rate.txt'))
+            else:
+                replace_file(os.path.join(in_folder, 'rate.txt'), content=RATE_FILE_CONTENT)
+
+        self._staged.add(tc_name)
+        debug_print('Staged {} sandboxes for {}'.format(self.size, tc_name))
+
+    @contextmanager
+    def lease(self, tc_name: str, timeout: float = None):
+        """
+        Leases a free sandbox of the testcase with an empty "out" folder. Blocks until one is free.
+
+        Args:
+            tc_name (str): Name of testcase
+            timeout (float): Maximum time to wait for a free sandbox, in seconds. Waits forever if None
+
+        Returns:
+            Context manager yielding the name of the sandbox (used instead of the testcase name in the WCDTool folder)
+        """
+        self.stage(tc_name)
+
+        t = time.time()
+        while True:
+            for k in range(self.size):
+                name = '{}_{}'.format(tc_name, k)
+                if self.acquire(name):
+                    try:
+                        self.clean(name)
+                        yield name
+                    finally:
+                        self.release(name)
+                    return
+
+            if timeout is not None and time.time() - t > timeout:
+                raise TimeoutError('No free sandbox for {}'.format(tc_name))
+            time.sleep(0.01)
+
+    def acquire(self, name: str):
+        """
+
+        Args:
+            name (str): Name of sandbox
+
+        Returns:
+            True, if the lock of the sandbox was acquired
+        """
+        # Lock files are never deleted, so all processes lock the same file
+        fd = os.open(self.get_folder(name) + '.lock', os.O_CREAT | os.O_RDWR)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+
+        self._locks[name] = fd
+        return True
+
+    def release(self, name: str):
+        """
+
+        Args:
+            name (str): Name of sandbox
+        """
+        fd = self._locks.pop(name)
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+
+    def clean(self, name: str):
+        """
+        Empties the "out" folder of the sandbox. The folder is renamed before deletion, so no stale output of a previous
+        analysis can be read.
+
+        Args:
+            name (str): Name of sandbox
+        """
+        out_folder = os.path.join(self.get_folder(name), 'out')
+        if os.path.exists(out_folder):
+            trash_folder = '{}.{}.trash'.format(out_folder, uuid.uuid4().hex)
+            os.replace(out_folder, trash_folder)
+            shutil.rmtree(trash_folder, ignore_errors=True)
+        os.makedirs(out_folder, exist_ok=True)
+
+
+def replace_file(path: str, source: str = None, content: str = None):
+    """
+    Atomically replaces the file at path with a copy of source or with content.
+
+    Args:
+        path (str): File to replace
+        source (str): File to copy
+        content (str): Text to write, if source is None
+    """
+    tmp_path = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+    if source is not None:
+        shutil.copyfile(source, tmp_path)
+    else:
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+    os.replace(tmp_path, path)